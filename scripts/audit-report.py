@@ -0,0 +1,41 @@
+import argparse
+import importlib.util
+import os
+
+from dataset_audit import AUDIT_TABLE_PATH, ISSUES, AuditTable
+
+# check-dataset.py has a hyphen in its name, so it is loaded by path for its report functions
+_spec = importlib.util.spec_from_file_location("check_dataset", os.path.join(os.path.dirname(__file__), "check-dataset.py"))
+check_dataset = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(check_dataset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-check a saved audit table with new thresholds (no image re-scan)")
+    parser.add_argument("--table", default=AUDIT_TABLE_PATH, help=".npz or .parquet written by check-dataset.py")
+    parser.add_argument("--min-size", nargs=2, type=int, default=[400, 400], metavar=("W", "H"))
+    parser.add_argument("--max-aspect", type=float, default=6.0)
+    parser.add_argument("--low-variance", type=float, default=2.0, help="grayscale variance below this is flagged")
+    parser.add_argument("--split", default=None, help="only rows of this split")
+    parser.add_argument("--remove", nargs="+", choices=ISSUES, default=None,
+                        help="delete (or --quarantine) images with these issues and their labels, after confirmation")
+    parser.add_argument("--quarantine", default=None, metavar="DIR", help="move files to DIR instead of deleting them")
+    parser.add_argument("--out", default=None, help="also save the re-flagged table (.npz or .parquet)")
+    args = parser.parse_args()
+
+    table = AuditTable.load(args.table)
+    if args.split:
+        table = table[table["split"] == args.split]
+    table = table.flag_issues(tuple(args.min_size), args.max_aspect, args.low_variance)
+    print(f"📋 {len(table)} images from {args.table}")
+
+    check_dataset.print_pixel_range_report(table)
+    check_dataset.print_quality_report(table)
+    if args.out:
+        print(f"💾 Saved {table.save(args.out)}")
+    if args.remove:
+        check_dataset.remove_low_quality_images(table, args.remove, quarantine_dir=args.quarantine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+
+from class_sampling import image_class_index
+from dataset_audit import collect_image_paths
+from offline_augment import EXPORT_DIR, SHARDS_DIR, AugmentConfig, build_shards, export_yolo, iter_records
+from dataset_tiers import read_class_names
+
+# --- Paths ---
+DATASET_DIR = "../dataset"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate augmented training images into shards on all cores")
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--classes", nargs="+", default=None,
+                        help="only augment images containing one of these class names (default: every image)")
+    parser.add_argument("--variants", type=int, default=4, help="augmented copies per source image")
+    parser.add_argument("--shard-size", type=int, default=64, help="source images per shard")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-size", type=int, default=640, help="long side sources are shrunk to first")
+    parser.add_argument("--shards", default=SHARDS_DIR)
+    parser.add_argument("--export", default=EXPORT_DIR,
+                        help="also write the records as a YOLO images/labels folder here ('' to skip)")
+    parser.add_argument("--check", action="store_true", help="stream every record back and report the totals")
+    args = parser.parse_args()
+
+    split_dir = os.path.join(DATASET_DIR, args.split)
+    if args.classes:
+        names = read_class_names(os.path.join(DATASET_DIR, "data.yaml"))
+        wanted = [names.index(name) for name in args.classes]
+        images, presence = image_class_index(split_dir, len(names))
+        paths = [path for path, row in zip(images, presence[:, wanted].any(1)) if row]
+    else:
+        paths = collect_image_paths(os.path.join(split_dir, "images"))
+
+    print(f"🧩 Augmenting {len(paths)} images x {args.variants} variants -> {args.shards}")
+    summary = build_shards(paths, args.shards, args.variants, AugmentConfig(max_size=args.max_size),
+                           args.shard_size, args.workers, args.seed)
+    print(f"✅ {summary['shards']} shards ({summary['built']} built now, {summary['records']} new records)")
+    if summary["errors"]:
+        print(f"❌ {len(summary['errors'])} problems:")
+        for error in summary["errors"]:
+            print(f"   {error}")
+
+    if args.check:
+        records = boxes = 0
+        for _, _, labels in iter_records(args.shards, shuffle=False):
+            records += 1
+            boxes += len(labels)
+        print(f"🔎 {records} records, {boxes} boxes readable")
+
+    if args.export:
+        exported = export_yolo(args.shards, args.export)
+        print(f"📁 Exported {len(exported)} images to {args.export}/images (labels in {args.export}/labels)")
+
+
+if __name__ == "__main__":
+    main()
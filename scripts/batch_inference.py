@@ -0,0 +1,236 @@
+import json
+import os
+import cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from box_tracker import result_to_detections
+from dataset_audit import collect_image_paths
+from stage_timer import StageTimer
+
+# Column layout of the streamed NumPy predictions
+PREDICTION_COLUMNS = ("image", "x1", "y1", "x2", "y2", "conf", "class")
+
+
+#Function to resize an image into a square canvas keeping its aspect ratio (YOLO letterbox)
+def letterbox(img: np.ndarray, size: int = 320, color: int = 114) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Returns (canvas, scale, (pad_x, pad_y)); original = (letterboxed - pad) / scale."""
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+    if (new_w, new_h) != (w, h):
+        interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        img = cv2.resize(img, (new_w, new_h), interpolation=interp)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), color, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = img
+    return canvas, scale, (pad_x, pad_y)
+
+
+def _load_item(path: str, imgsz: int, timer: StageTimer) -> Optional[Dict]:
+    with timer.stage("decode"):
+        img = cv2.imread(path)
+    if img is None:
+        print(f"⚠️ Could not read image, skipped: {path}")
+        return None
+    with timer.stage("letterbox"):
+        canvas, scale, pad = letterbox(img, imgsz)
+    return {"path": path, "image": img, "input": canvas, "scale": scale, "pad": pad}
+
+
+#Generator that decodes and letterboxes images on a thread pool, a few batches ahead of the consumer
+def iter_batches(
+    paths: Sequence[str],
+    batch_size: int = 16,
+    imgsz: int = 320,
+    workers: Optional[int] = None,
+    prefetch: int = 2,
+    timer: Optional[StageTimer] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Yields lists of up to batch_size items (path, original image, letterboxed input, scale, pad).
+    At most prefetch batches are in flight, so memory stays bounded no matter how many paths
+    there are. Unreadable images are reported and skipped.
+    """
+    workers = workers or min(8, os.cpu_count() or 1)
+    timer = timer or StageTimer()
+    window = max(1, prefetch) * batch_size
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        batch: List[Dict] = []
+        it = iter(paths)
+        for path in it:
+            pending.append(pool.submit(_load_item, path, imgsz, timer))
+            if len(pending) >= window:
+                break
+
+        while pending:
+            # Time spent here means decoding is the bottleneck, not the model
+            with timer.stage("wait for decode"):
+                item = pending.popleft().result()
+            # Keep the window full: one new decode for every one consumed
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(pool.submit(_load_item, nxt, imgsz, timer))
+            if item is None:
+                continue
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+#Function to map letterboxed xyxy boxes back to original image pixels
+def unletterbox_boxes(xyxy: np.ndarray, scale: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> np.ndarray:
+    out = (xyxy - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)) / scale
+    h, w = shape[:2]
+    np.clip(out[:, 0::2], 0, w, out=out[:, 0::2])
+    np.clip(out[:, 1::2], 0, h, out=out[:, 1::2])
+    return out
+
+
+#Generator that runs the model batch by batch and yields one prediction per image as it arrives
+def stream_predictions(
+    model,
+    source: str,
+    batch_size: int = 16,
+    imgsz: int = 320,
+    conf: float = 0.25,
+    device: str = "cpu",
+    workers: Optional[int] = None,
+    prefetch: int = 2,
+    timer: Optional[StageTimer] = None,
+) -> Iterator[Dict]:
+    """
+    source is an image file or folder. Each yielded dict holds path, the original image and
+    its (h, w) shape, and xyxy (n, 4) float32 in original pixels, conf (n,) and cls (n,) int arrays.
+    The letterboxed batch is handed to the model as one BCHW tensor, so Ultralytics skips
+    its own per-image preprocessing.
+    """
+    import torch
+
+    timer = timer or StageTimer()
+    paths = collect_image_paths(source) if os.path.isdir(source) else [source]
+    for batch in iter_batches(paths, batch_size, imgsz, workers, prefetch, timer):
+        with timer.stage("to tensor"):
+            inputs = np.stack([item["input"] for item in batch])
+            # BGR uint8 NHWC -> RGB float NCHW in [0, 1]
+            tensor = torch.from_numpy(np.ascontiguousarray(inputs[..., ::-1].transpose(0, 3, 1, 2))).float() / 255.0
+        with timer.stage("inference"):
+            results = model.predict(source=tensor, imgsz=imgsz, conf=conf, device=device, verbose=False)
+        if results:
+            timer.record_speed(results[0].speed, images=len(batch))
+
+        for item, result in zip(batch, results):
+            xyxy, p, c = result_to_detections(result)
+            yield {
+                "path": item["path"],
+                "image": item["image"],
+                "shape": item["image"].shape[:2],
+                "xyxy": unletterbox_boxes(xyxy, item["scale"], item["pad"], item["image"].shape),
+                "conf": p,
+                "cls": c,
+            }
+
+
+#Generator with the same output as stream_predictions, served by a running inference server
+def stream_server_predictions(client, source: str, concurrency: int = 8) -> Iterator[Dict]:
+    """
+    client is an inference_client.InferenceClient. Files are sent as stored (no local decode)
+    with several requests in flight so the server can batch them; "image" is None.
+    """
+    paths = collect_image_paths(source) if os.path.isdir(source) else [source]
+    for path, raw in zip(paths, client.predict_many(paths, concurrency)):
+        yield {
+            "path": path,
+            "image": None,
+            "shape": tuple(raw["shape"]),
+            "xyxy": np.asarray(raw["xyxy"], dtype=np.float32).reshape(-1, 4),
+            "conf": np.asarray(raw["conf"], dtype=np.float32),
+            "cls": np.asarray(raw["cls"], dtype=np.int64),
+        }
+
+
+#Writer that appends one JSON line per image
+class JsonlPredictionWriter:
+    def __init__(self, path: str, names: Optional[Dict[int, str]] = None):
+        self.path = path
+        self.names = names or {}
+        self.file = open(path, "w", encoding="utf-8")
+        self.images = 0
+        self.boxes = 0
+
+    def write(self, pred: Dict) -> None:
+        h, w = pred["shape"][:2]
+        boxes = [
+            {"cls": c, "name": self.names.get(c, str(c)), "conf": round(p, 4), "xyxy": [round(v, 1) for v in box]}
+            for box, p, c in zip(pred["xyxy"].tolist(), pred["conf"].tolist(), pred["cls"].tolist())
+        ]
+        record = {"image": os.path.basename(pred["path"]), "width": w, "height": h, "boxes": boxes}
+        self.file.write(json.dumps(record) + "\n")
+        self.images += 1
+        self.boxes += len(boxes)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+#Writer that appends (image, x1, y1, x2, y2, conf, class) float32 rows to a .npy file
+class NpyPredictionWriter:
+    """
+    The .npy header is written with a fixed-width placeholder and patched with the final row
+    count on close, so rows go straight to disk. Image names are listed, in image-index order,
+    in a .txt file next to it.
+    """
+
+    HEADER_LEN = 128
+
+    def __init__(self, path: str, names: Optional[Dict[int, str]] = None):
+        self.path = path
+        self.file = open(path, "wb")
+        self.names_file = open(os.path.splitext(path)[0] + "_images.txt", "w", encoding="utf-8")
+        self.images = 0
+        self.boxes = 0
+        self._write_header()
+
+    def _write_header(self) -> None:
+        header = repr({"descr": "<f4", "fortran_order": False, "shape": (self.boxes, len(PREDICTION_COLUMNS))})
+        prefix = np.lib.format.magic(1, 0) + np.uint16(self.HEADER_LEN - 10).tobytes()
+        self.file.seek(0)
+        self.file.write(prefix + header.ljust(self.HEADER_LEN - 11).encode("latin1") + b"\n")
+
+    def write(self, pred: Dict) -> None:
+        n = len(pred["xyxy"])
+        rows = np.empty((n, len(PREDICTION_COLUMNS)), dtype=np.float32)
+        rows[:, 0] = self.images
+        rows[:, 1:5] = pred["xyxy"]
+        rows[:, 5] = pred["conf"]
+        rows[:, 6] = pred["cls"]
+        self.file.write(rows.tobytes())
+        self.names_file.write(os.path.basename(pred["path"]) + "\n")
+        self.images += 1
+        self.boxes += n
+
+    def close(self) -> None:
+        self._write_header()
+        self.file.close()
+        self.names_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+PREDICTION_WRITERS = {"jsonl": JsonlPredictionWriter, "npy": NpyPredictionWriter}
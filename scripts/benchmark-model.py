@@ -0,0 +1,32 @@
+import argparse
+
+from inference_benchmark import BENCHMARK_SOURCE, print_benchmark, run_benchmark, save_benchmark
+from model_backends import BACKENDS
+
+# --- Paths ---
+MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp81/weights/best.pt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latency, throughput and mAP50 across inference settings")
+    parser.add_argument("--weights", nargs="+", default=[MODEL_PATH],
+                        help="one or more best.pt files, e.g. several experiments to compare")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["pytorch"])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[320, 416, 512, 640])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--source", default=BENCHMARK_SOURCE, help="images to time on")
+    parser.add_argument("--images", type=int, default=200, help="images loaded (evenly spaced) for timing")
+    parser.add_argument("--no-map", action="store_true", help="skip the test-split mAP evaluation")
+    parser.add_argument("--out", default=None, help="run folder (default: runs/benchmark/<timestamp>)")
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.weights, args.backends, args.imgsz, args.batch, args.threads,
+                         source=args.source, images=args.images, with_map=not args.no_map)
+    run_dir = save_benchmark(rows, args.out, settings=vars(args))
+    print_benchmark(rows)
+    print(f"\n✅ Results saved to: {run_dir}/results.csv and results.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import math
+import time
+import cv2
+import numpy as np
+from typing import Callable, Optional, Tuple
+
+# (xyxy (n, 4) float32 in frame pixels, conf (n,), cls (n,) int)
+Detections = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+EMPTY_DETECTIONS: Detections = (np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64))
+
+
+#Function to turn an Ultralytics Results object into numpy arrays with a single device-to-host transfer
+def result_to_detections(result) -> Detections:
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_DETECTIONS
+    # boxes.data is (n, 6) x1, y1, x2, y2, conf, cls (a track id is inserted before conf when tracking)
+    data = boxes.data.cpu().numpy()
+    return (np.ascontiguousarray(data[:, :4], dtype=np.float32),
+            data[:, -2].astype(np.float32),
+            data[:, -1].astype(np.int64))
+
+
+def _small_gray(frame: np.ndarray, width: int) -> Tuple[np.ndarray, float]:
+    scale = min(1.0, width / frame.shape[1])
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+#Function to score how much the scene changed between two small grayscale frames (0 = same, 1 = all different)
+def scene_change_score(prev_gray: np.ndarray, gray: np.ndarray) -> float:
+    return float(cv2.absdiff(prev_gray, gray).mean()) / 255.0
+
+
+#Optical-flow tracker that carries the last detections forward between detector runs
+class FlowBoxTracker:
+    """
+    Samples corner features inside every box on a downscaled grayscale frame and follows
+    them with pyramidal Lucas-Kanade flow. Each box moves by the median feature shift and
+    scales by the median change in feature spread. Boxes that lose their features keep
+    their last position and are reported through `lost`.
+    """
+
+    def __init__(self, width: int = 320, max_points: int = 20):
+        self.width = width
+        self.max_points = max_points
+        self.prev_gray: Optional[np.ndarray] = None
+        self.scale = 1.0
+        self.xyxy = np.zeros((0, 4), np.float32)
+        self.points = []  # per box: (k, 1, 2) float32 feature positions in the small frame
+        self.lost = 0
+
+    def reset(self, frame: np.ndarray, xyxy: np.ndarray) -> None:
+        gray, self.scale = _small_gray(frame, self.width)
+        self.prev_gray = gray
+        self.xyxy = xyxy.astype(np.float32).copy()
+        self.points = [self._features(gray, box * self.scale) for box in self.xyxy]
+        self.lost = 0
+
+    def _features(self, gray: np.ndarray, box: np.ndarray) -> Optional[np.ndarray]:
+        h, w = gray.shape
+        x1, y1, x2, y2 = np.clip(box, 0, [w - 1, h - 1, w - 1, h - 1]).astype(int)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return None
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+        return cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 3, mask=mask)
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """Moves every tracked box to the new frame and returns the updated xyxy array."""
+        gray, _ = _small_gray(frame, self.width)
+        if self.prev_gray is None or not len(self.xyxy):
+            self.prev_gray = gray
+            return self.xyxy
+
+        # Track all boxes' features in one LK call
+        counts = [0 if p is None else len(p) for p in self.points]
+        if sum(counts) == 0:
+            self.prev_gray = gray
+            self.lost = len(self.xyxy)
+            return self.xyxy
+        old = np.concatenate([p for p in self.points if p is not None])
+        new, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, old, None, winSize=(15, 15), maxLevel=2)
+        status = status.reshape(-1).astype(bool)
+
+        self.lost = 0
+        start = 0
+        for i, k in enumerate(counts):
+            if k == 0:
+                self.lost += 1
+                continue
+            ok = status[start:start + k]
+            p0, p1 = old[start:start + k][ok].reshape(-1, 2), new[start:start + k][ok].reshape(-1, 2)
+            start += k
+            if len(p1) < 3:
+                self.points[i] = None
+                self.lost += 1
+                continue
+
+            shift = np.median(p1 - p0, axis=0) / self.scale
+            spread0 = np.linalg.norm(p0 - p0.mean(axis=0), axis=1)
+            spread1 = np.linalg.norm(p1 - p1.mean(axis=0), axis=1)
+            valid = spread0 > 1e-3
+            zoom = float(np.clip(np.median(spread1[valid] / spread0[valid]), 0.8, 1.25)) if valid.any() else 1.0
+
+            x1, y1, x2, y2 = self.xyxy[i]
+            cx, cy = (x1 + x2) / 2 + shift[0], (y1 + y2) / 2 + shift[1]
+            hw, hh = (x2 - x1) / 2 * zoom, (y2 - y1) / 2 * zoom
+            self.xyxy[i] = (cx - hw, cy - hh, cx + hw, cy + hh)
+            self.points[i] = p1.reshape(-1, 1, 2)
+
+        self.prev_gray = gray
+        return self.xyxy
+
+
+#Detector wrapper that only runs the model every N frames (or on scene change) and tracks in between
+class AdaptiveDetector:
+    """
+    detect(frame) must return Detections. The detector runs when the skip budget is used up,
+    when the scene changed by more than motion_thresh since the last detection, or when the
+    tracker lost most boxes. N adapts to the measured detector latency so the average cost
+    per frame stays within the frame budget of target_fps.
+    """
+
+    def __init__(
+        self,
+        detect: Callable[[np.ndarray], Detections],
+        target_fps: float = 30.0,
+        max_skip: int = 15,
+        motion_thresh: float = 0.12,
+        tracker: Optional[FlowBoxTracker] = None,
+    ):
+        self.detect = detect
+        self.budget = 1.0 / target_fps
+        self.max_skip = max_skip
+        self.motion_thresh = motion_thresh
+        self.tracker = tracker or FlowBoxTracker()
+        self.detections: Detections = EMPTY_DETECTIONS
+        self.key_gray: Optional[np.ndarray] = None
+        self.skip = 1
+        self.since_detect = 0
+        self.detect_time = None  # EMA of detector latency (s)
+        self.track_time = 0.0    # EMA of tracker latency (s)
+        self.frames = 0
+        self.detector_runs = 0
+
+    def _ema(self, old: Optional[float], new: float, alpha: float = 0.2) -> float:
+        return new if old is None else (1 - alpha) * old + alpha * new
+
+    def _adapt_skip(self) -> None:
+        # Average cost over N frames: (detect + (N - 1) * track) / N <= budget
+        spare = self.budget - self.track_time
+        if spare <= 0:
+            self.skip = self.max_skip
+        else:
+            needed = (self.detect_time - self.track_time) / spare
+            self.skip = int(min(self.max_skip, max(1, math.ceil(needed))))
+
+    def process(self, frame: np.ndarray) -> Tuple[Detections, bool]:
+        """Returns (detections for this frame, whether the detector ran)."""
+        self.frames += 1
+        gray, _ = _small_gray(frame, self.tracker.width)
+
+        run_detector = (
+            self.key_gray is None
+            or self.since_detect + 1 >= self.skip
+            or scene_change_score(self.key_gray, gray) > self.motion_thresh
+            or (len(self.detections[0]) and self.tracker.lost > len(self.detections[0]) // 2)
+        )
+
+        if run_detector:
+            t = time.perf_counter()
+            self.detections = self.detect(frame)
+            self.detect_time = self._ema(self.detect_time, time.perf_counter() - t)
+            self.tracker.reset(frame, self.detections[0])
+            self.key_gray = gray
+            self.since_detect = 0
+            self.detector_runs += 1
+            self._adapt_skip()
+            return self.detections, True
+
+        t = time.perf_counter()
+        xyxy = self.tracker.update(frame)
+        self.track_time = self._ema(self.track_time, time.perf_counter() - t)
+        self.since_detect += 1
+        _, conf, cls = self.detections
+        return (xyxy.copy(), conf, cls), False
+
+    @property
+    def detector_share(self) -> float:
+        return self.detector_runs / max(self.frames, 1)
@@ -0,0 +1,35 @@
+import argparse
+import os
+
+from dataset_tiers import (DATASET_DIR, DEFAULT_TIERS, SPLITS, TIERS_DIR, build_tiers, read_class_names,
+                           tier_split_dir, write_tier_yaml)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build resized copies of the dataset (one tier per long-side size)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_TIERS), help="long-side sizes in px")
+    parser.add_argument("--splits", nargs="+", default=list(SPLITS))
+    parser.add_argument("--letterbox", action="store_true",
+                        help="pad every image to a size x size square and rescale its labels to match")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=TIERS_DIR, help="folder holding the tiers")
+    args = parser.parse_args()
+
+    summary = build_tiers(DATASET_DIR, args.out, args.sizes, args.splits, args.letterbox, args.workers)
+    names = read_class_names(os.path.join(DATASET_DIR, "data.yaml"))
+
+    print(f"📦 {summary['images']} source images")
+    for size, counts in summary["tiers"].items():
+        tier_dir = os.path.dirname(tier_split_dir(args.out, size, "", args.letterbox))
+        yaml_path = write_tier_yaml(tier_dir, names, args.splits)
+        print(f"  {size}px: {counts['written']} resized, {counts['linked']} linked as-is, "
+              f"{counts['unchanged']} unchanged, {counts['removed']} removed -> {yaml_path}")
+    if summary["errors"]:
+        print(f"❌ {len(summary['errors'])} images could not be processed:")
+        for error in summary["errors"]:
+            print(f"   {error}")
+    print("\n💡 Train or evaluate on a tier with data=<tier>/data.yaml")
+
+
+if __name__ == "__main__":
+    main()
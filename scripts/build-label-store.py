@@ -0,0 +1,45 @@
+import argparse
+import os
+
+from label_store import LabelStore, build_label_store, export_yolo_labels, store_path_for
+from yolo_labels import label_statistics, print_label_statistics
+
+# --- Paths ---
+DATASET_DIR = "../dataset"
+SPLITS = ["train", "valid", "test"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack dataset/<split>/labels into one memory-mapped file per split")
+    parser.add_argument("--splits", nargs="+", default=SPLITS, help="splits to pack")
+    parser.add_argument("--rebuild", action="store_true", help="ignore existing stores and re-parse every file")
+    parser.add_argument("--export", metavar="DIR",
+                        help="instead of building, write the packed labels back as YOLO .txt files to DIR/<split>/labels")
+    parser.add_argument("--stats", action="store_true", help="print class and box-size statistics from each store")
+    args = parser.parse_args()
+
+    for split in args.splits:
+        split_dir = os.path.join(DATASET_DIR, split)
+        store_path = store_path_for(split_dir)
+
+        if args.export:
+            out_dir = os.path.join(args.export, split, "labels")
+            count = export_yolo_labels(store_path, out_dir)
+            print(f"✅ {split}: exported {count} label files to {out_dir}")
+            continue
+
+        summary = build_label_store(os.path.join(split_dir, "labels"), store_path, rebuild=args.rebuild)
+        print(f"📦 {split}: {summary['files']} files, {summary['boxes']} boxes -> {summary['store']}")
+        print(f"   {summary['unchanged']} unchanged, {summary['parsed']} parsed, {summary['removed']} removed")
+        if summary["errors"]:
+            print(f"❌ {len(summary['errors'])} lines could not be packed:")
+            for error in summary["errors"]:
+                print(f"   {error}")
+
+        if args.stats:
+            store = LabelStore(store_path)
+            print_label_statistics(label_statistics(store.as_label_array()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import get_context, shared_memory
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from stage_timer import StageTimer
+
+
+#Function to put an item on a bounded queue, dropping the oldest entry instead of blocking
+def put_latest(q: queue.Queue, item: Any) -> None:
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+#Rolling frames-per-second / latency meter over the last few seconds
+class RateMeter:
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self.stamps = deque()
+        self.latencies = deque()
+
+    def tick(self, latency: Optional[float] = None) -> None:
+        now = time.perf_counter()
+        self.stamps.append(now)
+        if latency is not None:
+            self.latencies.append((now, latency))
+        while self.stamps and now - self.stamps[0] > self.window:
+            self.stamps.popleft()
+        while self.latencies and now - self.latencies[0][0] > self.window:
+            self.latencies.popleft()
+
+    @property
+    def fps(self) -> float:
+        if len(self.stamps) < 2:
+            return 0.0
+        return (len(self.stamps) - 1) / (self.stamps[-1] - self.stamps[0])
+
+    @property
+    def latency_ms(self) -> float:
+        if not self.latencies:
+            return 0.0
+        return 1000 * sum(l for _, l in self.latencies) / len(self.latencies)
+
+
+#Capture thread that keeps only the newest camera frame
+class FrameGrabber(threading.Thread):
+    """
+    Reads the capture device as fast as it delivers frames and keeps just the latest one,
+    so a slow consumer always gets a fresh frame instead of a backlog of stale ones.
+    """
+
+    def __init__(self, cap, timer: Optional[StageTimer] = None):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.timer = timer or StageTimer()
+        self.cond = threading.Condition()
+        self.frame = None
+        self.frame_id = 0
+        self.stamp = 0.0
+        self.dropped = 0
+        self.running = True
+        self.failed = False
+
+    def run(self) -> None:
+        while self.running:
+            with self.timer.stage("capture"):
+                ret, frame = self.cap.read()
+            stamp = time.perf_counter()
+            with self.cond:
+                if not ret:
+                    self.failed = True
+                    self.running = False
+                else:
+                    if self.frame is not None:
+                        self.dropped += 1
+                    self.frame, self.stamp = frame, stamp
+                    self.frame_id += 1
+                self.cond.notify_all()
+
+    def read(self, last_id: int = 0, timeout: float = 1.0) -> Tuple[int, Any, float]:
+        """Blocks until a frame newer than last_id is available; returns (frame_id, frame, capture time)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.frame_id > last_id or not self.running, timeout)
+            frame, self.frame = self.frame, None
+            return self.frame_id, frame, self.stamp
+
+    def stop(self) -> None:
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+
+#Inference thread: newest frame in, (frame, results, capture time) out on a bounded queue
+class InferenceWorker(threading.Thread):
+    def __init__(self, grabber: FrameGrabber, predict: Callable[[Any], Any], maxsize: int = 1,
+                 timer: Optional[StageTimer] = None):
+        super().__init__(daemon=True)
+        self.grabber = grabber
+        self.timer = timer or StageTimer()
+        self.predict = predict
+        self.output: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.meter = RateMeter()
+        self.running = True
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        last_id = 0
+        try:
+            while self.running and (self.grabber.running or self.grabber.frame is not None):
+                with self.timer.stage("wait for frame"):
+                    frame_id, frame, stamp = self.grabber.read(last_id)
+                if frame is None:
+                    continue
+                last_id = frame_id
+                results = self.predict(frame)
+                self.meter.tick()
+                put_latest(self.output, (frame, results, stamp))
+        except BaseException as e:  # surface errors to the render loop instead of dying silently
+            self.error = e
+        finally:
+            self.running = False
+
+    def stop(self) -> None:
+        self.running = False
+
+
+# FrameRing.state values
+RING_RUNNING, RING_ENDED, RING_FAILED = 0, 1, 2
+
+
+#Fixed-size ring of frames in shared memory, written by one capture process and read in place by others
+class FrameRing:
+    """
+    Layout: int64 [latest seq, state], int64 seq per slot, float64 capture time per slot, then
+    the uint8 frames. The writer marks a slot -1 while filling it and publishes it by setting
+    the slot's seq and then the latest seq, so a reader can check (valid()) after using a frame
+    that the writer did not lap it in the meantime. Frames never pass through a pipe or pickle.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Tuple[int, int, int], slots: int, owner: bool):
+        self.shm, self.shape, self.slots, self.owner = shm, tuple(shape), slots, owner
+        self.meta = np.ndarray((2,), np.int64, shm.buf, 0)
+        self.seqs = np.ndarray((slots,), np.int64, shm.buf, 16)
+        self.stamps = np.ndarray((slots,), np.float64, shm.buf, 16 + 8 * slots)
+        self.frames = np.ndarray((slots, *self.shape), np.uint8, shm.buf, 16 + 16 * slots)
+
+    @staticmethod
+    def nbytes(shape: Tuple[int, int, int], slots: int) -> int:
+        return 16 + 16 * slots + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape: Tuple[int, int, int], slots: int = 3) -> "FrameRing":
+        ring = cls(shared_memory.SharedMemory(create=True, size=cls.nbytes(shape, slots)), shape, slots, True)
+        ring.meta[:] = (0, RING_RUNNING)
+        ring.seqs[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, int, int], slots: int) -> "FrameRing":
+        # Spawned children share the creator's resource tracker, so attaching does not add a second owner
+        return cls(shared_memory.SharedMemory(name=name), shape, slots, False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def state(self) -> int:
+        return int(self.meta[1])
+
+    @state.setter
+    def state(self, value: int) -> None:
+        self.meta[1] = value
+
+    def write(self, frame: np.ndarray, stamp: float) -> int:
+        seq = int(self.meta[0]) + 1
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        self.frames[slot] = frame
+        self.stamps[slot] = stamp
+        self.seqs[slot] = seq
+        self.meta[0] = seq
+        return seq
+
+    def latest(self, last_seq: int = 0) -> Tuple[int, Optional[np.ndarray], float]:
+        """(seq, frame view, capture time) of the newest frame if newer than last_seq, else (last_seq, None, 0)."""
+        seq = int(self.meta[0])
+        slot = seq % self.slots
+        if seq <= last_seq or self.seqs[slot] != seq:
+            return last_seq, None, 0.0
+        return seq, self.frames[slot], float(self.stamps[slot])
+
+    def valid(self, seq: int) -> bool:
+        return int(self.seqs[seq % self.slots]) == seq
+
+    def close(self) -> None:
+        # Views must go before the buffer can be released
+        del self.meta, self.seqs, self.stamps, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def parse_source(source: str):
+    """Camera index ("0") or a video file / stream URL."""
+    return int(source) if str(source).isdigit() else source
+
+
+#Capture process: reads one source into its frame ring until stopped (or the video ends)
+def _capture_main(source, conn, stop, slots: int, realtime: bool, loop: bool) -> None:
+    cv2.setNumThreads(1)
+    cap = cv2.VideoCapture(parse_source(source))
+    ret, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ret:
+        conn.send(("error", f"Could not open {source}"))
+        return
+    is_file = isinstance(parse_source(source), str) and os.path.isfile(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) if is_file else 0.0
+    conn.send(("shape", frame.shape, fps))
+    ring = FrameRing.attach(conn.recv(), frame.shape, slots)
+    # Video files stand in for cameras: released at their own frame rate instead of as fast as they decode
+    interval = 1.0 / fps if realtime and fps > 0 else 0.0
+    next_at = time.perf_counter()
+    try:
+        while not stop.is_set():
+            if frame.shape != ring.shape:
+                frame = cv2.resize(frame, (ring.shape[1], ring.shape[0]))
+            ring.write(frame, time.perf_counter())
+            if interval:
+                next_at += interval
+                time.sleep(max(0.0, next_at - time.perf_counter()))
+            ret, frame = cap.read()
+            if not ret and loop and is_file:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = cap.read()
+            if not ret:
+                ring.state = RING_ENDED if is_file else RING_FAILED
+                break
+    finally:
+        cap.release()
+        ring.close()
+
+
+#One capture process and shared-memory frame ring per source (camera index or video file)
+class MultiStreamCapture:
+    def __init__(self, sources: Sequence[str], slots: int = 3, realtime: bool = True, loop: bool = False):
+        ctx = get_context("spawn")
+        self.sources = list(sources)
+        self.stop_event = ctx.Event()
+        self.processes, self.rings, self.fps = [], [], []
+        try:
+            for source in self.sources:
+                parent, child = ctx.Pipe()
+                process = ctx.Process(target=_capture_main, args=(source, child, self.stop_event, slots, realtime, loop),
+                                      daemon=True)
+                process.start()
+                self.processes.append(process)
+                # Only the frame shape and the ring name cross the pipe
+                reply = parent.recv() if parent.poll(30) else ("error", f"Timed out opening {source}")
+                if reply[0] == "error":
+                    raise RuntimeError(reply[1])
+                ring = FrameRing.create(reply[1], slots)
+                self.rings.append(ring)
+                self.fps.append(reply[2])
+                parent.send(ring.name)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        return any(ring.state == RING_RUNNING for ring in self.rings)
+
+    def close(self) -> None:
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close()
+        self.processes, self.rings = [], []
+
+
+#Inference thread: the newest frame of every stream, letterboxed into one batch, one forward pass, results per stream
+class MultiStreamWorker(threading.Thread):
+    """
+    predict_batch takes an (n, imgsz, imgsz, 3) BGR uint8 batch and returns n Detections in
+    letterboxed pixels. Each stream gets a bounded output queue of (stream, frame copy, Detections
+    in frame pixels, capture time). Frames are letterboxed straight out of shared memory; one that
+    was overwritten meanwhile is dropped and counted in torn.
+    """
+
+    def __init__(self, capture: MultiStreamCapture, predict_batch: Callable[[np.ndarray], list], imgsz: int = 640,
+                 maxsize: int = 1, timer: Optional[StageTimer] = None):
+        super().__init__(daemon=True)
+        self.capture = capture
+        self.predict_batch = predict_batch
+        self.imgsz = imgsz
+        self.timer = timer or StageTimer()
+        self.outputs = [queue.Queue(maxsize=maxsize) for _ in capture.rings]
+        self.meters = [RateMeter() for _ in capture.rings]
+        self.batch_meter = RateMeter()
+        self.torn = 0
+        self.running = True
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        from batch_inference import letterbox, unletterbox_boxes
+
+        rings = self.capture.rings
+        last = [0] * len(rings)
+        batch = np.empty((len(rings), self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        try:
+            while self.running and self.capture.running:
+                with self.timer.stage("wait for frame"):
+                    fresh = [(i, *ring.latest(last[i])) for i, ring in enumerate(rings)]
+                    fresh = [item for item in fresh if item[2] is not None]
+                    if not fresh:
+                        time.sleep(0.001)
+                        continue
+
+                with self.timer.stage("letterbox"):
+                    items = []
+                    for i, seq, view, stamp in fresh:
+                        canvas, scale, pad = letterbox(view, self.imgsz)
+                        frame = view.copy()
+                        if not rings[i].valid(seq):
+                            self.torn += 1
+                            continue
+                        last[i] = seq
+                        batch[len(items)] = canvas
+                        items.append((i, frame, scale, pad, stamp))
+                if not items:
+                    continue
+
+                with self.timer.stage("inference (batched)"):
+                    detections = self.predict_batch(batch[:len(items)])
+                self.batch_meter.tick()
+                for (i, frame, scale, pad, stamp), (xyxy, conf, cls) in zip(items, detections):
+                    self.meters[i].tick()
+                    put_latest(self.outputs[i], (i, frame, (unletterbox_boxes(xyxy, scale, pad, frame.shape), conf, cls),
+                                                 stamp))
+        except BaseException as e:  # surface errors to the render loop instead of dying silently
+            self.error = e
+        finally:
+            self.running = False
+
+    def stop(self) -> None:
+        self.running = False
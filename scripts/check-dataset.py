@@ -1,20 +1,21 @@
 ﻿import os
-import cv2
 import numpy as np
 from collections import defaultdict
-from PIL import Image
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from dataset_audit import (AUDIT_CACHE_PATH, AUDIT_TABLE_PATH, QUALITY_ISSUES, AuditCache, AuditTable, remove_table_files,
+                           run_audit, run_label_audit)
+from label_store import LabelStore, build_label_store
+from near_duplicates import find_near_duplicate_clusters, print_near_duplicate_report
+from yolo_labels import find_box_errors, label_statistics, print_label_statistics
 
 #Function to check if all images are readable
-def check_images(image_dir):
-    bad_images = []
-    for root, _, files in os.walk(image_dir):
-        for file in files:
-            if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                img_path = os.path.join(root, file)
-                img = cv2.imread(img_path)
-                if img is None:
-                    bad_images.append(img_path)
+def check_images(image_dir, records=None, cache=None):
+    if records is None:
+        records = run_audit(image_dir, cache=cache, pixels=False)
+
+    bad_images = [r["path"] for r in records
+                  if r["path"].lower().endswith(('.jpg', '.jpeg', '.png')) and not r["readable"]]
 
     if bad_images:
         print(f"❌ Corrupted or unreadable images found ({len(bad_images)} total):")
@@ -73,81 +74,49 @@ def find_duplicate_filenames(root_folder):
             for filepath in path_list:
                 print(f"  - {filepath}")
 
-# Function to validate YOLO annotation format
-def validate_annotations(label_dir, num_classes=6):
-    errors = []
-    total_files = 0
-    total_annotations = 0
+#Function to find near-duplicate images (same photo, different file name) within and across splits
+def find_near_duplicates(root_folder, max_distance=10, cache=None):
+    """
+    Uses perceptual hashes (pHash, confirmed by dHash) so Roboflow "*.rf.<hash>" copies of one
+    source photo are caught even under different names, and flags train/valid/test leakage.
+    """
+    print(f"🔍 Scanning for near-duplicate images in '{root_folder}'...\n")
+    clusters = find_near_duplicate_clusters(root_folder, max_distance=max_distance, cache=cache)
+    print_near_duplicate_report(clusters)
+    return clusters
 
-    for file in os.listdir(label_dir):
-        if file.lower().endswith('.txt'):
-            total_files += 1
-            label_path = os.path.join(label_dir, file)
+# Function to validate YOLO annotation format
+def validate_annotations(label_dir, num_classes=6, cache=None):
+    total_files, boxes, errors = run_label_audit(label_dir, num_classes, cache=cache)
 
-            try:
-                with open(label_path, 'r') as f:
-                    lines = f.readlines()
-
-                if not lines or all(line.strip() == '' for line in lines):
-                    continue
-
-                for line_num, line in enumerate(lines, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    parts = line.split()
-
-                    # Check format (should have 5 values)
-                    if len(parts) != 5:
-                        errors.append(f"{label_path} Line {line_num}: Expected 5 values, got {len(parts)}")
-                        continue
-
-                    try:
-                        class_id = int(parts[0])
-                        center_x = float(parts[1])
-                        center_y = float(parts[2])
-                        width = float(parts[3])
-                        height = float(parts[4])
-
-                        total_annotations += 1
-
-                        # Check class ID
-                        if class_id < 0 or class_id >= num_classes:
-                            errors.append(
-                                f"{label_path} Line {line_num}: Invalid class_id={class_id} (valid: 0-{num_classes - 1})")
-
-                        # Check normalization (0-1 range, inclusive)
-                        if center_x < 0 or center_x > 1:
-                            errors.append(f"{label_path} Line {line_num}: center_x={center_x} out of range [0,1]")
-                        if center_y < 0 or center_y > 1:
-                            errors.append(f"{label_path} Line {line_num}: center_y={center_y} out of range [0,1]")
-                        if width < 0 or width > 1:
-                            errors.append(f"{label_path} Line {line_num}: width={width} out of range [0,1]")
-                        if height < 0 or height > 1:
-                            errors.append(f"{label_path} Line {line_num}: height={height} out of range [0,1]")
-
-                        # Check dimensions are positive
-                        if width <= 0 or height <= 0:
-                            errors.append(f"{label_path} Line {line_num}: width and height must be > 0")
-
-                        # Check if the bounding box is within image boundaries
-                        x_min = center_x - width / 2
-                        x_max = center_x + width / 2
-                        y_min = center_y - height / 2
-                        y_max = center_y + height / 2
-
-                        if x_min < 0 or x_max > 1 or y_min < 0 or y_max > 1:
-                            errors.append(f"{label_path} Line {line_num}: Bounding box extends beyond image boundaries")
-
-                    except ValueError:
-                        errors.append(f"{label_path} Line {line_num}: Cannot parse values")
+    print(f"Checked {total_files} files with {len(boxes)} annotations")
 
-            except Exception as e:
-                errors.append(f"{label_path}: Error reading file - {e}")
+    if errors:
+        print(f"❌ Found {len(errors)} annotation errors:")
+        for error in errors:
+            print(f"   {error}")
+    else:
+        print("✅ All annotations are valid")
 
-    print(f"Checked {total_files} files with {total_annotations} annotations")
+    print_label_statistics(label_statistics(boxes, num_classes))
 
+#Function to validate a whole split from its packed label store (see build-label-store.py)
+def check_label_store(split_dir, num_classes=6):
+    """
+    Refreshes the split's packed store (only changed label files are re-parsed), then runs
+    the YOLO checks and statistics on the memory-mapped arrays instead of thousands of .txt files.
+    Lines that cannot be parsed are not packed; the store keeps their errors, so they are reported on every run.
+    """
+    label_dir = os.path.join(split_dir, "labels")
+    summary = build_label_store(label_dir)
+    store = LabelStore(summary["store"])
+    # Stay in float32 so values print as written and allow for float32 rounding in the range checks
+    boxes = store.as_label_array(np.float32)
+    label_paths = [os.path.join(label_dir, name) for name in store.names]
+    tol = 4 * float(np.finfo(np.float32).eps)
+    errors = summary["errors"] + [e[2] for e in find_box_errors(boxes, store.lines, label_paths, num_classes, tol)]
+
+    print(f"Checked {len(store)} files with {len(boxes)} annotations (packed store: {summary['parsed']} re-parsed)")
     if errors:
         print(f"❌ Found {len(errors)} annotation errors:")
         for error in errors:
@@ -155,6 +124,8 @@ def validate_annotations(label_dir, num_classes=6):
     else:
         print("✅ All annotations are valid")
 
+    print_label_statistics(label_statistics(boxes, num_classes))
+
 #Function to delete very large files
 def delete_large_images(image_dir, sizes, min_size=820):
     """
@@ -229,19 +200,19 @@ def delete_large_images(image_dir, sizes, min_size=820):
         print("\n❌ Deletion cancelled")
 
 #Function to check size of images
-def check_image_sizes(image_dir, target_width=640, target_height=640, ask_delete=False):
+def check_image_sizes(image_dir, target_width=640, target_height=640, ask_delete=False, records=None, cache=None):
+    if records is None:
+        records = run_audit(image_dir, cache=cache, pixels=False)
 
     sizes = []
 
-    for file in os.listdir(image_dir):
+    for r in records:
+        file = os.path.relpath(r["path"], image_dir)
         if file.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-            image_path = os.path.join(image_dir, file)
-            try:
-                with Image.open(image_path) as img:
-                    width, height = img.size
-                    sizes.append((width, height, file))
-            except Exception as e:
-                print(f"Error reading {file}: {e}")
+            if r["readable"]:
+                sizes.append((r["width"], r["height"], file))
+            else:
+                print(f"Error reading {file}: invalid or truncated image header")
 
     if not sizes:
         print("No images found")
@@ -291,8 +262,10 @@ def check_image_sizes(image_dir, target_width=640, target_height=640, ask_delete
 
     if very_large > len(sizes) * 0.5:
         print(f"\n⚠️  Warning: {very_large} very large images found - consider resizing")
+        print("   python build-dataset-tiers.py writes resized copies to ../dataset/tiers/<size> and keeps the originals")
     elif large > len(sizes) * 0.5:
         print(f"\n💡 Info: Many large images - resizing may improve training speed")
+        print("   python build-dataset-tiers.py writes resized copies to ../dataset/tiers/<size> and keeps the originals")
     else:
         print(f"\n✅ Image sizes look reasonable for YOLO training")
 
@@ -304,52 +277,35 @@ def check_image_sizes(image_dir, target_width=640, target_height=640, ask_delete
 def check_pixel_range(
         image_dir: str,
         valid_ext: Tuple[str, ...] = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"),
-) -> Dict[str, List[str]]:
-
-    results: Dict[str, List[str]] = {
-        "valid_range": [],
-        "invalid_range": [],
-        "unreadable": [],
-    }
-
-    for root, _, files in os.walk(image_dir):
-        for filename in files:
-            if not filename.lower().endswith(valid_ext):
-                continue
-            path = os.path.join(root, filename)
-            img = cv2.imread(path, cv2.IMREAD_COLOR)
-            if img is None:
-                results["unreadable"].append(path)
-                continue
-
-            min_val = float(np.min(img))
-            max_val = float(np.max(img))
-
-            # Check if in the standard [0, 255] uint8 range
-            if img.dtype == np.uint8 and 0 <= min_val <= 255 and 0 <= max_val <= 255:
-                results["valid_range"].append(f"{path} (range=[{min_val:.0f}, {max_val:.0f}])")
-            else:
-                results["invalid_range"].append(
-                    f"{path} (range=[{min_val:.4f}, {max_val:.4f}], dtype={img.dtype})"
-                )
-    return results
-
-def print_pixel_range_report(results: Dict[str, List[str]]) -> None:
-    total_checked = len(results["valid_range"]) + len(results["invalid_range"]) + len(results["unreadable"])
-    print(f"📊 Total files checked: {total_checked}")
+        records: Optional[List[Dict]] = None,
+        cache: Optional[AuditCache] = None,
+        table: Optional[AuditTable] = None,
+) -> AuditTable:
+    if table is None:
+        if records is None:
+            records = run_audit(image_dir, valid_ext=valid_ext, cache=cache)
+        table = AuditTable.from_records(records)
+    return table.flag_issues(low_variance_thresh=None, valid_ext=valid_ext)
+
+def print_pixel_range_report(table: AuditTable) -> None:
+    unreadable = table[table.has_issue("unreadable")]
+    invalid = table[table.has_issue("invalid_range")]
+    valid = int((table["readable"] & table["decoded"] & ~table.has_issue("invalid_range")).sum())
+    print(f"📊 Total files checked: {valid + len(invalid) + len(unreadable)}")
     print()
 
-    if results["valid_range"]:
-        print(f"✅ Valid [0, 255] range ({len(results['valid_range'])} images)")
-    if results["invalid_range"]:
-        print(f"❌ Invalid/Unexpected range ({len(results['invalid_range'])}):")
-        for e in results["invalid_range"]:
-            print(e)
-    if results["unreadable"]:
-        print(f"❌ Unreadable ({len(results['unreadable'])}):")
-        for e in results["unreadable"]:
-            print(e)
-    if not results["invalid_range"] and not results["unreadable"]:
+    if valid > 0:
+        print(f"✅ Valid [0, 255] range ({valid} images)")
+    if len(invalid):
+        print(f"❌ Invalid/Unexpected range ({len(invalid)}):")
+        for path, dtype, lo, hi in zip(invalid["path"], invalid["dtype"], invalid["min"], invalid["max"]):
+            value_range = "empty" if np.isnan(lo) else f"{lo:.4f}, {hi:.4f}"
+            print(f"{path} (range=[{value_range}], dtype={dtype or 'none'})")
+    if len(unreadable):
+        print(f"❌ Unreadable ({len(unreadable)}):")
+        for path in unreadable["path"]:
+            print(path)
+    if not len(invalid) and not len(unreadable):
         print("✅ All images are in standard [0, 255] uint8 range")
 
 #Functions to check for image quality and remove low-quality pictures
@@ -357,119 +313,82 @@ def check_image_quality(
     image_dir: str,
     min_size: Tuple[int, int] = (64, 64),
     max_aspect_ratio: float = 5.0,
-    low_variance_thresh: float = 3.0,
+    low_variance_thresh: Optional[float] = 3.0,
     valid_ext: Tuple[str, ...] = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"),
-) -> Dict[str, List[str]]:
-
-    issues: Dict[str, List[str]] = {
-        "unreadable": [],
-        "zero_size": [],
-        "too_small": [],
-        "extreme_aspect": [],
-        "low_variance": [],
-    }
-
-    min_w, min_h = min_size
-
-    for root, _, files in os.walk(image_dir):
-        for file in files:
-            if not file.lower().endswith(valid_ext):
-                continue
-            path = os.path.join(root, file)
-
-            img = cv2.imread(path, cv2.IMREAD_COLOR)
-            if img is None:
-                issues["unreadable"].append(path)
-                continue
-
-            h, w = img.shape[:2]
-            if w == 0 or h == 0:
-                issues["zero_size"].append(path)
-                continue
-
-            if w < min_w or h < min_h:
-                issues["too_small"].append(f"{path} ({w}x{h})")
-
-            ar = max(w / h, h / w)
-            if ar > max_aspect_ratio:
-                issues["extreme_aspect"].append(f"{path} (AR={ar:.2f}, {w}x{h})")
-
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            var = float(np.var(gray))
-            if var < low_variance_thresh:
-                issues["low_variance"].append(f"{path} (var={var:.2f})")
-
-    return issues
-
-def print_quality_report(issues: Dict[str, List[str]]) -> None:
-    any_issues = any(issues.values())
-    if not any_issues:
+    records: Optional[List[Dict]] = None,
+    cache: Optional[AuditCache] = None,
+    table: Optional[AuditTable] = None,
+) -> AuditTable:
+    """
+    Returns the audit table with its issue flags set for these thresholds. Pass table= (e.g.
+    AuditTable.load(AUDIT_TABLE_PATH)) to re-check with other thresholds without re-scanning.
+    """
+    if table is None:
+        if records is None:
+            # Size and aspect checks only need headers; decode only when the variance check is on
+            records = run_audit(image_dir, valid_ext=valid_ext, cache=cache, pixels=low_variance_thresh is not None)
+        table = AuditTable.from_records(records)
+    return table.flag_issues(min_size, max_aspect_ratio, low_variance_thresh, valid_ext)
+
+def _issue_detail(table: AuditTable, i: int, issue: str) -> str:
+    w, h = table["width"][i], table["height"][i]
+    if issue == "too_small":
+        return f" ({w}x{h})"
+    if issue == "extreme_aspect":
+        return f" (AR={table['aspect'][i]:.2f}, {w}x{h})"
+    if issue == "low_variance":
+        return f" (var={table['variance'][i]:.2f})"
+    return ""
+
+def print_quality_report(table: AuditTable) -> None:
+    if not table.has_issue(*QUALITY_ISSUES).any():
         print("✅ No obvious image quality issues found")
         return
 
-    for key in ["unreadable", "zero_size", "too_small", "extreme_aspect", "low_variance"]:
-        entries = issues.get(key, [])
-        if entries:
+    for key in QUALITY_ISSUES:
+        rows = np.flatnonzero(table.has_issue(key))
+        if len(rows):
             title = key.replace("_", " ").title()
-            print(f"❌ {title} ({len(entries)}):")
-            for e in entries:
-                print(e)
+            print(f"❌ {title} ({len(rows)}):")
+            for i in rows:
+                print(f"{table['path'][i]}{_issue_detail(table, i, key)}")
 
 def remove_low_quality_images(
-    issues: Dict[str, List[str]],
+    table: AuditTable,
     issue_types_to_remove: List[str] = None,
     label_dir: str = None,
+    quarantine_dir: str = None,
 ) -> None:
     """
     Remove images with quality issues and their corresponding label files.
     Shows all files and asks for confirmation once before deleting.
 
     Args:
-        issues: Dict returned by check_image_quality.
+        table: AuditTable returned by check_image_quality.
         issue_types_to_remove: List of issue types to remove (e.g., ['too_small', 'unreadable']).
-                                If None, removes all issue types.
+                                If None, removes all quality issue types.
         label_dir: Directory containing label files. If None, assumes labels are in a sibling
                    'labels' directory (e.g., images in 'train/images', labels in 'train/labels').
+        quarantine_dir: If set, files are moved to <quarantine_dir>/<split>/images|labels instead of deleted.
     """
     if issue_types_to_remove is None:
-        issue_types_to_remove = list(issues.keys())
-
-    files_to_delete = []
-    for issue_type in issue_types_to_remove:
-        if issue_type in issues:
-            for entry in issues[issue_type]:
-                # Extract just the path (entries may have extra info like "(640x480)")
-                path = entry.split(" (")[0]
-                files_to_delete.append((path, issue_type))
+        issue_types_to_remove = list(QUALITY_ISSUES)
 
-    if not files_to_delete:
+    # One mask over the whole table instead of parsing paths back out of report strings
+    selected = table[table.has_issue(*issue_types_to_remove)]
+    if not len(selected):
         print("No files to delete.")
         return
 
     print(f"\n{'='*70}")
-    print(f"Found {len(files_to_delete)} images with quality issues")
+    print(f"Found {len(selected)} images with quality issues")
     print(f"{'='*70}\n")
 
-    # Prepare all file pairs
-    all_pairs = []
-    for img_path, issue_type in files_to_delete:
-        # Find the corresponding label file
-        if label_dir:
-            img_basename = os.path.basename(img_path)
-            label_name = os.path.splitext(img_basename)[0] + ".txt"
-            label_path = os.path.join(label_dir, label_name)
-        else:
-            img_dir = os.path.dirname(img_path)
-            label_dir_auto = img_dir.replace("/images", "/labels").replace("\\images", "\\labels")
-            img_basename = os.path.basename(img_path)
-            label_name = os.path.splitext(img_basename)[0] + ".txt"
-            label_path = os.path.join(label_dir_auto, label_name)
-
-        all_pairs.append((img_path, label_path, issue_type))
-
     # Display all files
-    for idx, (img_path, label_path, issue_type) in enumerate(all_pairs, 1):
-        print(f"{idx}. Issue: {issue_type}")
+    label_paths = selected.label_paths(label_dir)
+    for idx, (img_path, label_path) in enumerate(zip(selected["path"], label_paths), 1):
+        issues = [name for name in selected.issue_names(idx - 1) if name in issue_types_to_remove]
+        print(f"{idx}. Issue: {', '.join(issues)}")
         print(f"   Image: {img_path}")
         if os.path.exists(label_path):
             print(f"   Label: {label_path}")
@@ -478,78 +397,82 @@ def remove_low_quality_images(
         print()
 
     # Ask for confirmation at once
+    action = f"Move to {quarantine_dir}" if quarantine_dir else "Delete"
     print(f"{'='*70}")
-    response = input(f"Delete all {len(files_to_delete)} images and their labels? (y/yes/n/no): ").strip().lower()
+    response = input(f"{action} all {len(selected)} images and their labels? (y/yes/n/no): ").strip().lower()
 
     if response not in ['y', 'yes']:
         print("\n🛑 Deletion cancelled by user.")
         return
 
-    # Delete all files
-    deleted_images = 0
-    deleted_labels = 0
-
     print(f"\n{'='*70}")
-    print("Deleting files...")
+    print("Moving files..." if quarantine_dir else "Deleting files...")
     print(f"{'='*70}\n")
 
-    for img_path, label_path, _ in all_pairs:
-        # Delete image
-        if os.path.exists(img_path):
-            try:
-                os.remove(img_path)
-                deleted_images += 1
-                print(f"✓ Deleted: {img_path}")
-            except Exception as e:
-                print(f"✗ Error deleting {img_path}: {e}")
-
-        # Delete label
-        if os.path.exists(label_path):
-            try:
-                os.remove(label_path)
-                deleted_labels += 1
-                print(f"✓ Deleted: {label_path}")
-            except Exception as e:
-                print(f"✗ Error deleting {label_path}: {e}")
+    done = remove_table_files(selected, label_dir, quarantine_dir)
+    for path in done["images"] + done["labels"]:
+        print(f"✓ {'Moved' if quarantine_dir else 'Deleted'}: {path}")
+    for message in done["failed"]:
+        print(f"✗ Error: {message}")
 
     # Summary
+    verb = "moved" if quarantine_dir else "deleted"
     print(f"\n{'='*70}")
     print("SUMMARY")
     print(f"{'='*70}")
-    print(f"Total images deleted: {deleted_images}")
-    print(f"Total labels deleted: {deleted_labels}")
+    print(f"Total images {verb}: {len(done['images'])}")
+    print(f"Total labels {verb}: {len(done['labels'])}")
     print(f"{'='*70}\n")
 
-#Check for duplicate filenames in the directory below
-DATASET_DIRECTORY = "../dataset"
-find_duplicate_filenames(DATASET_DIRECTORY)
-
-#Check if all images in the following directory are readable
-check_images("../dataset/test/images")
-
-#Check if all images have their corresponding label
-check_labels("../dataset/test/images", "../dataset/test/labels")
-
-#Check if all labels in the following directory are in YOLO format
-validate_annotations("../dataset/test/labels")
-
-#Check if all images in the following directory are in the expected size
-check_image_sizes("../dataset/test/images", ask_delete=True)
-
-#Check if all images in the following directory are in the expected pixel range -- Normalization check
-target_dir = "../dataset/test/images"
-res = check_pixel_range(target_dir)
-print_pixel_range_report(res)
-
-#Check if all images in the following directory are of good quality and remove low-quality pictures
-results = check_image_quality(
-    target_dir,
-    min_size=(400, 400),
-    max_aspect_ratio=6.0,
-    low_variance_thresh=2.0,
-)
-print_quality_report(results)
-remove_low_quality_images(
-    results,
-    issue_types_to_remove=["too_small"]
-)
\ No newline at end of file
+if __name__ == "__main__":
+    #Check for duplicate filenames in the directory below
+    DATASET_DIRECTORY = "../dataset"
+    find_duplicate_filenames(DATASET_DIRECTORY)
+
+    #Open the persistent audit cache so only new or changed images and labels are re-checked
+    cache = AuditCache(AUDIT_CACHE_PATH)
+
+    #Check for near-duplicate images (and train/test leakage) across the whole dataset
+    find_near_duplicates(DATASET_DIRECTORY, cache=cache)
+
+    #Probe every image header in the following directory once, shared by the readability and size checks below
+    target_dir = "../dataset/test/images"
+    records = run_audit(target_dir, cache=cache, pixels=False)
+
+    #Check if all images in the following directory are readable
+    check_images(target_dir, records=records)
+
+    #Check if all images have their corresponding label
+    check_labels("../dataset/test/images", "../dataset/test/labels")
+
+    #Check if all labels of every split are in YOLO format, through their packed, memory-mapped label stores
+    for split in ["train", "valid", "test"]:
+        print(f"\n🏷️  {split} labels:")
+        check_label_store(os.path.join(DATASET_DIRECTORY, split))
+
+    #Check if all images in the following directory are in the expected size
+    check_image_sizes(target_dir, ask_delete=True, records=records)
+
+    #Decode every remaining image once for the pixel-level checks below (pixel range and variance)
+    #and keep the results as a table, saved so other thresholds can be tried later without a re-scan
+    table = AuditTable.from_records(run_audit(target_dir, cache=cache))
+    table.save(AUDIT_TABLE_PATH)
+
+    #Check if all images in the following directory are in the expected pixel range -- Normalization check
+    res = check_pixel_range(target_dir, table=table)
+    print_pixel_range_report(res)
+
+    #Check if all images in the following directory are of good quality and remove low-quality pictures
+    results = check_image_quality(
+        target_dir,
+        min_size=(400, 400),
+        max_aspect_ratio=6.0,
+        low_variance_thresh=2.0,
+        table=table,
+    )
+    print_quality_report(results)
+    cache.close()
+    remove_low_quality_images(
+        results,
+        issue_types_to_remove=["too_small"]
+    )
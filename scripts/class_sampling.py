@@ -0,0 +1,144 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dataset_audit import collect_image_paths
+from label_store import LabelStore, build_label_store, store_path_for
+
+# --- Paths ---
+TRAIN_DIR = "../dataset/train"
+VALID_DIR = "../dataset/valid"
+BALANCED_DIR = "../dataset/balanced"
+
+MAX_REPEAT = 4.0
+
+
+#Function to build the image -> class index of a split from its packed label store
+def image_class_index(split_dir: str, num_classes: int) -> Tuple[List[str], np.ndarray]:
+    """
+    Returns (image paths, presence) where presence is a bool (n_images, num_classes) array of
+    which classes appear in each image. The label store is refreshed first (only changed
+    .txt files are re-parsed); images without a label file have no classes.
+    """
+    store = LabelStore(build_label_store(os.path.join(split_dir, "labels"), store_path_for(split_dir))["store"])
+    images = sorted(collect_image_paths(os.path.join(split_dir, "images")))
+    row_of = {name: i for i, name in enumerate(store.names)}
+    label_rows = np.array([row_of.get(os.path.splitext(os.path.basename(p))[0] + ".txt", -1) for p in images],
+                          dtype=np.int64)
+
+    # Per-box (store row, class), scattered into the image x class matrix in one step
+    box_rows = np.repeat(np.arange(len(store)), store.counts())
+    classes = store.boxes[:, 0].astype(np.int64)
+    valid = (classes >= 0) & (classes < num_classes)
+    by_row = np.zeros((len(store), num_classes), dtype=bool)
+    by_row[box_rows[valid], classes[valid]] = True
+
+    presence = np.zeros((len(images), num_classes), dtype=bool)
+    has_label = label_rows >= 0
+    presence[has_label] = by_row[label_rows[has_label]]
+    return images, presence
+
+
+#Function to compute LVIS-style repeat factors per image, with an extra boost for weak classes
+def repeat_factors(
+    presence: np.ndarray,
+    threshold: Optional[float] = None,
+    weak_classes: Sequence[int] = (),
+    weak_boost: float = 2.0,
+    max_repeat: float = MAX_REPEAT,
+) -> np.ndarray:
+    """
+    A class seen in a share f of images gets r_c = max(1, sqrt(threshold / f)) (LVIS); the
+    default threshold is the average share of the classes, so only rarer-than-average classes
+    are repeated. Weak classes are multiplied by weak_boost. Each image is repeated by the
+    largest r_c of its classes (capped at max_repeat); background images keep 1.
+    """
+    share = presence.mean(0) if len(presence) else np.zeros(presence.shape[1])
+    if threshold is None:
+        threshold = float(share[share > 0].mean()) if (share > 0).any() else 0.0
+    class_factor = np.maximum(1.0, np.sqrt(threshold / np.maximum(share, 1e-12)))
+    class_factor[share == 0] = 1.0
+    class_factor[list(weak_classes)] *= weak_boost
+    per_image = np.where(presence, class_factor[None, :], 1.0).max(1) if presence.shape[1] else np.ones(len(presence))
+    return np.minimum(per_image, max_repeat)
+
+
+#Function to turn fractional repeat factors into whole repeat counts (stochastic rounding, seeded)
+def repeat_counts(factors: np.ndarray, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    whole = np.floor(factors)
+    return (whole + (rng.random(len(factors)) < factors - whole)).astype(np.int64)
+
+
+def class_instances(presence: np.ndarray, counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """Images containing each class, optionally weighted by how often each image is repeated."""
+    weights = np.ones(len(presence)) if counts is None else counts
+    return (presence * weights[:, None]).sum(0).astype(np.int64)
+
+
+#Function to write an oversampled training list and a data.yaml that trains on it
+def write_balanced_data(
+    images: Sequence[str],
+    counts: np.ndarray,
+    names: Sequence[str],
+    out_dir: str = BALANCED_DIR,
+    val_dir: str = VALID_DIR,
+    extra_images: Sequence[str] = (),
+) -> str:
+    """
+    Ultralytics accepts a .txt list of image paths as a split and keeps repeated entries, so
+    oversampling needs no copies: train.txt lists each image counts[i] times (absolute paths,
+    labels are found next to the images as usual), followed by extra_images once each (e.g.
+    offline-augmented variants). Returns the data.yaml path.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    list_path = os.path.abspath(os.path.join(out_dir, "train.txt"))
+    order = np.repeat(np.arange(len(images)), counts)
+    with open(list_path, "w") as f:
+        f.writelines(os.path.abspath(images[i]) + "\n" for i in order)
+        f.writelines(os.path.abspath(path) + "\n" for path in extra_images)
+
+    yaml_path = os.path.join(out_dir, "data.yaml")
+    with open(yaml_path, "w") as f:
+        f.write(f"train: {list_path}\n")
+        f.write(f"val: {os.path.abspath(os.path.join(val_dir, 'images'))}\n\n")
+        f.write(f"nc: {len(names)}\n")
+        f.write(f"names: {list(names)}\n")
+    return yaml_path
+
+
+#Function to build a class-balanced training set that oversamples images with weak classes
+def build_balanced_data(
+    names: Sequence[str],
+    weak_classes: Sequence[int] = (),
+    train_dir: str = TRAIN_DIR,
+    val_dir: str = VALID_DIR,
+    out_dir: str = BALANCED_DIR,
+    threshold: Optional[float] = None,
+    weak_boost: float = 2.0,
+    max_repeat: float = MAX_REPEAT,
+    seed: int = 0,
+    extra_images: Sequence[str] = (),
+) -> Dict:
+    """Returns the data.yaml path and the per-class image counts before and after oversampling."""
+    images, presence = image_class_index(train_dir, len(names))
+    factors = repeat_factors(presence, threshold, weak_classes, weak_boost, max_repeat)
+    counts = repeat_counts(factors, seed)
+    return {
+        "data": write_balanced_data(images, counts, names, out_dir, val_dir, extra_images),
+        "images": len(images),
+        "samples": int(counts.sum()) + len(extra_images),
+        "before": class_instances(presence),
+        "after": class_instances(presence, counts),
+    }
+
+
+def print_balance_report(summary: Dict, names: Sequence[str], weak_classes: Sequence[int] = ()) -> None:
+    print(f"\n⚖️ Class-balanced training list: {summary['images']} images -> {summary['samples']} samples per epoch")
+    print(f"  {'Class':12} {'images':>7} {'sampled':>8} {'share before':>13} {'share after':>12}")
+    before, after = summary["before"], summary["after"]
+    for c, name in enumerate(names):
+        flag = "  🎯" if c in weak_classes else ""
+        print(f"  {name:12} {before[c]:7d} {after[c]:8d} {before[c] / max(before.sum(), 1):13.1%} "
+              f"{after[c] / max(after.sum(), 1):12.1%}{flag}")
+    print(f"  data: {summary['data']}")
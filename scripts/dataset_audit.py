@@ -0,0 +1,546 @@
+import os
+import cv2
+import hashlib
+import json
+import sqlite3
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from image_header import probe_image_header
+from yolo_labels import list_label_files, validate_label_files
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+AUDIT_CACHE_PATH = "../dataset/.audit_cache.sqlite"
+AUDIT_CACHE_VERSION = 3
+
+IMAGE_FIELDS = ("readable", "decoded", "width", "height", "dtype", "min", "max", "variance")
+
+
+#Function to collect every image path under a directory in a single walk
+def collect_image_paths(image_dir: str, valid_ext: Tuple[str, ...] = IMAGE_EXTENSIONS) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(image_dir):
+        for file in files:
+            if file.lower().endswith(valid_ext):
+                paths.append(os.path.join(root, file))
+    return paths
+
+
+#Function to hash file contents so re-exported but identical files still hit the cache
+def file_digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+#Function to audit one image: dimensions from the header, pixel statistics only when asked for
+def audit_image(path: str, with_hash: bool = False, pixels: bool = True) -> Dict:
+    """
+    Returns a record with the image's dimensions and structural validity (from the
+    JPEG/PNG header, no decode). With pixels=True the image is also decoded once for its
+    dtype, min/max pixel values and grayscale variance. Runs inside the pool workers.
+    """
+    record = {
+        "path": path,
+        "readable": False,
+        "decoded": False,
+        "width": None,
+        "height": None,
+        "dtype": None,
+        "min": None,
+        "max": None,
+        "variance": None,
+    }
+
+    size = probe_image_header(path)
+    if size is not None:
+        record.update(readable=True, width=int(size[0]), height=int(size[1]))
+
+    if not pixels and not with_hash:
+        return record
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return record
+
+    if with_hash:
+        record["sha1"] = file_digest(data)
+    if not pixels:
+        return record
+
+    record["decoded"] = True
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data else None
+    if img is None:
+        record["readable"] = False
+        return record
+
+    h, w = img.shape[:2]
+    record.update(readable=True, dtype=str(img.dtype))
+    if record["width"] is None:
+        record.update(width=int(w), height=int(h))
+    if w == 0 or h == 0:
+        return record
+
+    record["min"] = float(np.min(img))
+    record["max"] = float(np.max(img))
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    record["variance"] = float(np.var(gray))
+    return record
+
+
+#Persistent on-disk cache of per-image and per-label-file audit results
+class AuditCache:
+    """
+    SQLite-backed cache keyed by absolute path + file size + mtime.
+    With use_hash=True a size/mtime mismatch falls back to comparing a SHA-1 of the
+    contents, so files that were only touched or re-copied are not audited again.
+    """
+
+    def __init__(self, path: str = AUDIT_CACHE_PATH, use_hash: bool = False):
+        self.path = path
+        self.use_hash = use_hash
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != AUDIT_CACHE_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS images; DROP TABLE IF EXISTS labels; DROP TABLE IF EXISTS hashes;")
+            self.conn.execute(f"PRAGMA user_version = {AUDIT_CACHE_VERSION}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT,
+                readable INTEGER, decoded INTEGER, width INTEGER, height INTEGER, dtype TEXT,
+                min REAL, max REAL, variance REAL
+            );
+            CREATE TABLE IF NOT EXISTS labels (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT,
+                num_classes INTEGER, boxes BLOB, errors TEXT
+            );
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT,
+                dhash TEXT, phash TEXT
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def prune(self, table: str, directory: str, seen_paths: List[str]) -> int:
+        """
+        Deletes the table's rows for files under directory that the latest scan did not see
+        (deleted or renamed), so the cache does not grow as exports are swapped. Returns the count.
+        """
+        prefix = os.path.join(os.path.abspath(directory), "")
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM seen")
+        self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((os.path.abspath(p),) for p in seen_paths))
+        # substr instead of LIKE: file names may contain the % and _ wildcards
+        removed = self.conn.execute(
+            f"DELETE FROM {table} WHERE substr(path, 1, ?) = ? AND path NOT IN (SELECT path FROM seen)",
+            (len(prefix), prefix),
+        ).rowcount
+        self.conn.execute("DELETE FROM seen")
+        self.conn.commit()
+        return removed
+
+    def _is_fresh(self, table: str, path: str, size: int, mtime_ns: int, stored: Tuple) -> bool:
+        stored_size, stored_mtime, stored_sha1 = stored[:3]
+        if stored_size == size and stored_mtime == mtime_ns:
+            return True
+        if not self.use_hash or stored_sha1 is None or stored_size != size:
+            return False
+        with open(path, "rb") as f:
+            if file_digest(f.read()) != stored_sha1:
+                return False
+        # Same contents, new mtime: refresh the key so the next run skips the hash
+        self.conn.execute(f"UPDATE {table} SET mtime_ns = ? WHERE path = ?", (mtime_ns, os.path.abspath(path)))
+        return True
+
+    def lookup_images(self, paths: List[str], pixels: bool = True) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Splits paths into cached records (by path) and paths that need auditing.
+        With pixels=True, header-only records count as misses.
+        """
+        hits, misses = {}, []
+        for path in paths:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, sha1, " + ", ".join(f'"{c}"' for c in IMAGE_FIELDS)
+                + " FROM images WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+            try:
+                size, mtime_ns = self._stat(path)
+            except OSError:
+                misses.append(path)
+                continue
+            if row is None or not self._is_fresh("images", path, size, mtime_ns, row):
+                misses.append(path)
+                continue
+            record = {"path": path}
+            record.update(zip(IMAGE_FIELDS, row[3:]))
+            record["readable"] = bool(record["readable"])
+            record["decoded"] = bool(record["decoded"])
+            if pixels and not record["decoded"]:
+                misses.append(path)
+                continue
+            hits[path] = record
+        return hits, misses
+
+    def store_images(self, records: List[Dict]) -> None:
+        rows = []
+        for r in records:
+            try:
+                size, mtime_ns = self._stat(r["path"])
+            except OSError:
+                continue
+            rows.append((os.path.abspath(r["path"]), size, mtime_ns, r.get("sha1"))
+                        + tuple(r[c] for c in IMAGE_FIELDS))
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO images VALUES ({', '.join('?' * (4 + len(IMAGE_FIELDS)))})", rows
+        )
+        self.conn.commit()
+
+    def lookup_label(self, path: str, num_classes: int) -> Optional[Tuple[np.ndarray, List[str]]]:
+        """Returns (boxes, errors) for an unchanged label file, or None. Boxes are (n, 5): class, cx, cy, w, h."""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha1, num_classes, boxes, errors FROM labels WHERE path = ?",
+            (os.path.abspath(path),),
+        ).fetchone()
+        if row is None or row[3] != num_classes:
+            return None
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return None
+        if not self._is_fresh("labels", path, size, mtime_ns, row):
+            return None
+        return np.frombuffer(row[4], dtype=np.float64).reshape(-1, 5), json.loads(row[5])
+
+    def store_label(self, path: str, num_classes: int, boxes: np.ndarray, errors: List[str]) -> None:
+        try:
+            size, mtime_ns = self._stat(path)
+        except OSError:
+            return
+        sha1 = None
+        if self.use_hash:
+            with open(path, "rb") as f:
+                sha1 = file_digest(f.read())
+        self.conn.execute(
+            "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(path), size, mtime_ns, sha1, num_classes,
+             np.ascontiguousarray(boxes, dtype=np.float64).tobytes(), json.dumps(errors)),
+        )
+
+    def lookup_hashes(self, paths: List[str]) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+        """Splits paths into cached (dhash, phash) pairs and paths that need hashing."""
+        hits, misses = {}, []
+        for path in paths:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, sha1, dhash, phash FROM hashes WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+            try:
+                size, mtime_ns = self._stat(path)
+            except OSError:
+                misses.append(path)
+                continue
+            if row is None or row[3] is None or not self._is_fresh("hashes", path, size, mtime_ns, row):
+                misses.append(path)
+                continue
+            hits[path] = (int(row[3], 16), int(row[4], 16))
+        return hits, misses
+
+    def store_hashes(self, hashes: List[Tuple[str, Optional[int], Optional[int]]]) -> None:
+        """Stores (path, dhash, phash) triples; 64-bit hashes are kept as hex text."""
+        rows = []
+        for path, dhash, phash in hashes:
+            if dhash is None:
+                continue
+            try:
+                size, mtime_ns = self._stat(path)
+            except OSError:
+                continue
+            sha1 = None
+            if self.use_hash:
+                with open(path, "rb") as f:
+                    sha1 = file_digest(f.read())
+            rows.append((os.path.abspath(path), size, mtime_ns, sha1, f"{dhash:016x}", f"{phash:016x}"))
+        self.conn.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+
+#Function to audit a whole image tree: one walk, one decode per image, spread over a process pool
+def run_audit(
+    image_dir: str,
+    workers: Optional[int] = None,
+    chunksize: int = 32,
+    valid_ext: Tuple[str, ...] = IMAGE_EXTENSIONS,
+    cache: Optional[AuditCache] = None,
+    pixels: bool = True,
+) -> List[Dict]:
+    """
+    Returns one record per image (see audit_image) in os.walk order.
+    The records can be passed to every check in check-dataset.py so no image is decoded twice.
+    With pixels=False only headers are read (I/O-bound, so a thread pool is used);
+    with a cache, only new or changed images are probed or decoded.
+    """
+    paths = collect_image_paths(image_dir, valid_ext)
+    removed = cache.prune("images", image_dir, paths) if cache is not None else 0
+    if not paths:
+        return []
+
+    cached, todo = cache.lookup_images(paths, pixels) if cache is not None else ({}, paths)
+
+    worker = partial(audit_image, with_hash=cache is not None and cache.use_hash, pixels=pixels)
+    workers = min(workers or os.cpu_count() or 1, max(len(todo), 1))
+    if workers == 1:
+        fresh = [worker(p) for p in todo]
+    else:
+        executor = ProcessPoolExecutor if pixels else ThreadPoolExecutor
+        with executor(max_workers=workers) as pool:
+            fresh = list(pool.map(worker, todo, chunksize=chunksize))
+
+    if cache is not None:
+        cache.store_images(fresh)
+        print(f"🗂️  Audit cache: {len(cached)} unchanged, {len(fresh)} new or changed images, "
+              f"{removed} removed")
+
+    cached.update((r["path"], r) for r in fresh)
+    return [cached[p] for p in paths]
+
+
+#Function to validate every label file in a directory, re-reading only new or changed files
+def run_label_audit(
+    label_dir: str,
+    num_classes: int = 6,
+    cache: Optional[AuditCache] = None,
+) -> Tuple[int, np.ndarray, List[str]]:
+    """
+    Returns (files checked, boxes, error messages). boxes is the (N, 6) array from
+    yolo_labels (image index, class, cx, cy, w, h) covering every file, cached or not.
+    """
+    label_paths = list_label_files(label_dir)
+
+    file_boxes: List[Optional[np.ndarray]] = [None] * len(label_paths)
+    file_errors: List[List[str]] = [[] for _ in label_paths]
+    todo = []
+    for idx, label_path in enumerate(label_paths):
+        hit = cache.lookup_label(label_path, num_classes) if cache is not None else None
+        if hit is None:
+            todo.append(idx)
+        else:
+            file_boxes[idx], file_errors[idx] = hit
+
+    # Parse and validate everything that changed in one vectorized batch
+    boxes, errors = validate_label_files([label_paths[i] for i in todo], num_classes)
+    per_file = np.bincount(boxes[:, 0].astype(np.int64), minlength=len(todo))
+    split_boxes = np.split(boxes[:, 1:], np.cumsum(per_file)[:-1]) if todo else []
+    for j, idx in enumerate(todo):
+        file_boxes[idx] = split_boxes[j]
+        file_errors[idx] = errors[j]
+        if cache is not None:
+            cache.store_label(label_paths[idx], num_classes, file_boxes[idx], errors[j])
+
+    if cache is not None:
+        removed = cache.prune("labels", label_dir, label_paths)
+        print(f"🗂️  Audit cache: {len(label_paths) - len(todo)} unchanged, {len(todo)} new or changed label files, "
+              f"{removed} removed")
+
+    counts = [len(b) for b in file_boxes]
+    all_boxes = np.zeros((sum(counts), 6))
+    if counts:
+        all_boxes[:, 0] = np.repeat(np.arange(len(label_paths)), counts)
+        all_boxes[:, 1:] = np.concatenate(file_boxes)
+    all_errors = [e for errs in file_errors for e in errs]
+    return len(label_paths), all_boxes, all_errors
+
+
+# Issue flags of an AuditTable, one bit each in its "issues" column
+ISSUES = ("unreadable", "zero_size", "too_small", "extreme_aspect", "low_variance", "invalid_range")
+QUALITY_ISSUES = ISSUES[:5]
+AUDIT_TABLE_PATH = "../dataset/.audit_table.npz"
+
+# Column name -> dtype; missing numbers are NaN, missing strings ""
+AUDIT_COLUMNS = {
+    "path": np.str_,
+    "split": np.str_,
+    "dtype": np.str_,
+    "readable": np.bool_,
+    "decoded": np.bool_,
+    "width": np.int32,
+    "height": np.int32,
+    "aspect": np.float32,
+    "variance": np.float64,
+    "min": np.float64,
+    "max": np.float64,
+    "issues": np.uint8,
+}
+
+
+def issue_bit(name: str) -> int:
+    return 1 << ISSUES.index(name)
+
+
+#Function to get the dataset split (train/valid/test) an image belongs to
+def split_of(path: str) -> str:
+    parts = os.path.normpath(path).split(os.sep)
+    if "images" in parts:
+        idx = len(parts) - 1 - parts[::-1].index("images")
+        if idx > 0:
+            return parts[idx - 1]
+    return os.path.basename(os.path.dirname(path))
+
+
+#Typed, columnar table of audit records: one NumPy array per column, filtered and flagged without re-scanning
+class AuditTable:
+    """
+    Built from run_audit() records (or loaded from .npz / .parquet). flag_issues() sets the
+    "issues" bitmask for a set of thresholds; calling it again with other thresholds only
+    recomputes the mask into a new table. Indexing with a bool mask, index array or slice returns a sub-table.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in AUDIT_COLUMNS.items()}
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "AuditTable":
+        def column(key, missing):
+            return [missing if r[key] is None else r[key] for r in records]
+
+        width = np.array(column("width", 0), dtype=np.int32)
+        height = np.array(column("height", 0), dtype=np.int32)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aspect = np.maximum(width, height) / np.minimum(width, height)
+        return cls({
+            "path": [r["path"] for r in records],
+            "split": [split_of(r["path"]) for r in records],
+            "dtype": column("dtype", ""),
+            "readable": [r["readable"] for r in records],
+            "decoded": [r["decoded"] for r in records],
+            "width": width,
+            "height": height,
+            "aspect": np.where(np.isfinite(aspect), aspect, np.nan),
+            "variance": column("variance", np.nan),
+            "min": column("min", np.nan),
+            "max": column("max", np.nan),
+            "issues": np.zeros(len(records), dtype=np.uint8),
+        })
+
+    def __len__(self) -> int:
+        return len(self.columns["path"])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return AuditTable({name: values[key] for name, values in self.columns.items()})
+
+    def has_issue(self, *names: str) -> np.ndarray:
+        """Bool mask of rows with any of the named issues (any issue at all when no name is given)."""
+        bits = sum(issue_bit(name) for name in names) if names else (1 << len(ISSUES)) - 1
+        return (self.columns["issues"] & bits) != 0
+
+    def issue_names(self, i: int) -> List[str]:
+        return [name for name in ISSUES if self.columns["issues"][i] & issue_bit(name)]
+
+    def sort(self, column: str, descending: bool = False) -> "AuditTable":
+        order = np.argsort(self.columns[column], kind="stable")
+        return self[order[::-1] if descending else order]
+
+    #Function to (re)compute the issue flags for a set of thresholds, all rows at once
+    def flag_issues(
+        self,
+        min_size: Tuple[int, int] = (64, 64),
+        max_aspect_ratio: float = 5.0,
+        low_variance_thresh: Optional[float] = 3.0,
+        valid_ext: Tuple[str, ...] = IMAGE_EXTENSIONS,
+    ) -> "AuditTable":
+        """
+        Size and aspect need only headers; low_variance and invalid_range only apply to decoded
+        rows. Rows whose extension is not in valid_ext get no flags. Returns a new table that
+        shares every other column with this one.
+        """
+        c = self.columns
+        checked = np.char.endswith(np.char.lower(c["path"]), valid_ext[0])
+        for ext in valid_ext[1:]:
+            checked |= np.char.endswith(np.char.lower(c["path"]), ext)
+        readable = checked & c["readable"]
+        sized = readable & (c["width"] > 0) & (c["height"] > 0)
+
+        flags = {
+            "unreadable": checked & ~c["readable"],
+            "zero_size": readable & ~sized,
+            "too_small": sized & ((c["width"] < min_size[0]) | (c["height"] < min_size[1])),
+            "extreme_aspect": sized & (c["aspect"] > max_aspect_ratio),
+            "low_variance": sized & (c["variance"] < low_variance_thresh) if low_variance_thresh is not None
+            else np.zeros(len(self), dtype=bool),
+            # Anything but a uint8 image within [0, 255]; an empty decode has no min/max at all
+            "invalid_range": readable & c["decoded"] & ~((c["dtype"] == "uint8") & (c["min"] >= 0) & (c["max"] <= 255)),
+        }
+        issues = np.zeros(len(self), dtype=np.uint8)
+        for name, mask in flags.items():
+            issues[mask] |= issue_bit(name)
+        return AuditTable(dict(c, issues=issues))
+
+    #Function to save the table as compressed .npz, or .parquet when pyarrow is installed
+    def save(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            pq.write_table(pa.table(self.columns), path)
+        else:
+            np.savez_compressed(path, **self.columns)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "AuditTable":
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            return cls({name: np.asarray(values) for name, values in pq.read_table(path).to_pydict().items()})
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in AUDIT_COLUMNS})
+
+    def label_paths(self, label_dir: Optional[str] = None) -> List[str]:
+        """Label file of every row: in label_dir, or the sibling labels folder of the image's images folder."""
+        paths = []
+        for path in self.columns["path"].tolist():
+            folder = label_dir or os.path.dirname(path).replace("/images", "/labels").replace("\\images", "\\labels")
+            paths.append(os.path.join(folder, os.path.splitext(os.path.basename(path))[0] + ".txt"))
+        return paths
+
+
+#Function to delete (or move to a quarantine folder) every image of a table and its label file
+def remove_table_files(table: AuditTable, label_dir: Optional[str] = None,
+                       quarantine_dir: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Quarantined files keep their <split>/images or <split>/labels sub-path, so they can be moved
+    back. Returns the "images" and "labels" that were removed and the "failed" messages.
+    """
+    done: Dict[str, List[str]] = {"images": [], "labels": [], "failed": []}
+    label_paths = table.label_paths(label_dir)
+    for image_path, label_path, split in zip(table["path"].tolist(), label_paths, table["split"].tolist()):
+        for kind, path in (("images", image_path), ("labels", label_path)):
+            if not os.path.exists(path):
+                continue
+            try:
+                if quarantine_dir:
+                    target = os.path.join(quarantine_dir, split, kind, os.path.basename(path))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(path, target)
+                else:
+                    os.remove(path)
+                done[kind].append(path)
+            except OSError as e:
+                done["failed"].append(f"{path}: {e}")
+    return done
@@ -0,0 +1,239 @@
+import os
+import shutil
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dataset_audit import IMAGE_EXTENSIONS, collect_image_paths
+from image_header import probe_image_header
+
+# --- Paths ---
+DATASET_DIR = "../dataset"
+TIERS_DIR = "../dataset/tiers"
+SPLITS = ("train", "valid", "test")
+DEFAULT_TIERS = (320, 512, 640)
+
+JPEG_QUALITY = 95
+LETTERBOX_COLOR = 114
+
+
+#Function to get a split folder of a tier, e.g. ../dataset/tiers/640/train
+def tier_split_dir(tiers_dir: str, size: int, split: str, letterbox: bool = False) -> str:
+    return os.path.join(tiers_dir, f"{size}{'-letterbox' if letterbox else ''}", split)
+
+
+def _is_fresh(src: str, dst: str) -> bool:
+    # Outputs carry their source's mtime, so an unchanged source means an up-to-date output
+    try:
+        return os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)  # same bytes, no extra disk space
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _write_image(path: str, img: np.ndarray) -> None:
+    ext = os.path.splitext(path)[1].lower()
+    params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY] if ext in (".jpg", ".jpeg") else []
+    tmp = f"{path}.tmp{ext}"
+    if not cv2.imwrite(tmp, img, params):
+        raise OSError(f"Could not write {path}")
+    os.replace(tmp, path)
+
+
+def _decode_for(path: str, long_side: int, target: int) -> Optional[np.ndarray]:
+    # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale in the DCT domain; use the smallest that stays >= target
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if long_side // factor >= target:
+            img = cv2.imread(path, flag)
+            if img is not None:
+                return img
+    return cv2.imread(path, cv2.IMREAD_COLOR)
+
+
+def _letterbox_labels(src: str, dst: str, w: int, h: int, size: int) -> None:
+    """Rewrites normalized YOLO boxes of a w x h image for its size x size letterboxed copy."""
+    scale = min(size / w, size / h)
+    new_w, new_h = round(w * scale), round(h * scale)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    with open(src) as f:
+        lines = f.read().splitlines()
+    out = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) != 5:
+            out.append(line)  # leave malformed lines for validate_annotations to report
+            continue
+        cx, cy, bw, bh = (float(p) for p in parts[1:])
+        cx, cy = (cx * new_w + pad_x) / size, (cy * new_h + pad_y) / size
+        bw, bh = bw * new_w / size, bh * new_h / size
+        out.append(f"{parts[0]} {cx:.6f} {cy:.6f} {bw:.6f} {bh:.6f}")
+    tmp = dst + ".tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(out) + ("\n" if out else ""))
+    os.replace(tmp, dst)
+
+
+#Worker: produce one image (and its label) in every tier that is missing or stale
+def build_tier_item(task: Tuple[str, Optional[str], List[Tuple[int, str, Optional[str]]], bool]) -> Dict:
+    """
+    task is (source image, source label or None, [(size, image out, label out or None)], letterbox).
+    The source is decoded at most once, from the largest tier down, and only when some tier
+    actually needs a resized copy; images already within a tier are linked unchanged.
+    """
+    src, label_src, outputs, letterbox = task
+    result = {"path": src, "actions": {}, "error": None}
+    todo = [(size, dst, label_dst) for size, dst, label_dst in outputs
+            if not _is_fresh(src, dst) or (label_dst and label_src and not _is_fresh(label_src, label_dst))]
+    if not todo:
+        return result
+
+    dims = probe_image_header(src)
+    img = None
+    try:
+        for size, dst, label_dst in sorted(todo, key=lambda t: t[0], reverse=True):
+            if dims is None:
+                img = img if img is not None else cv2.imread(src, cv2.IMREAD_COLOR)
+                if img is None:
+                    result["error"] = "unreadable image"
+                    return result
+                dims = (img.shape[1], img.shape[0])
+            w, h = dims
+
+            if max(w, h) <= size and not letterbox:
+                _link_or_copy(src, dst)
+                result["actions"][size] = "linked"
+            else:
+                if img is None:
+                    img = _decode_for(src, max(w, h), size)
+                    if img is None:
+                        result["error"] = "unreadable image"
+                        return result
+                scale = min(size / w, size / h, 1.0 if not letterbox else float("inf"))
+                new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+                resized = img if (img.shape[1], img.shape[0]) == (new_w, new_h) else cv2.resize(
+                    img, (new_w, new_h), interpolation=cv2.INTER_AREA if new_w < img.shape[1] else cv2.INTER_LINEAR)
+                if letterbox:
+                    canvas = np.full((size, size, 3), LETTERBOX_COLOR, dtype=np.uint8)
+                    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+                    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+                    resized = canvas
+                _write_image(dst, resized)
+                # Smaller tiers are resized from this one (cheaper than from the full-size source)
+                img = resized if not letterbox else img
+                result["actions"][size] = "written"
+            os.utime(dst, ns=(os.stat(src).st_atime_ns, os.stat(src).st_mtime_ns))
+
+            if label_dst and label_src:
+                # Normalized YOLO boxes survive a plain resize; only letterboxing moves them
+                if letterbox:
+                    _letterbox_labels(label_src, label_dst, w, h, size)
+                else:
+                    _link_or_copy(label_src, label_dst)
+                st = os.stat(label_src)
+                os.utime(label_dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def _remove_stale(out_dir: str, keep: set) -> int:
+    removed = 0
+    if os.path.isdir(out_dir):
+        for name in os.listdir(out_dir):
+            if name not in keep:
+                os.remove(os.path.join(out_dir, name))
+                removed += 1
+    return removed
+
+
+def write_tier_yaml(tier_dir: str, names: Sequence[str], splits: Sequence[str] = SPLITS) -> str:
+    """Writes data.yaml for a tier; paths are relative to the yaml, which Ultralytics resolves."""
+    keys = {"train": "train", "valid": "val", "test": "test"}
+    lines = [f"path: {os.path.abspath(tier_dir)}"]
+    lines += [f"{keys.get(split, split)}: {split}/images" for split in splits]
+    lines += ["", f"nc: {len(names)}", f"names: {list(names)}"]
+    path = os.path.join(tier_dir, "data.yaml")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def read_class_names(data_yaml: str) -> List[str]:
+    import yaml
+
+    with open(data_yaml) as f:
+        return list(yaml.safe_load(f)["names"])
+
+
+#Function to build (or refresh) the resized tiers of every split in parallel
+def build_tiers(
+    dataset_dir: str = DATASET_DIR,
+    tiers_dir: str = TIERS_DIR,
+    sizes: Sequence[int] = DEFAULT_TIERS,
+    splits: Sequence[str] = SPLITS,
+    letterbox: bool = False,
+    workers: Optional[int] = None,
+) -> Dict:
+    """
+    Tier N holds every image with its long side scaled down to N (smaller images are hard-linked
+    unchanged, so no image is dropped) and the matching labels. With letterbox=True every image
+    is padded to N x N and its labels are rescaled to match. Only new or changed sources are
+    processed, and outputs whose source disappeared are removed. Returns the image count, the
+    errors and, per tier, how many images were written, linked, unchanged or removed.
+    """
+    tasks = []
+    keep: Dict[Tuple[int, str, str], set] = {}
+    for split in splits:
+        image_dir = os.path.join(dataset_dir, split, "images")
+        label_dir = os.path.join(dataset_dir, split, "labels")
+        if not os.path.isdir(image_dir):
+            continue
+        for size in sizes:
+            out = tier_split_dir(tiers_dir, size, split, letterbox)
+            os.makedirs(os.path.join(out, "images"), exist_ok=True)
+            os.makedirs(os.path.join(out, "labels"), exist_ok=True)
+            keep[(size, split, "images")] = set()
+            keep[(size, split, "labels")] = set()
+
+        for src in sorted(collect_image_paths(image_dir, IMAGE_EXTENSIONS)):
+            name = os.path.basename(src)
+            label_name = os.path.splitext(name)[0] + ".txt"
+            label_src = os.path.join(label_dir, label_name)
+            label_src = label_src if os.path.exists(label_src) else None
+            outputs = []
+            for size in sizes:
+                out = tier_split_dir(tiers_dir, size, split, letterbox)
+                keep[(size, split, "images")].add(name)
+                if label_src:
+                    keep[(size, split, "labels")].add(label_name)
+                outputs.append((size, os.path.join(out, "images", name),
+                                os.path.join(out, "labels", label_name) if label_src else None))
+            tasks.append((src, label_src, outputs, letterbox))
+
+    summary = {
+        "images": len(tasks),
+        "errors": [],
+        "tiers": {size: {"written": 0, "linked": 0, "unchanged": 0, "removed": 0} for size in sizes},
+    }
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(build_tier_item, tasks, chunksize=16):
+            if result["error"]:
+                summary["errors"].append(f"{result['path']}: {result['error']}")
+            for size in sizes:
+                summary["tiers"][size][result["actions"].get(size, "unchanged")] += 1
+
+    for (size, split, kind), names in keep.items():
+        out_dir = os.path.join(tier_split_dir(tiers_dir, size, split, letterbox), kind)
+        summary["tiers"][size]["removed"] += _remove_stale(out_dir, names)
+    return summary
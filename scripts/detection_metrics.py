@@ -0,0 +1,161 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+# IoU thresholds of mAP50-95 (COCO), the same ten Ultralytics uses
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+# np.trapz was renamed to np.trapezoid in NumPy 2.0
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+#Function to compute the IoU of box pairs a[i], b[i] (both xyxy)
+def paired_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    lt = np.maximum(a[:, :2], b[:, :2])
+    rb = np.minimum(a[:, 2:], b[:, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(-1)
+    area_a = (a[:, 2:] - a[:, :2]).prod(-1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(-1)
+    return inter / (area_a + area_b - inter + 1e-9)
+
+
+#Function to mark which predictions are true positives at each IoU threshold, for all images at once
+def match_predictions(preds: np.ndarray, gt: np.ndarray, iou_thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    preds is (n, 7): image, x1, y1, x2, y2, conf, class; gt is (m, 6): image, class, x1, y1, x2, y2.
+    Returns a bool array (n, n_thresholds) in the order of preds. Like Ultralytics, each
+    ground-truth box is matched to at most one prediction of the same class, highest IoU first.
+    Every same-image (prediction, ground truth) pair is scored in one vectorized pass.
+    """
+    tp = np.zeros((len(preds), len(iou_thresholds)), dtype=bool)
+    if not len(preds) or not len(gt):
+        return tp
+    pred_img, gt_img = preds[:, 0].astype(np.int64), gt[:, 0].astype(np.int64)
+    n_images = max(pred_img.max(), gt_img.max()) + 1
+    gt_order = np.argsort(gt_img, kind="stable")
+    gt_count = np.bincount(gt_img, minlength=n_images)
+    gt_start = np.cumsum(gt_count) - gt_count
+
+    # All pairs: each prediction against every ground-truth box of its image
+    per_pred = gt_count[pred_img]
+    pred_idx = np.repeat(np.arange(len(preds)), per_pred)
+    within = np.arange(len(pred_idx)) - np.repeat(np.cumsum(per_pred) - per_pred, per_pred)
+    gt_idx = gt_order[gt_start[pred_img][pred_idx] + within]
+    same_class = preds[pred_idx, 6].astype(np.int64) == gt[gt_idx, 1].astype(np.int64)
+    pred_idx, gt_idx = pred_idx[same_class], gt_idx[same_class]
+    iou = paired_iou(preds[pred_idx, 1:5], gt[gt_idx, 2:6])
+
+    for k, threshold in enumerate(iou_thresholds):
+        keep = iou >= threshold
+        p, g, v = pred_idx[keep], gt_idx[keep], iou[keep]
+        if not len(p):
+            continue
+        # Highest IoU first; one ground truth per prediction, then one prediction per ground truth
+        order = np.argsort(-v, kind="stable")
+        p, g, v = p[order], g[order], v[order]
+        _, first = np.unique(p, return_index=True)
+        first.sort()
+        p, g = p[first], g[first]
+        _, first = np.unique(g, return_index=True)
+        tp[p[first], k] = True
+    return tp
+
+
+def _average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    # Area under the precision envelope, sampled at 101 recall points (COCO)
+    r = np.concatenate(([0.0], recall, [1.0]))
+    p = np.flip(np.maximum.accumulate(np.flip(np.concatenate(([1.0], precision, [0.0])))))
+    x = np.linspace(0, 1, 101)
+    return float(_trapezoid(np.interp(x, r, p), x))
+
+
+#Function to turn matched predictions into per-class precision, recall, AP50 and AP50-95
+def per_class_metrics(tp: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray, gt_cls: np.ndarray,
+                      num_classes: int, conf_thres: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    tp is (n_pred, n_thresholds) from match_predictions. Precision and recall (at IoU 0.5) are
+    read at conf_thres, e.g. the confidence a deployment uses, or by default at the single
+    confidence that maximizes the mean F1 over classes, as Ultralytics reports them. Returns
+    arrays of length num_classes (instances, precision, recall, f1, ap50, ap) plus that
+    confidence; classes without instances get AP 0.
+    """
+    order = np.argsort(-conf, kind="stable")
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+    instances = np.bincount(gt_cls.astype(np.int64), minlength=num_classes)[:num_classes]
+
+    grid = np.linspace(0, 1, 1000)
+    p_curve = np.zeros((num_classes, len(grid)))
+    r_curve = np.zeros((num_classes, len(grid)))
+    ap = np.zeros((num_classes, tp.shape[1]))
+    for c in range(num_classes):
+        mask = pred_cls == c
+        if not mask.any() or not instances[c]:
+            continue
+        tpc = np.cumsum(tp[mask], axis=0)
+        fpc = np.cumsum(~tp[mask], axis=0)
+        recall = tpc / instances[c]
+        precision = tpc / (tpc + fpc)
+        # Curves over confidence (descending in the data, so interpolate on the negated axis)
+        r_curve[c] = np.interp(-grid, -conf[mask], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-grid, -conf[mask], precision[:, 0], left=1)
+        for k in range(tp.shape[1]):
+            ap[c, k] = _average_precision(recall[:, k], precision[:, k])
+
+    if conf_thres is None:
+        f1_curve = 2 * p_curve * r_curve / (p_curve + r_curve + 1e-16)
+        # Ultralytics smooths the mean F1 curve with a 10% box filter before picking its peak
+        kernel = np.ones(round(len(grid) * 0.1) // 2 * 2 + 1)
+        mean_f1 = np.convolve(np.pad(f1_curve.mean(0), len(kernel) // 2, mode="edge"), kernel / len(kernel), "valid")
+        best = int(mean_f1.argmax())
+        precision, recall, conf_thres = p_curve[:, best], r_curve[:, best], float(grid[best])
+    else:
+        # Exact counts of the boxes a deployment at conf_thres would keep
+        kept = conf >= conf_thres
+        tp_kept = np.bincount(pred_cls[kept], weights=tp[kept, 0], minlength=num_classes)[:num_classes]
+        n_kept = np.bincount(pred_cls[kept], minlength=num_classes)[:num_classes]
+        precision = np.divide(tp_kept, n_kept, out=np.zeros(num_classes), where=n_kept > 0)
+        recall = np.divide(tp_kept, instances, out=np.zeros(num_classes), where=instances > 0)
+    f1 = 2 * precision * recall / (precision + recall + 1e-16)
+    return {
+        "instances": instances,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "ap50": ap[:, 0],
+        "ap": ap.mean(1),
+        "conf": float(conf_thres),
+    }
+
+
+#Function to average per-class metrics over the classes that have ground-truth boxes
+def overall_metrics(classes: Dict[str, np.ndarray]) -> Dict[str, float]:
+    present = classes["instances"] > 0
+    if not present.any():
+        return {"precision": 0.0, "recall": 0.0, "map50": 0.0, "map": 0.0}
+    return {
+        "precision": float(classes["precision"][present].mean()),
+        "recall": float(classes["recall"][present].mean()),
+        "map50": float(classes["ap50"][present].mean()),
+        "map": float(classes["ap"][present].mean()),
+    }
+
+
+#Function to score one model's predictions on a whole set of images
+def evaluate_predictions(preds: np.ndarray, gt: np.ndarray, num_classes: int,
+                         iou_thresholds: Sequence[float] = IOU_THRESHOLDS,
+                         conf_thres: Optional[float] = None) -> Dict:
+    """
+    preds is (n, 7): image, x1, y1, x2, y2, conf, class (batch_inference.PREDICTION_COLUMNS);
+    gt is (m, 6): image, class, x1, y1, x2, y2, in the same pixel space. Returns
+    {"classes": per_class_metrics(...), "overall": overall_metrics(...)}. Pure NumPy, so
+    cached predictions can be re-scored at another conf_thres or IoU thresholds in well
+    under a second.
+    """
+    tp = match_predictions(preds, gt, np.asarray(iou_thresholds))
+    classes = per_class_metrics(tp, preds[:, 5], preds[:, 6].astype(np.int64), gt[:, 1], num_classes, conf_thres)
+    return {"classes": classes, "overall": overall_metrics(classes)}
+
+
+#Function to list the classes (that have ground truth) whose precision or recall is below target
+def weak_classes(classes: Dict[str, np.ndarray], min_precision: float = 0.7, min_recall: float = 0.6) -> List[int]:
+    weak = (classes["precision"] < min_precision) | (classes["recall"] < min_recall)
+    return np.flatnonzero(weak & (classes["instances"] > 0)).tolist()
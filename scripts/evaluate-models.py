@@ -0,0 +1,50 @@
+import argparse
+
+from detection_metrics import weak_classes
+from model_eval import VALID_DIR, evaluate_models, expand_weights, print_class_table, print_model_diff, save_eval
+
+# --- Paths ---
+RUNS = [
+    "runs/detect/AI-In-Robotics-CPU-Exp80",
+    "runs/detect/AI-In-Robotics-CPU-Exp81",
+    "runs/detect/AI-In-Robotics-CPU-Exp83",
+    "runs/detect/AI-In-Robotics-CPU-Exp84",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-class P/R/mAP of several checkpoints on one shared decode of a split")
+    parser.add_argument("--weights", nargs="+", default=RUNS,
+                        help=".pt files or run folders (a run folder means its weights/best.pt)")
+    parser.add_argument("--epochs", action="store_true", help="also score the epoch*.pt files saved by save_period")
+    parser.add_argument("--split", default=VALID_DIR, help="split folder with images/ and labels/")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--workers", type=int, default=2, help="checkpoints evaluated in parallel")
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--conf", type=float, default=None,
+                        help="report P/R at this confidence (default: the max-F1 confidence, like model.val)")
+    parser.add_argument("--min-precision", type=float, default=0.7, help="classes below this are flagged as weak")
+    parser.add_argument("--min-recall", type=float, default=0.6, help="classes below this are flagged as weak")
+    parser.add_argument("--baseline", default=None, help="checkpoint the others are compared with (default: the first)")
+    parser.add_argument("--out", default=None, help="run folder (default: runs/eval/<timestamp>)")
+    args = parser.parse_args()
+
+    weights = expand_weights(args.weights, epochs=args.epochs)
+    if not weights:
+        print("❌ No checkpoints found")
+        return
+    results = evaluate_models(weights, args.split, args.imgsz, args.workers, args.batch, conf_thres=args.conf)
+    print_class_table(results)
+    for w, res in results.items():
+        weak = weak_classes(res["classes"], args.min_precision, args.min_recall)
+        if weak:
+            print(f"🚨 Weak classes of {w}: {', '.join(res['names'][i] for i in weak)}")
+    if len(results) > 1:
+        baseline = expand_weights([args.baseline])[0] if args.baseline else None
+        print_model_diff(results, baseline)
+    run_dir = save_eval(results, args.out)
+    print(f"\n✅ Per-class table saved to: {run_dir}/classes.csv")
+
+
+if __name__ == "__main__":
+    main()
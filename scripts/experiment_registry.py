@@ -0,0 +1,261 @@
+import csv
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+# --- Paths ---
+PROJECT_DIR = "runs/detect"
+REGISTRY_PATH = "runs/experiments.sqlite"
+REGISTRY_VERSION = 2
+
+EXPERIMENT_PREFIX = "AI-In-Robotics-CPU-Exp"
+STATUSES = ("queued", "running", "finished", "failed", "interrupted")
+
+# Ultralytics' checkpoint fitness: 0.1 * mAP50 + 0.9 * mAP50-95
+MAP50_COLUMN = "metrics/mAP50(B)"
+MAP_COLUMN = "metrics/mAP50-95(B)"
+
+
+def fitness(map50: float, map50_95: float) -> float:
+    return 0.1 * map50 + 0.9 * map50_95
+
+
+#Function to read a run's results.csv into one dict per epoch (Ultralytics pads column names with spaces)
+def read_results_csv(path: str) -> List[Dict[str, float]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as f:
+        rows = []
+        for row in csv.DictReader(f):
+            parsed = {}
+            for key, value in row.items():
+                try:
+                    parsed[key.strip()] = float(value)
+                except (TypeError, ValueError):
+                    continue
+            rows.append(parsed)
+        return rows
+
+
+def read_args_yaml(path: str) -> Dict:
+    import yaml
+
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+#Function to summarize a run folder: epochs done, best epoch and its metrics, checkpoints present
+def summarize_run(run_dir: str) -> Dict:
+    rows = read_results_csv(os.path.join(run_dir, "results.csv"))
+    summary = {"epochs_done": len(rows), "best_epoch": None, "best_map50": None, "best_map50_95": None,
+               "train_seconds": rows[-1].get("time") if rows else None}
+    scored = [r for r in rows if MAP_COLUMN in r]
+    if scored:
+        best = max(scored, key=lambda r: fitness(r.get(MAP50_COLUMN, 0.0), r[MAP_COLUMN]))
+        summary.update(best_epoch=int(best.get("epoch", 0)), best_map50=best.get(MAP50_COLUMN),
+                       best_map50_95=best[MAP_COLUMN])
+    weights = os.path.join(run_dir, "weights")
+    summary["best_weights"] = os.path.join(weights, "best.pt") if os.path.exists(os.path.join(weights, "best.pt")) else None
+    summary["last_weights"] = os.path.join(weights, "last.pt") if os.path.exists(os.path.join(weights, "last.pt")) else None
+    return summary
+
+
+def _checkpoint_finished(path: str) -> Optional[bool]:
+    """
+    Ultralytics strips the optimizer from last.pt and sets its epoch to -1 once training ends
+    (all epochs done or early stop). None when there is no checkpoint or torch is unavailable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        import torch
+
+        ckpt = torch.load(path, map_location="cpu", weights_only=False)
+    except Exception:
+        return None
+    return ckpt.get("epoch") == -1 or ckpt.get("optimizer") is None
+
+
+#Function to decide whether a run's training has ended: all epochs done, early-stopped, or a final checkpoint
+def training_finished(run_dir: str, args: Optional[Dict] = None, summary: Optional[Dict] = None) -> bool:
+    args = args if args is not None else read_args_yaml(os.path.join(run_dir, "args.yaml"))
+    summary = summary or summarize_run(run_dir)
+    epochs, done = int(args.get("epochs") or 0), summary["epochs_done"]
+    if epochs > 0 and done >= epochs:
+        return True
+    # EarlyStopping ends training once `patience` epochs pass without a new best fitness
+    patience = int(args.get("patience") or 0)
+    if patience > 0 and summary["best_epoch"] is not None and done - summary["best_epoch"] >= patience:
+        return True
+    return bool(_checkpoint_finished(os.path.join(run_dir, "weights", "last.pt")))
+
+
+#SQLite registry of experiments: names, lifecycle status, configs, and an index of args.yaml / results.csv
+class ExperimentRegistry:
+    """
+    One row per experiment (name, number, status, config, run folder, best metrics) and one
+    row per args.yaml key, so runs can be searched by any training argument with an indexed
+    lookup instead of opening every run folder. Only experiments added with register() are
+    queued work; run folders that were just indexed are never resumed automatically.
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH, project_dir: str = PROJECT_DIR):
+        self.path = path
+        self.project_dir = project_dir
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != REGISTRY_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS experiments; DROP TABLE IF EXISTS args;")
+            self.conn.execute(f"PRAGMA user_version = {REGISTRY_VERSION}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS experiments (
+                name TEXT PRIMARY KEY, number INTEGER, status TEXT, config TEXT, run_dir TEXT,
+                created REAL, updated REAL, restarts INTEGER DEFAULT 0, error TEXT, registered INTEGER DEFAULT 0,
+                epochs_done INTEGER, best_epoch INTEGER, best_map50 REAL, best_map50_95 REAL,
+                train_seconds REAL, best_weights TEXT, last_weights TEXT
+            );
+            CREATE TABLE IF NOT EXISTS args (
+                name TEXT, key TEXT, value TEXT, PRIMARY KEY (name, key)
+            );
+            CREATE INDEX IF NOT EXISTS args_by_value ON args (key, value);
+            CREATE INDEX IF NOT EXISTS experiments_by_status ON experiments (status);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    @staticmethod
+    def number_of(name: str) -> Optional[int]:
+        match = re.match(rf"{re.escape(EXPERIMENT_PREFIX)}(\d+)", name)
+        return int(match.group(1)) if match else None
+
+    #Function to get the next free experiment name, e.g. AI-In-Robotics-CPU-Exp504-Finetune
+    def next_name(self, suffix: str = "") -> str:
+        numbers = [self.number_of(os.path.basename(d)) for d in glob.glob(os.path.join(self.project_dir, "*"))]
+        numbers += [row[0] for row in self.conn.execute("SELECT number FROM experiments")]
+        number = max([n for n in numbers if n is not None], default=0) + 1
+        return f"{EXPERIMENT_PREFIX}{number}{'-' + suffix if suffix else ''}"
+
+    def register(self, config: Dict, name: Optional[str] = None, suffix: str = "") -> str:
+        """Adds a queued experiment (an existing name keeps its status and run folder) and returns its name."""
+        name = name or config.get("name") or self.next_name(suffix)
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO experiments (name, number, status, config, run_dir, created, updated, registered) "
+            "VALUES (?, ?, 'queued', ?, ?, ?, ?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET config = excluded.config, registered = 1",
+            (name, self.number_of(name), json.dumps(dict(config, name=name)),
+             os.path.join(self.project_dir, name), now, now))
+        self.conn.commit()
+        return name
+
+    def set_status(self, name: str, status: str, error: Optional[str] = None, restart: bool = False) -> None:
+        self.conn.execute("UPDATE experiments SET status = ?, error = ?, updated = ?, restarts = restarts + ? "
+                          "WHERE name = ?", (status, error, time.time(), int(restart), name))
+        self.conn.commit()
+
+    def get(self, name: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM experiments WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row else None
+
+    def config(self, name: str) -> Dict:
+        row = self.get(name)
+        return json.loads(row["config"]) if row and row["config"] else {}
+
+    #Function to (re)index one run folder's args.yaml and results.csv
+    def index_run(self, run_dir: str) -> Dict:
+        name = os.path.basename(os.path.normpath(run_dir))
+        summary = summarize_run(run_dir)
+        args = read_args_yaml(os.path.join(run_dir, "args.yaml"))
+        now = time.time()
+        finished = bool(args) and training_finished(run_dir, args, summary)
+        self.conn.execute(
+            "INSERT INTO experiments (name, number, status, config, run_dir, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO NOTHING",
+            (name, self.number_of(name), "finished" if finished else "interrupted", json.dumps(args),
+             run_dir, os.path.getmtime(run_dir), now))
+        self.conn.execute(
+            "UPDATE experiments SET epochs_done = ?, best_epoch = ?, best_map50 = ?, best_map50_95 = ?, "
+            "train_seconds = ?, best_weights = ?, last_weights = ?, updated = ? WHERE name = ?",
+            (summary["epochs_done"], summary["best_epoch"], summary["best_map50"], summary["best_map50_95"],
+             summary["train_seconds"], summary["best_weights"], summary["last_weights"], now, name))
+        if finished:
+            # e.g. an early-stopped run that an older index had recorded as interrupted
+            self.conn.execute("UPDATE experiments SET status = 'finished' WHERE name = ? AND status != 'running'",
+                              (name,))
+        self.conn.execute("DELETE FROM args WHERE name = ?", (name,))
+        self.conn.executemany("INSERT INTO args (name, key, value) VALUES (?, ?, ?)",
+                              [(name, key, json.dumps(value)) for key, value in args.items()])
+        self.conn.commit()
+        return dict(summary, name=name)
+
+    def index_all(self) -> List[Dict]:
+        """Indexes every run folder under the project folder that has an args.yaml."""
+        return [self.index_run(os.path.dirname(p))
+                for p in sorted(glob.glob(os.path.join(self.project_dir, "*", "args.yaml")))]
+
+    #Function to find experiments by status and training arguments, best mAP50-95 first
+    def search(self, status: Optional[str] = None, **args) -> List[Dict]:
+        """e.g. search(imgsz=512, optimizer="AdamW"); argument values are compared as YAML/JSON scalars."""
+        query = "SELECT e.* FROM experiments e"
+        params: List = []
+        for i, (key, value) in enumerate(args.items()):
+            query += f" JOIN args a{i} ON a{i}.name = e.name AND a{i}.key = ? AND a{i}.value = ?"
+            params += [key, json.dumps(value)]
+        if status:
+            query += " WHERE e.status = ?"
+            params.append(status)
+        query += " ORDER BY e.best_map50_95 IS NULL, e.best_map50_95 DESC"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def best_weights(self, **args) -> Optional[str]:
+        """best.pt of the highest mAP50-95 experiment that still has its weights."""
+        for row in self.search(**args):
+            if row["best_weights"] and os.path.exists(row["best_weights"]):
+                return row["best_weights"]
+        return None
+
+    def unfinished(self) -> List[Dict]:
+        """Registered experiments that still need (re)running; indexed-only run folders are left alone."""
+        rows = self.conn.execute("SELECT * FROM experiments WHERE status != 'finished' AND registered = 1 "
+                                 "ORDER BY created").fetchall()
+        return [dict(row) for row in rows]
+
+
+#Function to delete save_period checkpoints except the top-k epochs by fitness (best.pt and last.pt always stay)
+def prune_checkpoints(run_dir: str, keep_top_k: int = 3) -> Tuple[List[str], List[str]]:
+    """
+    Ultralytics writes weights/epoch{N}.pt with a 0-based N, matching results.csv epoch N + 1.
+    Checkpoints of epochs without metrics are kept. Returns (kept, removed) paths.
+    """
+    rows = {int(r["epoch"]): r for r in read_results_csv(os.path.join(run_dir, "results.csv")) if "epoch" in r}
+    checkpoints = []
+    for path in glob.glob(os.path.join(run_dir, "weights", "epoch*.pt")):
+        match = re.search(r"epoch(\d+)\.pt$", path)
+        if match:
+            checkpoints.append((int(match.group(1)), path))
+
+    scored = [(fitness(rows[n + 1].get(MAP50_COLUMN, 0.0), rows[n + 1].get(MAP_COLUMN, 0.0)), path)
+              for n, path in checkpoints if n + 1 in rows]
+    keep = {path for _, path in sorted(scored, reverse=True)[:keep_top_k]}
+    keep |= {path for n, path in checkpoints if n + 1 not in rows}
+    removed = []
+    for _, path in checkpoints:
+        if path not in keep:
+            os.remove(path)
+            removed.append(path)
+    return sorted(keep), removed
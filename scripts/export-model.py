@@ -0,0 +1,40 @@
+import argparse
+
+from model_backends import (BACKENDS, backend_available, compare_backends, export_backend,
+                            print_backend_comparison)
+
+# --- Paths ---
+MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp81/weights/best.pt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export best.pt to CPU runtimes (ONNX Runtime / OpenVINO, FP32 / INT8)")
+    parser.add_argument("--weights", default=MODEL_PATH)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS[1:],
+                        default=[b for b in BACKENDS[1:] if backend_available(b)],
+                        help="exports to build (default: every backend whose runtime is installed)")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640],
+                        help="input sizes to export; exports are static, one per size")
+    parser.add_argument("--calibration-images", type=int, default=300,
+                        help="validation images used to calibrate INT8 exports")
+    parser.add_argument("--force", action="store_true", help="re-export even if the export already exists")
+    parser.add_argument("--validate", action="store_true",
+                        help="compare every backend's mAP and latency against PyTorch on the validation set")
+    args = parser.parse_args()
+
+    if not args.backends:
+        print("❌ Neither onnxruntime nor openvino is installed; nothing to export.")
+        return
+
+    for imgsz in args.imgsz:
+        for backend in args.backends:
+            path = export_backend(args.weights, backend, imgsz, calibration_images=args.calibration_images,
+                                  force=args.force)
+            print(f"✅ {backend} ({imgsz}): {path}")
+
+        if args.validate:
+            print_backend_comparison(compare_backends(args.weights, args.backends, imgsz))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import struct
+import zlib
+from PIL import Image
+from typing import Optional, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+# Start-of-frame markers carrying the frame size (everything in C0-CF except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7}
+# Cameras and editors may append metadata or padding after EOI; search this far back for it
+JPEG_TRAILER_WINDOW = 64 * 1024
+
+
+#Function to read JPEG dimensions from the SOF segment and check the file is terminated by EOI
+def _probe_jpeg(f, file_size: int) -> Optional[Tuple[int, int]]:
+    if f.read(2) != b"\xff\xd8":
+        return None
+
+    size = None
+    while size is None:
+        byte = f.read(1)
+        if byte != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        m = marker[0]
+
+        if m in JPEG_STANDALONE_MARKERS:
+            continue
+        if m in (0xD9, 0xDA):  # EOI or start of scan before any frame header
+            return None
+
+        length_bytes = f.read(2)
+        if len(length_bytes) != 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if length < 2:
+            return None
+
+        if m in JPEG_SOF_MARKERS:
+            header = f.read(5)
+            if len(header) != 5:
+                return None
+            _, height, width = struct.unpack(">BHH", header)
+            size = (width, height)
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+    # Entropy-coded data escapes 0xFF, so an EOI after the frame header means the scan was not cut off
+    start = max(file_size - JPEG_TRAILER_WINDOW, f.tell())
+    f.seek(start)
+    if f.read().rfind(b"\xff\xd9") < 0:
+        return None
+    return size
+
+
+#Function to read PNG dimensions from a CRC-checked IHDR chunk and check the IEND trailer
+def _probe_png(f, file_size: int) -> Optional[Tuple[int, int]]:
+    if f.read(8) != PNG_SIGNATURE:
+        return None
+
+    chunk = f.read(25)  # length + type + 13 byte IHDR body + CRC
+    if len(chunk) != 25 or chunk[4:8] != b"IHDR":
+        return None
+    if struct.unpack(">I", chunk[0:4])[0] != 13:
+        return None
+    if zlib.crc32(chunk[4:21]) != struct.unpack(">I", chunk[21:25])[0]:
+        return None
+    width, height = struct.unpack(">II", chunk[8:16])
+
+    f.seek(max(file_size - len(PNG_IEND), 0))
+    if f.read() != PNG_IEND:
+        return None
+    return width, height
+
+
+#Function to get image dimensions without decoding any pixels
+def probe_image_header(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns (width, height) read from the file header, or None if the file is missing
+    or structurally broken. JPEG and PNG are parsed directly (SOF marker / IHDR chunk,
+    plus the EOI / IEND trailer); other formats fall back to PIL's lazy header read.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            magic = f.read(8)
+            f.seek(0)
+            if magic.startswith(b"\xff\xd8"):
+                return _probe_jpeg(f, file_size)
+            if magic == PNG_SIGNATURE:
+                return _probe_png(f, file_size)
+
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
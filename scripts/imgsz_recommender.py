@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+from dataset_audit import collect_image_paths
+from image_header import probe_image_header
+from label_store import LabelStore, build_label_store, store_path_for
+
+# Input sizes worth considering: multiples of the 32 px model stride
+CANDIDATE_SIZES = (256, 320, 384, 416, 448, 512, 576, 640, 768, 960, 1280)
+# Objects smaller than this (sqrt of the box area, in model-input pixels) are rarely detected
+MIN_OBJECT_PIXELS = 16
+SIZE_PERCENTILES = (5, 25, 50)
+
+
+#Function to get every labelled box of a split with its size in original image pixels
+def split_box_pixels(split_dir: str, workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns (cls, wh, image_wh): int64 (n,), float64 (n, 2) box width/height in pixels and
+    float64 (n, 2) width/height of the box's image. Labels come from the split's label store
+    (refreshed first); image sizes from file headers, without decoding pixels. Boxes whose
+    image is missing or unreadable are left out.
+    """
+    store = LabelStore(build_label_store(os.path.join(split_dir, "labels"), store_path_for(split_dir))["store"])
+    image_of = {os.path.splitext(os.path.basename(p))[0]: p
+                for p in collect_image_paths(os.path.join(split_dir, "images"))}
+    paths = [image_of.get(os.path.splitext(name)[0]) for name in store.names]
+    with ThreadPoolExecutor(max_workers=workers or min(16, (os.cpu_count() or 1) * 2)) as pool:
+        dims = list(pool.map(lambda p: probe_image_header(p) if p else None, paths))
+    image_wh = np.array([d if d else (0, 0) for d in dims], dtype=np.float64).reshape(-1, 2)
+
+    # Per-box image size in one repeat, then normalized -> pixel sizes for the whole split at once
+    box_image_wh = np.repeat(image_wh, store.counts(), axis=0)
+    keep = box_image_wh[:, 0] > 0
+    boxes = np.asarray(store.boxes)[keep]
+    return boxes[:, 0].astype(np.int64), boxes[:, 3:5] * box_image_wh[keep], box_image_wh[keep]
+
+
+#Function to get every box's size after letterboxing its image to each candidate input size
+def letterboxed_sizes(wh: np.ndarray, image_wh: np.ndarray, sizes: Sequence[int] = CANDIDATE_SIZES) -> np.ndarray:
+    """
+    Returns (len(sizes), n) object sizes, sqrt of the box area in model-input pixels. The letterbox
+    scale is size / longer image side, as in batch_inference.letterbox (small images are upscaled).
+    """
+    object_px = np.sqrt(wh[:, 0] * wh[:, 1])
+    return np.asarray(sizes, dtype=np.float64)[:, None] * (object_px / image_wh.max(axis=1))[None, :]
+
+
+#Function to tabulate, per class and candidate size, the share of objects above min_pixels and size percentiles
+def size_table(cls: np.ndarray, sizes_px: np.ndarray, num_classes: int, min_pixels: float = MIN_OBJECT_PIXELS,
+               percentiles: Sequence[int] = SIZE_PERCENTILES) -> Dict[str, np.ndarray]:
+    """
+    sizes_px is letterboxed_sizes() output. Returns instances (num_classes,), share_above
+    (n_sizes, num_classes) and percentiles (n_sizes, num_classes, len(percentiles)); classes
+    without boxes get NaN.
+    """
+    valid = (cls >= 0) & (cls < num_classes)
+    cls, sizes_px = cls[valid], sizes_px[:, valid]
+    onehot = np.zeros((len(cls), num_classes))
+    onehot[np.arange(len(cls)), cls] = 1.0
+    instances = onehot.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = (sizes_px >= min_pixels) @ onehot / instances
+
+    order = np.argsort(cls, kind="stable")
+    bounds = np.searchsorted(cls[order], np.arange(num_classes + 1))
+    by_class = sizes_px[:, order]
+    pct = np.full((len(sizes_px), num_classes, len(percentiles)), np.nan)
+    for c in range(num_classes):
+        if bounds[c + 1] > bounds[c]:
+            # (len(percentiles), n_sizes) for all candidate sizes in one call
+            pct[:, c] = np.percentile(by_class[:, bounds[c]:bounds[c + 1]], percentiles, axis=1).T
+    return {"instances": instances, "share_above": share, "percentiles": pct}
+
+
+#Function to pick the smallest candidate size keeping at least target_share of every class's objects above min_pixels
+def recommend_imgsz(table: Dict[str, np.ndarray], sizes: Sequence[int] = CANDIDATE_SIZES, target_share: float = 0.95,
+                    classes: Optional[Sequence[int]] = None) -> Dict:
+    """
+    classes limits the check to the classes a deployment cares about (default: every class with
+    boxes). Returns the overall size ("imgsz", None if even the largest candidate falls short)
+    and the smallest sufficient size per class ("per_class", None where none is).
+    """
+    share = table["share_above"]
+    classes = [c for c in (classes if classes is not None else range(share.shape[1]))
+               if table["instances"][c] > 0]
+    ok = share >= target_share
+    per_class = {c: (int(sizes[np.argmax(ok[:, c])]) if ok[:, c].any() else None) for c in classes}
+    enough = ok[:, classes].all(axis=1) if classes else np.ones(len(sizes), dtype=bool)
+    return {"imgsz": int(sizes[np.argmax(enough)]) if enough.any() else None, "per_class": per_class}
+
+
+def print_size_table(table: Dict[str, np.ndarray], names: Sequence[str], sizes: Sequence[int] = CANDIDATE_SIZES,
+                     min_pixels: float = MIN_OBJECT_PIXELS, recommendation: Optional[Dict] = None) -> None:
+    print(f"\n📐 Share of objects >= {min_pixels:g} px (sqrt of box area) after letterboxing")
+    print(f"  {'Class':12} {'Boxes':>6} " + " ".join(f"{s:>6}" for s in sizes))
+    for c, name in enumerate(names):
+        if not table["instances"][c]:
+            continue
+        shares = " ".join(f"{v * 100:5.1f}%" for v in table["share_above"][:, c])
+        print(f"  {name:12} {int(table['instances'][c]):6d} {shares}")
+
+    print("\n  Median object size (px) per input size")
+    for c, name in enumerate(names):
+        if not table["instances"][c]:
+            continue
+        medians = " ".join(f"{v:6.1f}" for v in table["percentiles"][:, c, SIZE_PERCENTILES.index(50)])
+        print(f"  {name:12} {'':6} {medians}")
+
+    if recommendation is not None:
+        print()
+        for c, size in recommendation["per_class"].items():
+            print(f"  {names[c]:12} needs {size if size else 'more than ' + str(sizes[-1])}")
+        if recommendation["imgsz"]:
+            print(f"✅ Recommended imgsz: {recommendation['imgsz']}")
+        else:
+            print(f"⚠️ No candidate up to {sizes[-1]} keeps enough objects large enough; consider sliced inference")
@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import platform
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from itertools import product
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence
+
+from batch_inference import letterbox
+from dataset_audit import collect_image_paths
+from model_backends import DATA_YAML, load_backend_model
+
+BENCHMARK_DIR = "runs/benchmark"
+BENCHMARK_SOURCE = "../dataset/test/images"
+
+# Column order of results.csv
+BENCHMARK_COLUMNS = (
+    "weights", "backend", "imgsz", "batch", "threads", "images",
+    "p50_ms", "p95_ms", "p99_ms", "per_image_ms", "throughput_ips", "map50", "map50_95", "error",
+)
+
+_THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+#Function to pin a fresh (spawned) worker's CPU threads; runs before torch is imported so OpenMP picks it up
+def set_worker_threads(threads: int) -> None:
+    for name in _THREAD_VARIABLES:
+        os.environ[name] = str(threads)
+
+
+def _load_inputs(source: str, count: int, imgsz: int) -> np.ndarray:
+    """Letterboxed RGB NCHW uint8 inputs, loaded before timing so disk I/O is not measured."""
+    import cv2
+
+    paths = sorted(collect_image_paths(source))
+    if len(paths) > count:
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, count).astype(int)]
+    inputs = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is not None:
+            inputs.append(letterbox(img, imgsz)[0][..., ::-1].transpose(2, 0, 1))
+    if not inputs:
+        return np.zeros((0, 3, imgsz, imgsz), dtype=np.uint8)
+    return np.ascontiguousarray(np.stack(inputs))
+
+
+def _time_batches(model, inputs: np.ndarray, batch: int, imgsz: int, warmup: int = 3) -> np.ndarray:
+    import torch
+
+    batches = [torch.from_numpy(inputs[i:i + batch]).float() / 255.0
+               for i in range(0, len(inputs) - batch + 1, batch)]
+    for tensor in batches[:warmup]:
+        model.predict(source=tensor, imgsz=imgsz, device="cpu", verbose=False)
+
+    times = []
+    for tensor in batches:
+        start = time.perf_counter()
+        model.predict(source=tensor, imgsz=imgsz, device="cpu", verbose=False)
+        times.append(time.perf_counter() - start)
+    return np.asarray(times)
+
+
+#Worker: test-split mAP of one (weights, backend) at every imgsz; accuracy does not depend on batch or threads
+def _accuracy_worker(weights: str, backend: str, imgsz_values: Sequence[int], data: str) -> Dict[int, Dict]:
+    accuracy = {}
+    for imgsz in imgsz_values:
+        try:
+            model = load_backend_model(weights, backend, imgsz)
+            metrics = model.val(data=data, split="test", imgsz=imgsz, batch=1 if backend != "pytorch" else 16,
+                                device="cpu", plots=False, verbose=False)
+            accuracy[imgsz] = {"map50": float(metrics.box.map50), "map50_95": float(metrics.box.map)}
+        except Exception as e:
+            accuracy[imgsz] = {"error": f"val failed: {e}"}
+    return accuracy
+
+
+#Worker: every imgsz x batch setting of one (weights, backend, threads) combination (latency only)
+def _benchmark_worker(weights: str, backend: str, threads: int, imgsz_values: Sequence[int],
+                      batch_values: Sequence[int], source: str, images: int) -> List[Dict]:
+    import torch
+
+    torch.set_num_threads(threads)
+    rows = []
+    for imgsz in imgsz_values:
+        base = {"weights": weights, "backend": backend, "imgsz": imgsz, "threads": threads}
+        try:
+            model = load_backend_model(weights, backend, imgsz)
+        except Exception as e:
+            rows.extend(dict(base, batch=b, error=f"load failed: {e}") for b in batch_values)
+            continue
+
+        inputs = _load_inputs(source, images, imgsz)
+        for batch in batch_values:
+            row = dict(base, batch=batch)
+            if backend != "pytorch" and batch != 1:
+                row["error"] = "exports have a static batch of 1"
+                rows.append(row)
+                continue
+            if len(inputs) < batch:
+                row["error"] = f"only {len(inputs)} images, fewer than one batch"
+                rows.append(row)
+                continue
+            times = _time_batches(model, inputs, batch, imgsz)
+            ms = times * 1000
+            row.update({
+                "images": len(times) * batch,
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "per_image_ms": float(ms.sum() / (len(times) * batch)),
+                "throughput_ips": float(len(times) * batch / times.sum()),
+            })
+            rows.append(row)
+    return rows
+
+
+def environment_info() -> Dict:
+    info = {"platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count()}
+    for package in ("torch", "ultralytics", "onnxruntime", "openvino", "opencv-python", "numpy"):
+        try:
+            info[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    return info
+
+
+#Function to run the full sweep; each thread count runs in its own fresh process
+def run_benchmark(
+    weights: Sequence[str],
+    backends: Sequence[str] = ("pytorch",),
+    imgsz_values: Sequence[int] = (320, 640),
+    batch_values: Sequence[int] = (1,),
+    thread_values: Sequence[int] = (4,),
+    source: str = BENCHMARK_SOURCE,
+    images: int = 200,
+    with_map: bool = True,
+    data: str = DATA_YAML,
+) -> List[Dict]:
+    """
+    Returns one row per (weights, backend, imgsz, batch, threads) with p50/p95/p99 latency per
+    model call, per-image latency, throughput and test-split mAP. Thread counts must be set
+    before torch starts, so every (weights, backend, threads) combination gets a spawned worker.
+    mAP is measured once per (weights, backend, imgsz), with the most threads, and joined into
+    the rows of every batch and thread count.
+    """
+    rows = []
+    for w, backend in product(weights, backends):
+        accuracy = {}
+        if with_map:
+            print(f"🎯 {w} | {backend} | test-split mAP")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"),
+                                     initializer=set_worker_threads, initargs=(max(thread_values),)) as pool:
+                accuracy = pool.submit(_accuracy_worker, w, backend, imgsz_values, data).result()
+
+        for threads in thread_values:
+            print(f"⏱️ {w} | {backend} | {threads} threads")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"),
+                                     initializer=set_worker_threads, initargs=(threads,)) as pool:
+                timed = pool.submit(_benchmark_worker, w, backend, threads, imgsz_values, batch_values,
+                                    source, images).result()
+            for row in timed:
+                acc = accuracy.get(row["imgsz"], {})
+                # A latency error (load failed, static batch, too few images) takes precedence over a val error
+                rows.append(dict(acc, **row) if "error" in row else dict(row, **acc))
+    return rows
+
+
+#Function to write a run's rows as results.csv and results.json (with environment details)
+def save_benchmark(rows: List[Dict], run_dir: Optional[str] = None, settings: Optional[Dict] = None) -> str:
+    run_dir = run_dir or os.path.join(BENCHMARK_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(run_dir, exist_ok=True)
+
+    with open(os.path.join(run_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=BENCHMARK_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: row.get(k, "") for k in BENCHMARK_COLUMNS})
+
+    with open(os.path.join(run_dir, "results.json"), "w") as f:
+        json.dump({"environment": environment_info(), "settings": settings or {}, "results": rows}, f, indent=2)
+    return run_dir
+
+
+def print_benchmark(rows: List[Dict]) -> None:
+    print("\n📊 Inference benchmark")
+    print(f"{'Weights':28} {'Backend':14} {'imgsz':>5} {'batch':>5} {'thr':>3} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'img/s':>7} {'mAP50':>6}")
+    print("-" * 104)
+    for row in rows:
+        name = os.path.basename(os.path.dirname(os.path.dirname(row["weights"]))) or row["weights"]
+        head = f"{name[:28]:28} {row['backend']:14} {row['imgsz']:5d} {row['batch']:5d} {row['threads']:3d} "
+        if "p50_ms" not in row:
+            print(head + f"  ({row.get('error', 'no result')})")
+            continue
+        map50 = f"{row['map50']:6.3f}" if "map50" in row else f"{'-':>6}"
+        print(head + f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} "
+                     f"{row['throughput_ips']:7.1f} {map50}")
@@ -0,0 +1,95 @@
+import json
+import cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Union
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_SERVER_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+ImageInput = Union[str, bytes, np.ndarray]
+
+
+#Thin client for inference_server.py: images in, (xyxy, conf, cls) arrays out
+class InferenceClient:
+    """
+    Images may be a file path (sent as is), encoded bytes, or a BGR array (JPEG-encoded
+    before sending). Only numpy and OpenCV are needed on the client side, so clients start
+    without importing torch or loading the model.
+    """
+
+    def __init__(self, url: str = DEFAULT_SERVER_URL, imgsz: Optional[int] = None,
+                 conf: Optional[float] = None, timeout: float = 60.0):
+        self.url = url.rstrip("/")
+        self.imgsz = imgsz
+        self.conf = conf
+        self.timeout = timeout
+        self._info: Optional[Dict] = None
+
+    def health(self) -> Dict:
+        with urlopen(f"{self.url}/health", timeout=self.timeout) as response:
+            self._info = json.loads(response.read())
+        return self._info
+
+    @property
+    def names(self) -> Dict[int, str]:
+        info = self._info or self.health()
+        return {int(k): v for k, v in info["names"].items()}
+
+    def _encode(self, image: ImageInput) -> bytes:
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                return f.read()
+        if isinstance(image, bytes):
+            return image
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        if not ok:
+            raise ValueError("Could not encode image")
+        return buf.tobytes()
+
+    def predict_raw(self, image: ImageInput) -> Dict:
+        params = []
+        if self.imgsz is not None:
+            params.append(f"imgsz={self.imgsz}")
+        if self.conf is not None:
+            params.append(f"conf={self.conf}")
+        query = "?" + "&".join(params) if params else ""
+        request = Request(f"{self.url}/predict{query}", data=self._encode(image),
+                          headers={"Content-Type": "application/octet-stream"}, method="POST")
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def predict(self, image: ImageInput):
+        """Returns (xyxy (n, 4) float32, conf (n,) float32, cls (n,) int64) in original pixels."""
+        raw = self.predict_raw(image)
+        return (np.asarray(raw["xyxy"], dtype=np.float32).reshape(-1, 4),
+                np.asarray(raw["conf"], dtype=np.float32),
+                np.asarray(raw["cls"], dtype=np.int64))
+
+    def predict_many(self, images: Iterable[ImageInput], concurrency: int = 8) -> Iterator[Dict]:
+        """
+        Sends up to `concurrency` requests at once so the server can batch them; yields the
+        raw responses in input order.
+        """
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = deque()
+            for image in images:
+                pending.append(pool.submit(self.predict_raw, image))
+                # Keep about two rounds in flight so memory stays flat for long inputs
+                if len(pending) >= 2 * concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+#Function to check whether an inference server answers at url
+def server_available(url: str = DEFAULT_SERVER_URL, timeout: float = 1.0) -> bool:
+    try:
+        with urlopen(f"{url.rstrip('/')}/health", timeout=timeout) as response:
+            return response.status == 200
+    except (URLError, OSError):
+        return False
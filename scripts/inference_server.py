@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from box_tracker import Detections, result_to_detections
+from inference_client import DEFAULT_HOST, DEFAULT_PORT
+from model_backends import BACKENDS, load_backend_model
+
+MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp81/weights/best.pt"
+
+# predict_batch(images, imgsz, conf) -> one Detections per image
+BatchPredictFn = Callable[[List[np.ndarray], int, float], List[Detections]]
+
+
+#Thread that groups concurrent requests into model batches within a max-latency window
+class MicroBatcher(threading.Thread):
+    """
+    The first request of a batch waits at most max_wait_ms for others to join it; the batch
+    is run as soon as it holds max_batch images or the window closes. Requests that ask for
+    a different imgsz are run as separate batches. The batch runs at the lowest requested
+    conf and each request's boxes are then filtered by its own conf.
+    """
+
+    def __init__(self, predict_batch: BatchPredictFn, max_batch: int = 8, max_wait_ms: float = 10.0):
+        super().__init__(daemon=True)
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests: queue.Queue = queue.Queue()
+        self.running = True
+        self.batches = 0
+        self.images = 0
+
+    def submit(self, image: np.ndarray, imgsz: int, conf: float) -> Future:
+        future: Future = Future()
+        self.requests.put((image, imgsz, conf, future))
+        return future
+
+    def _collect(self) -> List[Tuple]:
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self) -> None:
+        while self.running:
+            batch = self._collect()
+            groups: Dict[int, List[Tuple]] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for imgsz, items in groups.items():
+                try:
+                    outputs = self.predict_batch([item[0] for item in items], imgsz, min(item[2] for item in items))
+                except Exception as e:
+                    for item in items:
+                        item[3].set_exception(e)
+                    continue
+                self.batches += 1
+                self.images += len(items)
+                for (_, _, conf, future), (xyxy, confs, classes) in zip(items, outputs):
+                    keep = confs >= conf
+                    future.set_result((xyxy[keep], confs[keep], classes[keep]))
+
+    def stop(self) -> None:
+        self.running = False
+
+
+#Function to load the YOLO model once and return a batch predict function for the batcher
+def load_batch_predictor(model_path: str, iou: float = 0.55, device: str = "cpu",
+                         warmup_imgsz: int = 640, backend: str = "pytorch") -> Tuple[BatchPredictFn, Dict[int, str]]:
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found at: {model_path}")
+    model = load_backend_model(model_path, backend, warmup_imgsz)
+
+    def predict_batch(images: List[np.ndarray], imgsz: int, conf: float) -> List[Detections]:
+        if backend != "pytorch":
+            # Exports have a static batch of 1 and input size; run the batch image by image
+            results = [model.predict(source=image, imgsz=warmup_imgsz, conf=conf, iou=iou, device=device,
+                                     verbose=False)[0] for image in images]
+        else:
+            results = model.predict(source=images, imgsz=imgsz, conf=conf, iou=iou, device=device, verbose=False)
+        return [result_to_detections(r) for r in results]
+
+    # Warm-up: the first passes pay for lazy initialization and allocator growth
+    dummy = np.zeros((warmup_imgsz, warmup_imgsz, 3), dtype=np.uint8)
+    for _ in range(2):
+        predict_batch([dummy], warmup_imgsz, 0.25)
+    return predict_batch, dict(model.names)
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64  # the default backlog of 5 resets connections from concurrent clients
+
+
+def make_handler(batcher: MicroBatcher, info: Dict, default_imgsz: int, default_conf: float):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path != "/health":
+                self._send_json(404, {"error": "not found"})
+                return
+            self._send_json(200, dict(info, batches=batcher.batches, images=batcher.images))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/predict":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            data = np.frombuffer(self.rfile.read(length), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR) if len(data) else None
+            if image is None:
+                self._send_json(400, {"error": "body is not a decodable image"})
+                return
+
+            params = parse_qs(url.query)
+            try:
+                imgsz = int(params.get("imgsz", [default_imgsz])[0])
+                conf = float(params.get("conf", [default_conf])[0])
+            except ValueError:
+                self._send_json(400, {"error": "imgsz must be an int and conf a float"})
+                return
+
+            start = time.perf_counter()
+            try:
+                xyxy, confs, classes = batcher.submit(image, imgsz, conf).result(timeout=60)
+            except Exception as e:
+                self._send_json(500, {"error": f"inference failed: {e}"})
+                return
+            self._send_json(200, {
+                "shape": list(image.shape[:2]),
+                "xyxy": xyxy.tolist(),
+                "conf": confs.tolist(),
+                "cls": classes.tolist(),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+        def log_message(self, format, *args):
+            pass  # one line per request would swamp the console at camera frame rates
+
+    return InferenceHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the trained YOLO model over local HTTP")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--imgsz", type=int, default=640, help="default input size when a request sets none")
+    parser.add_argument("--conf", type=float, default=0.25, help="default confidence when a request sets none")
+    parser.add_argument("--iou", type=float, default=0.55)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch",
+                        help="runtime for the model; exported backends run at --imgsz only (see export-model.py)")
+    parser.add_argument("--max-batch", type=int, default=8, help="most requests run in one forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="how long the first request of a batch waits for others")
+    args = parser.parse_args()
+
+    print(f"Loading model: {args.model}")
+    predict_batch, names = load_batch_predictor(args.model, args.iou, args.device, args.imgsz, args.backend)
+    batcher = MicroBatcher(predict_batch, args.max_batch, args.max_wait_ms)
+    batcher.start()
+
+    info = {"model": args.model, "backend": args.backend, "names": names, "imgsz": args.imgsz, "conf": args.conf,
+            "max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms}
+    server = InferenceHTTPServer((args.host, args.port), make_handler(batcher, info, args.imgsz, args.conf))
+    print(f"✅ Inference server ready on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        print("Inference server stopped.")
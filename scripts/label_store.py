@@ -0,0 +1,210 @@
+import os
+import struct
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from yolo_labels import list_label_files, load_label_files
+
+LABEL_STORE_NAME = "labels.store"
+LABEL_STORE_MAGIC = b"YOLOLBS1"
+LABEL_STORE_VERSION = 2
+
+# magic, version, file count, box count, byte length of the names blob, byte length of the errors blob
+_HEADER = struct.Struct("<8sIQQQQ")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _layout(n_files: int, n_boxes: int, names_nbytes: int, errors_nbytes: int) -> Dict[str, Tuple[int, int]]:
+    """Byte (offset, length) of every section; sections are 8-byte aligned for memory mapping."""
+    sections = [
+        ("offsets", (n_files + 1) * 8),  # int64 index into boxes, one entry per file + end
+        ("stats", n_files * 2 * 8),      # int64 (size, mtime_ns) of each source .txt
+        ("boxes", n_boxes * 5 * 4),      # float32 class, cx, cy, w, h
+        ("lines", n_boxes * 4),          # int32 source line number of each box
+        ("names", names_nbytes),         # utf-8 label file names joined by "\n"
+        ("error_offsets", (n_files + 1) * 8),  # int64 index into the error messages, one entry per file + end
+        ("errors", errors_nbytes),       # utf-8 messages of lines that could not be packed, joined by "\n"
+    ]
+    layout, pos = {}, _align(_HEADER.size)
+    for name, nbytes in sections:
+        layout[name] = (pos, nbytes)
+        pos = _align(pos + nbytes)
+    return layout
+
+
+#Function to get the default store location for a split, next to its labels folder
+def store_path_for(split_dir: str) -> str:
+    return os.path.join(split_dir, LABEL_STORE_NAME)
+
+
+#Memory-mapped, read-only view of a packed label store
+class LabelStore:
+    """
+    Opens a split's packed labels without touching the individual .txt files.
+    boxes[offsets[i]:offsets[i + 1]] are the (class, cx, cy, w, h) rows of names[i];
+    errors[error_offsets[i]:error_offsets[i + 1]] are the messages of its lines that could not be packed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"Not a label store (or unsupported version): {path}")
+        magic, version, n_files, n_boxes, names_nbytes, errors_nbytes = _HEADER.unpack(header)
+        if magic != LABEL_STORE_MAGIC or version != LABEL_STORE_VERSION:
+            raise ValueError(f"Not a label store (or unsupported version): {path}")
+
+        layout = _layout(n_files, n_boxes, names_nbytes, errors_nbytes)
+        self.offsets = self._map(layout["offsets"], np.int64, (n_files + 1,))
+        self.stats = self._map(layout["stats"], np.int64, (n_files, 2))
+        self.boxes = self._map(layout["boxes"], np.float32, (n_boxes, 5))
+        self.lines = self._map(layout["lines"], np.int32, (n_boxes,))
+        self.error_offsets = self._map(layout["error_offsets"], np.int64, (n_files + 1,))
+
+        self.names: List[str] = self._read_text(layout["names"])
+        self.errors: List[str] = self._read_text(layout["errors"])
+
+    def _read_text(self, section: Tuple[int, int]) -> List[str]:
+        start, nbytes = section
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            blob = f.read(nbytes).decode("utf-8")
+        return blob.split("\n") if blob else []
+
+    def _map(self, section: Tuple[int, int], dtype, shape) -> np.ndarray:
+        start, nbytes = section
+        if nbytes == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=start, shape=shape)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def image_boxes(self, i: int) -> np.ndarray:
+        return self.boxes[self.offsets[i]:self.offsets[i + 1]]
+
+    def file_errors(self, i: int) -> List[str]:
+        return self.errors[self.error_offsets[i]:self.error_offsets[i + 1]]
+
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def as_label_array(self, dtype=np.float64) -> np.ndarray:
+        """Returns the (N, 6) array used by yolo_labels (image index, class, cx, cy, w, h)."""
+        out = np.empty((len(self.boxes), 6), dtype=dtype)
+        out[:, 0] = np.repeat(np.arange(len(self.names)), self.counts())
+        out[:, 1:] = self.boxes
+        return out
+
+
+def _write_store(path: str, names: List[str], stats: np.ndarray, per_file: List[np.ndarray],
+                 per_file_lines: List[np.ndarray], per_file_errors: List[List[str]]) -> None:
+    counts = np.array([len(b) for b in per_file], dtype=np.int64)
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    boxes = np.concatenate(per_file).astype(np.float32) if per_file else np.zeros((0, 5), np.float32)
+    lines = np.concatenate(per_file_lines).astype(np.int32) if per_file_lines else np.zeros(0, np.int32)
+    names_blob = "\n".join(names).encode("utf-8")
+    error_offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in per_file_errors], out=error_offsets[1:])
+    errors_blob = "\n".join(e for errs in per_file_errors for e in errs).encode("utf-8")
+
+    layout = _layout(len(names), len(boxes), len(names_blob), len(errors_blob))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(LABEL_STORE_MAGIC, LABEL_STORE_VERSION, len(names), len(boxes), len(names_blob),
+                             len(errors_blob)))
+        for key, data in (("offsets", offsets.tobytes()), ("stats", stats.astype(np.int64).tobytes()),
+                          ("boxes", boxes.tobytes()), ("lines", lines.tobytes()), ("names", names_blob),
+                          ("error_offsets", error_offsets.tobytes()), ("errors", errors_blob)):
+            f.seek(layout[key][0])
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+#Function to compile a split's label folder into one packed store, re-parsing only changed files
+def build_label_store(label_dir: str, store_path: Optional[str] = None, rebuild: bool = False) -> Dict:
+    """
+    Writes (or refreshes) the packed store for label_dir and returns a summary dict with
+    the counts of reused, parsed and removed files plus the parse errors of every file.
+    Parse errors are stored with the boxes, so unchanged files keep reporting them.
+    """
+    if store_path is None:
+        store_path = store_path_for(os.path.dirname(os.path.normpath(label_dir)))
+
+    label_paths = sorted(list_label_files(label_dir))
+    names = [os.path.basename(p) for p in label_paths]
+    stats = np.array([(st.st_size, st.st_mtime_ns) for st in map(os.stat, label_paths)],
+                     dtype=np.int64).reshape(-1, 2)
+
+    old: Optional[LabelStore] = None
+    if not rebuild and os.path.exists(store_path):
+        try:
+            old = LabelStore(store_path)
+        except ValueError:
+            old = None
+    old_index = {name: i for i, name in enumerate(old.names)} if old is not None else {}
+
+    per_file: List[Optional[np.ndarray]] = [None] * len(names)
+    per_file_lines: List[Optional[np.ndarray]] = [None] * len(names)
+    per_file_errors: List[List[str]] = [[] for _ in names]
+    todo = []
+    for i, name in enumerate(names):
+        j = old_index.get(name)
+        if j is not None and np.array_equal(old.stats[j], stats[i]):
+            start, end = old.offsets[j], old.offsets[j + 1]
+            per_file[i] = np.array(old.boxes[start:end])
+            per_file_lines[i] = np.array(old.lines[start:end])
+            per_file_errors[i] = old.file_errors(j)
+        else:
+            todo.append(i)
+
+    boxes, line_numbers, errors = load_label_files([label_paths[i] for i in todo])
+    per_todo = np.bincount(boxes[:, 0].astype(np.int64), minlength=len(todo))
+    split_at = np.cumsum(per_todo)[:-1]
+    if todo:
+        for j, (b, l) in enumerate(zip(np.split(boxes[:, 1:], split_at), np.split(line_numbers, split_at))):
+            per_file[todo[j]] = b
+            per_file_lines[todo[j]] = l
+    for idx, _, message in sorted(errors, key=lambda e: (e[0], e[1])):
+        per_file_errors[todo[idx]].append(message)
+
+    removed = len(set(old_index) - set(names))
+    unchanged = len(names) - len(todo)
+    needs_write = old is None or bool(todo) or removed > 0
+    old = None  # release the memory map before replacing the file (required on Windows)
+    if needs_write:
+        _write_store(store_path, names, stats, per_file, per_file_lines, per_file_errors)
+
+    return {
+        "store": store_path,
+        "files": len(names),
+        "boxes": int(sum(len(b) for b in per_file)),
+        "unchanged": unchanged,
+        "parsed": len(todo),
+        "removed": removed,
+        "errors": [e for errs in per_file_errors for e in errs],
+    }
+
+
+#Function to write a packed store back out as the YOLO .txt layout data.yaml expects
+def export_yolo_labels(store_path: str, out_dir: str) -> int:
+    """Lines that could not be packed are not in the store; they are listed instead of dropped silently."""
+    store = LabelStore(store_path)
+    if store.errors:
+        print(f"⚠️ {len(store.errors)} label lines could not be packed and are missing from the export:")
+        for error in store.errors:
+            print(f"   {error}")
+    os.makedirs(out_dir, exist_ok=True)
+    for i, name in enumerate(store.names):
+        rows = store.image_boxes(i)
+        with open(os.path.join(out_dir, name), "w") as f:
+            for cls, cx, cy, w, h in rows.tolist():
+                # float32 keeps ~7 significant digits; write the shortest text that round-trips
+                coords = " ".join(np.format_float_positional(np.float32(v), trim="-") for v in (cx, cy, w, h))
+                f.write(f"{int(cls)} {coords}\n")
+    return len(store)
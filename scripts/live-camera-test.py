@@ -1,19 +1,132 @@
+import argparse
 import cv2
+import numpy as np
 import os
-
-from torch import classes
-from ultralytics import YOLO
+import queue
 import time
 
+from box_tracker import AdaptiveDetector, result_to_detections
+from camera_pipeline import FrameGrabber, InferenceWorker, MultiStreamCapture, MultiStreamWorker, RateMeter
+from inference_client import InferenceClient
+from model_backends import BACKENDS, load_backend_model
+from overlay import OverlayRenderer
+from stage_timer import StageTimer
+
 # --- Paths ---
 MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp81/weights/best.pt"
+IMGSZ = 640  # higher resolution = more accurate detections
+CONF = 0.25  # detect even low-confidence objects
+
+# Set by load_model() or connect_server() before the camera starts
+model = None
+model_backend = "pytorch"
+client = None
+class_names = {}
+renderer = None
+
+# Per-stage timing, printed when the script exits
+timer = StageTimer()
+
+# Color mapping for your classes
+CLASS_COLORS = {
+    'chair': (0, 255, 0),  # Green
+    'desk': (255, 0, 0),  # Blue
+    'laptop': (0, 0, 255),  # Red
+    'mouse': (255, 255, 0),  # Cyan
+    'printer': (255, 0, 255),  # Magenta
+    'pen': (0, 255, 255)  # Yellow
+}
+
+
+def load_model(backend="pytorch"):
+    """Loads the YOLO model in this process"""
+    global model, model_backend, class_names, renderer
+
+    # --- Check model exists ---
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
+
+    # --- Load YOLO model in the chosen runtime ---
+    model = load_backend_model(MODEL_PATH, backend, IMGSZ)
+    model_backend = backend
+    class_names = model.names
+    renderer = OverlayRenderer(class_names, CLASS_COLORS)
+
+
+def connect_server(url):
+    """Uses a running inference_server.py instead of a local model"""
+    global client, class_names, renderer
+    client = InferenceClient(url, imgsz=IMGSZ, conf=CONF)
+    class_names = client.names
+    renderer = OverlayRenderer(class_names, CLASS_COLORS)
+    print(f"Using inference server at {url}")
+
+
+def predict_frame(frame):
+    return model.predict(
+        source=frame,
+        imgsz=IMGSZ,
+        conf=CONF,
+        iou=0.55,  # avoid duplicate overlapping boxes
+        device="cpu",
+        verbose=False
+    )
+
+
+def detect_frame(frame):
+    if client is not None:
+        with timer.stage("inference (server)"):
+            return client.predict(frame)
+    with timer.stage("inference"):
+        results = predict_frame(frame)
+    timer.record_speed(results[0].speed)
+    return result_to_detections(results[0])
+
+
+def detect_batch(canvases):
+    """Detections for a batch of letterboxed frames (one forward pass on PyTorch), in letterboxed pixels"""
+    if client is not None:
+        with timer.stage("inference (server)"):
+            return [client.predict(canvas) for canvas in canvases]
+    if model_backend != "pytorch":
+        # Exports have a static batch of 1 (as in inference_server.py); run the cameras frame by frame
+        with timer.stage("inference"):
+            results = [predict_frame(canvas)[0] for canvas in canvases]
+        for result in results:
+            timer.record_speed(result.speed)
+        return [result_to_detections(result) for result in results]
+    import torch
+
+    # BGR uint8 NHWC -> RGB float NCHW in [0, 1]; Ultralytics skips its own preprocessing for tensors
+    tensor = torch.from_numpy(np.ascontiguousarray(canvases[..., ::-1].transpose(0, 3, 1, 2))).float() / 255.0
+    with timer.stage("inference"):
+        results = model.predict(source=tensor, imgsz=IMGSZ, conf=CONF, iou=0.55, device="cpu", verbose=False)
+    timer.record_speed(results[0].speed, images=len(canvases))
+    return [result_to_detections(result) for result in results]
+
+
+def draw_detections(frame, detections):
+    """Draw bounding boxes, labels and the detection count onto frame"""
+    # Draw bounding boxes and labels (class colors, default white)
+    renderer.draw(frame, detections)
+
+    # Display detection info
+    detection_count = len(detections[0])
+    cv2.putText(frame, f"Detections: {detection_count}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
-# --- Check model exists ---
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
 
-# --- Load YOLO model ---
-model = YOLO(MODEL_PATH)
+def handle_keys(frame):
+    """Handle key presses; returns False when the user asked to quit"""
+    key = cv2.waitKey(1) & 0xFF
+    if key == ord('q'):
+        return False
+    elif key == ord('s'):
+        # Save screenshot
+        timestamp = int(time.time())
+        cv2.imwrite(f'office_detection_{timestamp}.jpg', frame)
+        print(f"Screenshot saved as office_detection_{timestamp}.jpg")
+    return True
 
 
 def test_yolo_live_camera():
@@ -27,87 +140,241 @@ def test_yolo_live_camera():
     print("Live camera testing started!")
     print("Press 'q' to quit, 's' to save screenshot")
 
-    # Color mapping for your classes
-    class_colors = {
-        'chair': (0, 255, 0),  # Green
-        'desk': (255, 0, 0),  # Blue
-        'laptop': (0, 0, 255),  # Red
-        'mouse': (255, 255, 0),  # Cyan
-        'printer': (255, 0, 255),  # Magenta
-        'pen': (0, 255, 255)  # Yellow
-    }
-
     while True:
         # Read frame from camera
-        ret, frame = cap.read()
+        with timer.stage("capture"):
+            ret, frame = cap.read()
         if not ret:
             print("Error: Could not read frame")
             break
 
-        results = model.predict(
-            source=frame,
-            imgsz=640,  # higher resolution = more accurate detections
-            conf=0.25,  # detect even low-confidence objects
-            iou=0.55,  # avoid duplicate overlapping boxes
-            device="cpu",
-            verbose=False
-        )
-
-        # Get detections
-        boxes = results[0].boxes
-
-        # Draw bounding boxes and labels
-        if boxes is not None:
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])  # bounding box
-                conf = float(box.conf[0])  # confidence
-                cls = int(box.cls[0])  # class index
-                class_name = results[0].names[cls]  # class name
-
-                # Get color for this class
-                color = class_colors.get(class_name, (255, 255, 255))  # default white
-
-                # Draw bounding box
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-                # Create label
-                label = f"{class_name}: {conf:.2f}"
-
-                # Draw label background
-                (text_width, text_height), baseline = cv2.getTextSize(
-                    label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
-                )
-                cv2.rectangle(frame, (x1, y1 - text_height - 10),
-                              (x1 + text_width, y1), color, -1)
-
-                # Draw label text
-                cv2.putText(frame, label, (x1, y1 - 5),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
-
-        # Display detection info
-        detection_count = len(boxes) if boxes is not None else 0
-        cv2.putText(frame, f"Detections: {detection_count}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        detections = detect_frame(frame)
+        with timer.stage("draw"):
+            draw_detections(frame, detections)
 
         # Show frame
-        cv2.imshow('YOLO Live Detection - Office Objects', frame)
+        with timer.stage("imshow"):
+            cv2.imshow('YOLO Live Detection - Office Objects', frame)
 
         # Handle key presses
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
+        with timer.stage("waitKey"):
+            keep_running = handle_keys(frame)
+        if not keep_running:
+            break
+
+    # Cleanup
+    cap.release()
+    cv2.destroyAllWindows()
+    print("Live detection stopped.")
+
+
+def test_yolo_live_camera_pipelined():
+    """
+    Pipelined live mode: a capture thread keeps only the newest frame, an inference thread
+    runs the model on it, and this (main) thread renders, so camera I/O and drawing never
+    stall the forward pass. Stale frames are dropped rather than queued.
+    """
+    cap = cv2.VideoCapture(0)  # 0 for default camera
+
+    if not cap.isOpened():
+        print("Error: Could not open camera")
+        return
+
+    print("Pipelined live camera testing started!")
+    print("Press 'q' to quit, 's' to save screenshot")
+
+    grabber = FrameGrabber(cap, timer)
+    worker = InferenceWorker(grabber, detect_frame, timer=timer)
+    grabber.start()
+    worker.start()
+    display = RateMeter()
+
+    while worker.running or not worker.output.empty():
+        try:
+            frame, detections, captured_at = worker.output.get(timeout=0.1)
+        except queue.Empty:
+            # Keep the window responsive while waiting for the first results
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+            continue
+
+        with timer.stage("draw"):
+            draw_detections(frame, detections)
+
+            # End-to-end latency: from frame capture until it is on screen
+            display.tick(time.perf_counter() - captured_at)
+            cv2.putText(frame, f"FPS: {display.fps:.1f}  Inference FPS: {worker.meter.fps:.1f}", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(frame, f"Latency: {display.latency_ms:.0f} ms  Dropped: {grabber.dropped}", (10, 85),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        with timer.stage("imshow"):
+            cv2.imshow('YOLO Live Detection - Office Objects', frame)
+        with timer.stage("waitKey"):
+            keep_running = handle_keys(frame)
+        if not keep_running:
             break
-        elif key == ord('s'):
-            # Save screenshot
-            timestamp = int(time.time())
-            cv2.imwrite(f'office_detection_{timestamp}.jpg', frame)
-            print(f"Screenshot saved as office_detection_{timestamp}.jpg")
+
+    if grabber.failed:
+        print("Error: Could not read frame")
+    if worker.error is not None:
+        print(f"Error during inference: {worker.error}")
 
     # Cleanup
+    worker.stop()
+    grabber.stop()
+    worker.join(timeout=2)
+    grabber.join(timeout=2)
     cap.release()
     cv2.destroyAllWindows()
     print("Live detection stopped.")
 
 
+def test_yolo_live_camera_adaptive(target_fps=30.0, max_skip=15, motion_thresh=0.12):
+    """
+    Adaptive live mode: the detector runs only every N frames, or sooner on a scene change,
+    and an optical-flow tracker carries the last boxes forward in between. N follows the
+    measured detector latency so the average per-frame cost fits the target frame budget.
+    """
+    cap = cv2.VideoCapture(0)  # 0 for default camera
+
+    if not cap.isOpened():
+        print("Error: Could not open camera")
+        return
+
+    print("Adaptive live camera testing started!")
+    print("Press 'q' to quit, 's' to save screenshot")
+
+    detector = AdaptiveDetector(detect_frame, target_fps=target_fps, max_skip=max_skip,
+                                motion_thresh=motion_thresh)
+    display = RateMeter()
+
+    while True:
+        with timer.stage("capture"):
+            ret, frame = cap.read()
+        if not ret:
+            print("Error: Could not read frame")
+            break
+
+        # Includes "inference" on detector frames; the rest is scene-change scoring and tracking
+        with timer.stage("detect or track"):
+            detections, ran_detector = detector.process(frame)
+        with timer.stage("draw"):
+            draw_detections(frame, detections)
+
+            display.tick()
+            status = "DETECT" if ran_detector else "TRACK"
+            cv2.putText(frame, f"FPS: {display.fps:.1f}  {status}  N={detector.skip}", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            cv2.putText(frame, f"Detector on {detector.detector_share * 100:.0f}% of frames", (10, 85),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        with timer.stage("imshow"):
+            cv2.imshow('YOLO Live Detection - Office Objects', frame)
+        with timer.stage("waitKey"):
+            keep_running = handle_keys(frame)
+        if not keep_running:
+            break
+
+    # Cleanup
+    cap.release()
+    cv2.destroyAllWindows()
+    print(f"Detector ran on {detector.detector_runs}/{detector.frames} frames")
+    print("Live detection stopped.")
+
+
+def test_yolo_live_multi_camera(sources, loop=False):
+    """
+    Multi-stream mode: one capture process per source writes into a shared-memory frame ring,
+    and a single model runs the newest frame of every stream as one batch. Video files stand
+    in for cameras (played at their own frame rate). One window per stream.
+    """
+    try:
+        capture = MultiStreamCapture(sources, loop=loop)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"Multi-camera testing started with {len(sources)} streams!")
+    print("Press 'q' to quit, 's' to save screenshot")
+
+    worker = MultiStreamWorker(capture, detect_batch, imgsz=IMGSZ, timer=timer)
+    worker.start()
+    displays = [RateMeter() for _ in sources]
+    keep_running = True
+
+    while keep_running and (worker.running or any(not q.empty() for q in worker.outputs)):
+        shown = False
+        for output in worker.outputs:
+            try:
+                stream, frame, detections, captured_at = output.get_nowait()
+            except queue.Empty:
+                continue
+            shown = True
+            with timer.stage("draw"):
+                draw_detections(frame, detections)
+                displays[stream].tick(time.perf_counter() - captured_at)
+                cv2.putText(frame, f"FPS: {displays[stream].fps:.1f}  Batches/s: {worker.batch_meter.fps:.1f}",
+                            (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                cv2.putText(frame, f"Latency: {displays[stream].latency_ms:.0f} ms", (10, 85),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            with timer.stage("imshow"):
+                cv2.imshow(f'YOLO Live Detection - {sources[stream]}', frame)
+            with timer.stage("waitKey"):
+                keep_running = handle_keys(frame)
+            if not keep_running:
+                break
+        if not shown:
+            # Keep the windows responsive while waiting for results
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    if worker.error is not None:
+        print(f"Error during inference: {worker.error}")
+
+    # Cleanup
+    worker.stop()
+    worker.join(timeout=2)
+    capture.close()
+    cv2.destroyAllWindows()
+    print(f"Streams processed: {', '.join(f'{s}: {m.fps:.1f} FPS' for s, m in zip(sources, worker.meters))}")
+    print("Live detection stopped.")
+
+
 # Run live camera test
 if __name__ == "__main__":
-    test_yolo_live_camera()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Live YOLO detection from the default camera")
+    parser.add_argument("--mode", choices=["pipelined", "adaptive", "sequential", "multi"], default="pipelined",
+                        help="pipelined: threaded capture / inference / render; "
+                             "adaptive: detector every N frames with box tracking in between; sequential: one loop; "
+                             "multi: several cameras or videos batched through one model")
+    parser.add_argument("--sources", nargs="+", default=["0"],
+                        help="multi mode: camera indices and/or video files, e.g. --sources 0 1 hallway.mp4")
+    parser.add_argument("--loop", action="store_true", help="multi mode: restart video files when they end")
+    parser.add_argument("--target-fps", type=float, default=30.0, help="frame budget for adaptive mode")
+    parser.add_argument("--max-skip", type=int, default=15, help="max frames between detector runs in adaptive mode")
+    parser.add_argument("--motion-thresh", type=float, default=0.12,
+                        help="scene-change score (0-1) that forces a detector run in adaptive mode")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch",
+                        help="runtime for the local model; exports are built on first use (see export-model.py)")
+    parser.add_argument("--server", default=None, metavar="URL",
+                        help="send frames to a running inference_server.py instead of loading the model")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="also write a Chrome trace (chrome://tracing, Perfetto) of every stage to PATH")
+    args = parser.parse_args()
+
+    timer.report_on_exit("Live camera stage timing", args.trace)
+
+    if args.server:
+        connect_server(args.server)
+    else:
+        load_model(args.backend)
+
+    if args.mode == "multi":
+        test_yolo_live_multi_camera(args.sources, args.loop)
+    elif args.mode == "pipelined":
+        test_yolo_live_camera_pipelined()
+    elif args.mode == "adaptive":
+        test_yolo_live_camera_adaptive(args.target_fps, args.max_skip, args.motion_thresh)
+    else:
+        test_yolo_live_camera()
\ No newline at end of file
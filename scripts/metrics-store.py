@@ -0,0 +1,75 @@
+import argparse
+import os
+
+from metrics_store import MetricsStore
+from model_eval import VALID_DIR, evaluate_models
+
+
+def _fmt(value, spec, width):
+    return format(value, spec) if value is not None else "-".rjust(width)
+
+
+def print_best_by(rows, key):
+    print(f"\n{key:>12} {'Experiment':40} {'epoch':>5} {'mAP50':>6} {'mAP50-95':>8}")
+    print("-" * 76)
+    for row in rows:
+        print(f"{row['value']:>12} {row['run'][:40]:40} {row['epoch']:5d} {_fmt(row['map50'], '6.3f', 6)} "
+              f"{_fmt(row['map50_95'], '8.3f', 8)}")
+
+
+def print_epoch_times(rows):
+    print(f"\n{'Experiment':40} {'epochs':>6} {'mean s':>8} {'min s':>8} {'max s':>8} {'total h':>8}")
+    print("-" * 82)
+    for row in rows:
+        total = row["total_s"] / 3600 if row["total_s"] is not None else None
+        print(f"{row['run'][:40]:40} {row['epochs']:6d} {_fmt(row['mean_s'], '8.1f', 8)} "
+              f"{_fmt(row['min_s'], '8.1f', 8)} {_fmt(row['max_s'], '8.1f', 8)} {_fmt(total, '8.2f', 8)}")
+
+
+def print_classes(rows):
+    print(f"\n{'Experiment':40} {'imgsz':>5} {'class':12} {'inst':>5} {'P':>6} {'R':>6} {'mAP50':>6} {'mAP':>6}")
+    print("-" * 94)
+    for row in rows:
+        print(f"{row['run'][:40]:40} {row['imgsz']:5d} {row['class_name'][:12]:12} {row['instances']:5d} "
+              f"{row['precision']:6.3f} {row['recall']:6.3f} {row['map50']:6.3f} {row['map50_95']:6.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import runs into the metrics store and query them across runs")
+    parser.add_argument("--import", dest="ingest", action="store_true",
+                        help="(re)import results.csv and args.yaml of every run under runs/detect")
+    parser.add_argument("--evaluate", nargs="*", metavar="RUN",
+                        help="also store per-class validation metrics of these runs' best.pt (no RUN: every run)")
+    parser.add_argument("--imgsz", type=int, default=512, help="image size for --evaluate")
+    parser.add_argument("--best-by", metavar="ARG", help="best mAP50-95 per value of a training argument, e.g. imgsz")
+    parser.add_argument("--epoch-times", nargs="?", const="", metavar="RUN", help="seconds per epoch, per run")
+    parser.add_argument("--classes", nargs="?", const="", metavar="RUN", help="stored per-class metrics")
+    args = parser.parse_args()
+
+    with MetricsStore() as store:
+        if args.ingest:
+            for run, epochs in store.ingest_all().items():
+                print(f"📥 {run}: {epochs} epochs")
+
+        if args.evaluate is not None:
+            rows = store.registry.search()
+            weights = [row["best_weights"] for row in rows
+                       if row["best_weights"] and os.path.exists(row["best_weights"])
+                       and (not args.evaluate or row["name"] in args.evaluate)]
+            if weights:
+                for path, result in evaluate_models(weights, VALID_DIR, imgsz=args.imgsz).items():
+                    store.add_class_metrics(path, result, imgsz=args.imgsz)
+                    print(f"📥 Per-class metrics of {path}")
+            else:
+                print("⚠️ No runs with best.pt to evaluate")
+
+        if args.best_by:
+            print_best_by(store.best_by_arg(args.best_by), args.best_by)
+        if args.epoch_times is not None:
+            print_epoch_times(store.epoch_times(args.epoch_times or None))
+        if args.classes is not None:
+            print_classes(store.class_table(args.classes or None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import glob
+import os
+import time
+from typing import Dict, List, Optional
+
+from experiment_registry import PROJECT_DIR, REGISTRY_PATH, ExperimentRegistry, read_results_csv
+
+# results.csv column -> epochs table column
+EPOCH_COLUMNS = {
+    "train/box_loss": "train_box_loss",
+    "train/cls_loss": "train_cls_loss",
+    "train/dfl_loss": "train_dfl_loss",
+    "metrics/precision(B)": "precision",
+    "metrics/recall(B)": "recall",
+    "metrics/mAP50(B)": "map50",
+    "metrics/mAP50-95(B)": "map50_95",
+    "val/box_loss": "val_box_loss",
+    "val/cls_loss": "val_cls_loss",
+    "val/dfl_loss": "val_dfl_loss",
+    "lr/pg0": "lr_pg0",
+}
+
+
+def run_name_of(weights: str) -> str:
+    """runs/detect/<run>/weights/best.pt -> <run>; any other path -> its file name."""
+    parent = os.path.dirname(os.path.abspath(weights))
+    if os.path.basename(parent) == "weights":
+        return os.path.basename(os.path.dirname(parent))
+    return os.path.basename(weights)
+
+
+#Queryable store of every run's per-epoch results and per-class validation metrics
+class MetricsStore:
+    """
+    Lives in the experiment registry's SQLite file, next to its experiments and args tables,
+    so metrics can be joined with any training argument (e.g. best mAP50-95 per imgsz).
+    Rows are plain numbers: nothing depends on the Ultralytics version that produced a run.
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH, project_dir: str = PROJECT_DIR):
+        self.registry = ExperimentRegistry(path, project_dir)
+        self.conn = self.registry.conn
+        columns = ", ".join(f"{c} REAL" for c in EPOCH_COLUMNS.values())
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS epochs (
+                run TEXT, epoch INTEGER, elapsed REAL, epoch_seconds REAL, {columns},
+                PRIMARY KEY (run, epoch)
+            );
+            CREATE TABLE IF NOT EXISTS class_metrics (
+                run TEXT, weights TEXT, split TEXT, imgsz INTEGER, class_id INTEGER, class_name TEXT,
+                instances INTEGER, precision REAL, recall REAL, map50 REAL, map50_95 REAL, recorded REAL,
+                PRIMARY KEY (run, weights, split, imgsz, class_id)
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.registry.close()
+
+    #Function to load (or refresh) one run folder: registry/args index plus every epoch of results.csv
+    def ingest_run(self, run_dir: str) -> int:
+        name = self.registry.index_run(run_dir)["name"]
+        rows = read_results_csv(os.path.join(run_dir, "results.csv"))
+        records, previous = [], 0.0
+        for row in rows:
+            # results.csv "time" is cumulative seconds since the start of training
+            elapsed = row.get("time")
+            epoch_seconds = elapsed - previous if elapsed is not None else None
+            previous = elapsed if elapsed is not None else previous
+            records.append((name, int(row.get("epoch", len(records) + 1)), elapsed, epoch_seconds,
+                            *(row.get(key) for key in EPOCH_COLUMNS)))
+        placeholders = ", ".join("?" * (4 + len(EPOCH_COLUMNS)))
+        self.conn.execute("DELETE FROM epochs WHERE run = ?", (name,))
+        self.conn.executemany(f"INSERT INTO epochs VALUES ({placeholders})", records)
+        self.conn.commit()
+        return len(records)
+
+    def ingest_all(self) -> Dict[str, int]:
+        """Backfills every run folder under the project folder that has a results.csv."""
+        runs = sorted(os.path.dirname(p) for p in glob.glob(os.path.join(self.registry.project_dir, "*", "results.csv")))
+        return {os.path.basename(run): self.ingest_run(run) for run in runs}
+
+    #Function to store per-class metrics of one checkpoint (one entry of a model_eval.evaluate_models() result)
+    def add_class_metrics(self, weights: str, result: Dict, imgsz: int, split: str = "valid") -> None:
+        classes = result["classes"]
+        run, now = run_name_of(weights), time.time()
+        rows = [(run, weights, split, imgsz, c, name, int(classes["instances"][c]),
+                 float(classes["precision"][c]), float(classes["recall"][c]), float(classes["ap50"][c]),
+                 float(classes["ap"][c]), now)
+                for c, name in result["names"].items()]
+        self.conn.executemany("INSERT OR REPLACE INTO class_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def query(self, sql: str, params=()) -> List[Dict]:
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    #Function to get the best epoch (by mAP50-95) per value of one training argument, e.g. imgsz
+    def best_by_arg(self, key: str = "imgsz") -> List[Dict]:
+        return self.query("""
+            SELECT a.value AS value, e.run AS run, e.epoch AS epoch, MAX(e.map50_95) AS map50_95, e.map50 AS map50
+            FROM epochs e JOIN args a ON a.name = e.run AND a.key = ?
+            GROUP BY a.value ORDER BY map50_95 DESC
+        """, (key,))
+
+    def epoch_times(self, run: Optional[str] = None) -> List[Dict]:
+        """Seconds per epoch, per run (or for one run), to spot slow-downs across experiments."""
+        where, params = ("WHERE run = ?", (run,)) if run else ("", ())
+        return self.query(f"""
+            SELECT run, COUNT(*) AS epochs, AVG(epoch_seconds) AS mean_s, MIN(epoch_seconds) AS min_s,
+                   MAX(epoch_seconds) AS max_s, MAX(elapsed) AS total_s
+            FROM epochs {where} GROUP BY run ORDER BY run
+        """, params)
+
+    def epoch_curve(self, run: str) -> List[Dict]:
+        return self.query("SELECT * FROM epochs WHERE run = ? ORDER BY epoch", (run,))
+
+    def class_table(self, run: Optional[str] = None) -> List[Dict]:
+        where, params = ("WHERE run = ?", (run,)) if run else ("", ())
+        return self.query(f"SELECT * FROM class_metrics {where} ORDER BY run, weights, split, imgsz, class_id", params)
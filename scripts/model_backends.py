@@ -0,0 +1,222 @@
+import importlib.util
+import math
+import os
+import shutil
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from batch_inference import letterbox
+from dataset_audit import collect_image_paths
+
+# --- Paths ---
+DATA_YAML = "../dataset/data.yaml"
+CALIBRATION_DIR = "../dataset/valid/images"
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+
+# Python package each exported backend needs at runtime
+_BACKEND_PACKAGES = {
+    "onnx": "onnxruntime",
+    "onnx-int8": "onnxruntime",
+    "openvino": "openvino",
+    "openvino-int8": "openvino",
+}
+
+
+#Function to check whether a backend's runtime is installed
+def backend_available(backend: str) -> bool:
+    package = _BACKEND_PACKAGES.get(backend)
+    return package is None or importlib.util.find_spec(package) is not None
+
+
+def _stride_multiple(imgsz: int, stride: int = 32) -> int:
+    # Exports have a fixed input size, rounded up like Ultralytics does
+    return max(stride, math.ceil(imgsz / stride) * stride)
+
+
+#Function to get where the exported model for a backend and input size lives (next to best.pt)
+def backend_weights_path(weights: str, backend: str, imgsz: int) -> str:
+    if backend == "pytorch":
+        return weights
+    stem = f"{os.path.splitext(weights)[0]}_{_stride_multiple(imgsz)}"
+    return {
+        "onnx": f"{stem}.onnx",
+        "onnx-int8": f"{stem}_int8.onnx",
+        # Ultralytics recognizes OpenVINO models by the "_openvino_model" directory suffix
+        "openvino": f"{stem}_openvino_model",
+        "openvino-int8": f"{stem}_int8_openvino_model",
+    }[backend]
+
+
+#Calibration reader for ONNX Runtime static quantization: letterboxed validation images
+class LetterboxCalibrationReader:
+    def __init__(self, image_paths: Sequence[str], input_name: str, imgsz: int):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.index = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        import cv2
+
+        while self.index < len(self.image_paths):
+            img = cv2.imread(self.image_paths[self.index])
+            self.index += 1
+            if img is None:
+                continue
+            canvas, _, _ = letterbox(img, self.imgsz)
+            # BGR HWC uint8 -> RGB NCHW float in [0, 1], as the exported graph expects
+            tensor = canvas[..., ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+            return {self.input_name: np.ascontiguousarray(tensor)}
+        return None
+
+    def rewind(self) -> None:
+        self.index = 0
+
+
+def _calibration_images(calibration_dir: str, limit: int) -> List[str]:
+    paths = sorted(collect_image_paths(calibration_dir))
+    if len(paths) > limit:
+        # Spread the sample over the whole split instead of taking the first files
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, limit).astype(int)]
+    return paths
+
+
+def _head_postprocess_nodes(onnx_path: str) -> List[str]:
+    """
+    Non-Conv nodes of the Detect head (the highest-numbered /model.N/ block). They decode
+    boxes into pixel coordinates, which 8-bit activations cannot represent accurately.
+    """
+    import onnx
+
+    graph = onnx.load(onnx_path).graph
+    blocks = {}
+    for node in graph.node:
+        parts = node.name.split("/")
+        if len(parts) > 1 and parts[1].startswith("model.") and parts[1][6:].isdigit():
+            blocks.setdefault(int(parts[1][6:]), []).append(node)
+    if not blocks:
+        return []
+    return [node.name for node in blocks[max(blocks)] if node.op_type != "Conv"]
+
+
+def _quantize_onnx_int8(fp32_path: str, int8_path: str, imgsz: int, calibration_dir: str, limit: int) -> None:
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = LetterboxCalibrationReader(_calibration_images(calibration_dir, limit), input_name, imgsz)
+    quantize_static(
+        fp32_path,
+        int8_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=_head_postprocess_nodes(fp32_path),
+    )
+
+
+#Function to export best.pt to a CPU backend (skipped when the export already exists)
+def export_backend(
+    weights: str,
+    backend: str,
+    imgsz: int = 640,
+    calibration_dir: str = CALIBRATION_DIR,
+    calibration_images: int = 300,
+    force: bool = False,
+) -> str:
+    """
+    ONNX INT8 is static QDQ quantization calibrated on letterboxed images from calibration_dir.
+    OpenVINO INT8 uses Ultralytics' NNCF export, which calibrates on the val split of data.yaml.
+    Returns the path of the exported model.
+    """
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if not backend_available(backend):
+        raise ImportError(f"Backend '{backend}' needs the '{_BACKEND_PACKAGES[backend]}' package")
+
+    target = backend_weights_path(weights, backend, imgsz)
+    if backend == "pytorch" or (os.path.exists(target) and not force):
+        return target
+    imgsz = _stride_multiple(imgsz)
+
+    if backend == "onnx-int8":
+        fp32_path = export_backend(weights, "onnx", imgsz, force=force)
+        _quantize_onnx_int8(fp32_path, target, imgsz, calibration_dir, calibration_images)
+        return target
+
+    model = YOLO(weights)
+    if backend == "onnx":
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    else:
+        int8 = backend == "openvino-int8"
+        options = {}
+        if int8:
+            # NNCF calibrates on the data.yaml val split; limit it to about calibration_images images
+            options["fraction"] = min(1.0, calibration_images / max(len(collect_image_paths(calibration_dir)), 1))
+        exported = model.export(format="openvino", imgsz=imgsz, int8=int8, data=DATA_YAML, **options)
+
+    # Ultralytics always writes next to best.pt under a fixed name; keep one export per input size
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.replace(str(exported), target)
+    return target
+
+
+#Function to load a YOLO model for a backend, exporting it first when needed
+def load_backend_model(weights: str, backend: str = "pytorch", imgsz: int = 640):
+    from ultralytics import YOLO
+
+    path = export_backend(weights, backend, imgsz)
+    return YOLO(path, task="detect")
+
+
+#Function to validate every backend on the validation split and compare it with PyTorch
+def compare_backends(
+    weights: str,
+    backends: Sequence[str] = BACKENDS,
+    imgsz: int = 640,
+    data: str = DATA_YAML,
+    max_map_drop: float = 0.01,
+) -> List[Dict]:
+    """
+    Runs model.val() for each backend (batch 1, CPU) and returns one row per backend with
+    mAP50, mAP50-95, inference ms per image, the mAP50-95 change and speed-up relative to
+    the PyTorch baseline, and whether the drop stays within max_map_drop.
+    """
+    rows = []
+    for backend in ["pytorch"] + [b for b in backends if b != "pytorch"]:
+        if not backend_available(backend):
+            print(f"⚠️ Skipping {backend}: '{_BACKEND_PACKAGES[backend]}' is not installed")
+            continue
+        model = load_backend_model(weights, backend, imgsz)
+        metrics = model.val(data=data, split="val", imgsz=_stride_multiple(imgsz), batch=1, device="cpu",
+                            plots=False, verbose=False)
+        rows.append({
+            "backend": backend,
+            "map50": float(metrics.box.map50),
+            "map": float(metrics.box.map),
+            "inference_ms": float(metrics.speed["inference"]),
+        })
+
+    base = rows[0]
+    for row in rows:
+        row["map_delta"] = row["map"] - base["map"]
+        row["speedup"] = base["inference_ms"] / row["inference_ms"] if row["inference_ms"] else float("nan")
+        row["ok"] = row["map_delta"] >= -max_map_drop
+    return rows
+
+
+def print_backend_comparison(rows: List[Dict]) -> None:
+    print("\n📊 Backend comparison on the validation set (CPU, batch 1)")
+    print("Backend          mAP50   mAP50-95   ΔmAP50-95   Inference ms   Speed-up")
+    print("-" * 74)
+    for row in rows:
+        flag = "" if row["ok"] else "  ❌ accuracy drop"
+        print(f"{row['backend']:15} {row['map50']:6.3f}   {row['map']:7.3f}   {row['map_delta']:+9.3f}"
+              f"   {row['inference_ms']:12.1f}   {row['speedup']:7.2f}x{flag}")
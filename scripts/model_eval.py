@@ -0,0 +1,276 @@
+import csv
+import glob
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence
+
+from batch_inference import PREDICTION_COLUMNS, iter_batches
+from dataset_audit import collect_image_paths
+from detection_metrics import IOU_THRESHOLDS, evaluate_predictions
+from inference_benchmark import set_worker_threads
+from yolo_labels import load_label_files
+
+# --- Paths ---
+VALID_DIR = "../dataset/valid"
+EVAL_DIR = "runs/eval"
+EVAL_CACHE_DIR = "runs/eval/cache"
+
+# Ultralytics validation defaults: keep nearly every box so the PR curves are complete
+EVAL_CONF = 0.001
+EVAL_IOU = 0.7
+EVAL_MAX_DET = 300
+
+# Column order of classes.csv
+EVAL_COLUMNS = ("weights", "class", "instances", "precision", "recall", "map50", "map50_95")
+
+
+def _signature(paths: Sequence[str], imgsz: int) -> str:
+    # Any added, removed or modified image or label invalidates the decoded set
+    h = hashlib.sha1(str(imgsz).encode())
+    for path in paths:
+        st = os.stat(path)
+        h.update(f"{path}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:16]
+
+
+def _label_path(image_path: str) -> str:
+    image_dir, name = os.path.split(image_path)
+    return os.path.join(os.path.dirname(image_dir), "labels", os.path.splitext(name)[0] + ".txt")
+
+
+#Function to decode and letterbox a split once into a memory-mappable array, with its ground truth
+def build_eval_set(split_dir: str = VALID_DIR, imgsz: int = 640, cache_dir: str = EVAL_CACHE_DIR,
+                   workers: Optional[int] = None) -> str:
+    """
+    Writes <cache_dir>/<split>_<imgsz>_<signature>/ with images.npy (N, 3, imgsz, imgsz) RGB
+    uint8, ready to be handed to the model as a tensor, gt.npy (M, 6): image, class and xyxy
+    in letterboxed pixels, and meta.json with the image paths. Unreadable images are skipped,
+    so only the first len(meta paths) rows of images.npy are used. An existing set with the same
+    signature is reused as is. Returns the set's folder.
+    """
+    paths = sorted(collect_image_paths(os.path.join(split_dir, "images")))
+    labels = [p for p in map(_label_path, paths) if os.path.exists(p)]
+    split = os.path.basename(os.path.normpath(split_dir))
+    set_dir = os.path.join(cache_dir, f"{split}_{imgsz}_{_signature(paths + labels, imgsz)}")
+    if os.path.exists(os.path.join(set_dir, "meta.json")):
+        return set_dir
+
+    os.makedirs(set_dir, exist_ok=True)
+    images = np.lib.format.open_memmap(os.path.join(set_dir, "images.npy"), mode="w+", dtype=np.uint8,
+                                       shape=(len(paths), 3, imgsz, imgsz))
+    kept, gt = [], []
+    for batch in iter_batches(paths, batch_size=64, imgsz=imgsz, workers=workers):
+        for item in batch:
+            i = len(kept)
+            images[i] = item["input"][..., ::-1].transpose(2, 0, 1)
+            kept.append(item["path"])
+            label = _label_path(item["path"])
+            if not os.path.exists(label):
+                continue
+            rows = load_label_files([label])[0][:, 1:]
+            if not len(rows):
+                continue
+            h, w = item["image"].shape[:2]
+            (pad_x, pad_y), scale = item["pad"], item["scale"]
+            cx, cy, bw, bh = rows[:, 1] * w, rows[:, 2] * h, rows[:, 3] * w, rows[:, 4] * h
+            xyxy = np.column_stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2]) * scale
+            xyxy += [pad_x, pad_y, pad_x, pad_y]
+            gt.append(np.column_stack([np.full(len(rows), i), rows[:, 0], xyxy]))
+    images.flush()
+    del images
+
+    np.save(os.path.join(set_dir, "gt.npy"), np.concatenate(gt) if gt else np.zeros((0, 6)))
+    with open(os.path.join(set_dir, "meta.json"), "w") as f:
+        json.dump({"split_dir": split_dir, "imgsz": imgsz, "paths": kept}, f)
+    return set_dir
+
+
+#Function to get where a checkpoint's raw predictions on an eval set are cached
+def predictions_path(set_dir: str, weights: str, conf: float = EVAL_CONF, iou: float = EVAL_IOU) -> str:
+    """Keyed by the checkpoint file's path, size and mtime and by the NMS settings, so a retrained
+    best.pt is never served stale predictions."""
+    st = os.stat(weights)
+    key = f"{os.path.abspath(weights)}|{st.st_size}|{st.st_mtime_ns}|{conf}|{iou}|{EVAL_MAX_DET}"
+    name = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(set_dir, "predictions", f"{name}_{hashlib.sha1(key.encode()).hexdigest()[:16]}.npz")
+
+
+def _save_predictions(path: str, out: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, preds=out["preds"], names=json.dumps(out["names"]), seconds=out["seconds"])
+    os.replace(tmp, path)
+
+
+def _load_predictions(path: str, weights: str) -> Dict:
+    with np.load(path) as data:
+        names = {int(k): v for k, v in json.loads(str(data["names"])).items()}
+        return {"weights": weights, "names": names, "preds": data["preds"], "seconds": float(data["seconds"])}
+
+
+#Worker: run one checkpoint over the shared, memory-mapped eval set and return its raw boxes
+def _predict_worker(weights: str, set_dir: str, imgsz: int, batch: int, conf: float, iou: float) -> Dict:
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    with open(os.path.join(set_dir, "meta.json")) as f:
+        count = len(json.load(f)["paths"])
+    images = np.load(os.path.join(set_dir, "images.npy"), mmap_mode="r")[:count]
+    rows = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch):
+        tensor = torch.from_numpy(np.array(images[i:i + batch])).float() / 255.0
+        results = model.predict(source=tensor, imgsz=imgsz, conf=conf, iou=iou, max_det=EVAL_MAX_DET,
+                                device="cpu", verbose=False)
+        for j, result in enumerate(results):
+            n = len(result.boxes)
+            if n:
+                # One transfer of (n, 6) x1, y1, x2, y2, conf, cls instead of one per field
+                data = result.boxes.data.cpu().numpy()
+                rows.append(np.column_stack([np.full(n, i + j), data[:, :4], data[:, -2:]]))
+    preds = np.concatenate(rows) if rows else np.zeros((0, len(PREDICTION_COLUMNS)))
+    return {"weights": weights, "names": dict(model.names), "preds": preds.astype(np.float32),
+            "seconds": time.perf_counter() - start}
+
+
+#Function to expand run folders into checkpoints: best.pt, and optionally the save_period epoch files
+def expand_weights(paths: Sequence[str], epochs: bool = False) -> List[str]:
+    out = []
+    for path in paths:
+        if os.path.isdir(path):
+            weights_dir = os.path.join(path, "weights") if os.path.isdir(os.path.join(path, "weights")) else path
+            found = [os.path.join(weights_dir, "best.pt")]
+            if epochs:
+                found += sorted(glob.glob(os.path.join(weights_dir, "epoch*.pt")),
+                                key=lambda p: int("".join(filter(str.isdigit, os.path.basename(p))) or 0))
+            out.extend(p for p in found if os.path.exists(p))
+        else:
+            out.append(path)
+    return list(dict.fromkeys(out))
+
+
+#Function to score several checkpoints on one shared decode of the validation set, in parallel
+def evaluate_models(
+    weights: Sequence[str],
+    split_dir: str = VALID_DIR,
+    imgsz: int = 640,
+    workers: int = 2,
+    batch: int = 16,
+    conf: float = EVAL_CONF,
+    iou: float = EVAL_IOU,
+    conf_thres: Optional[float] = None,
+) -> Dict[str, Dict]:
+    """
+    The split is decoded and letterboxed once (and cached across calls); every worker process
+    memory-maps the same array, so the decode is never repeated and frames are not pickled.
+    CPU threads are divided evenly between the workers. Raw predictions are cached per
+    checkpoint (see predictions_path), so only checkpoints never scored on this set run
+    inference. Returns, per checkpoint, its class names, raw predictions, eval set folder and
+    evaluate_predictions() metrics, with P/R at conf_thres (default: the max-F1 confidence).
+    Images are letterboxed to a square, not rect-batched like model.val(), so numbers differ
+    slightly from Ultralytics but are directly comparable between checkpoints.
+    """
+    set_dir = build_eval_set(split_dir, imgsz)
+    gt = np.load(os.path.join(set_dir, "gt.npy"))
+
+    outputs = {}
+    todo = []
+    for w in weights:
+        path = predictions_path(set_dir, w, conf, iou)
+        if os.path.exists(path):
+            outputs[w] = _load_predictions(path, w)
+        else:
+            todo.append(w)
+    print(f"🧪 Evaluating {len(weights)} checkpoints on {set_dir} ({len(weights) - len(todo)} cached)")
+
+    if todo:
+        workers = max(1, min(workers, len(todo)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"  Running {len(todo)} checkpoints ({workers} workers x {threads} threads)")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                                 initializer=set_worker_threads, initargs=(threads,)) as pool:
+            futures = [pool.submit(_predict_worker, w, set_dir, imgsz, batch, conf, iou) for w in todo]
+            for w, future in zip(todo, futures):
+                outputs[w] = future.result()
+                _save_predictions(predictions_path(set_dir, w, conf, iou), outputs[w])
+
+    results = {}
+    for w in weights:
+        out = dict(outputs[w], set_dir=set_dir)
+        results[w] = dict(out, **evaluate_predictions(out["preds"], gt, len(out["names"]), conf_thres=conf_thres))
+        overall = results[w]["overall"]
+        print(f"  ✅ {w}: mAP50 {overall['map50']:.3f} mAP50-95 {overall['map']:.3f} "
+              f"(inference {out['seconds']:.0f}s)")
+    return results
+
+
+#Function to re-score evaluate_models() results at another confidence or IoU thresholds, without inference
+def rescore(results: Dict[str, Dict], conf_thres: Optional[float] = None,
+            iou_thresholds: Sequence[float] = IOU_THRESHOLDS) -> Dict[str, Dict]:
+    rescored = {}
+    for w, res in results.items():
+        gt = np.load(os.path.join(res["set_dir"], "gt.npy"))
+        metrics = evaluate_predictions(res["preds"], gt, len(res["names"]), iou_thresholds, conf_thres)
+        rescored[w] = dict(res, **metrics)
+    return rescored
+
+
+def _model_label(weights: str) -> str:
+    # runs/detect/<experiment>/weights/best.pt -> <experiment>/best
+    parts = os.path.normpath(weights).split(os.sep)
+    stem = os.path.splitext(parts[-1])[0]
+    return f"{parts[-3]}/{stem}" if len(parts) >= 3 else stem
+
+
+def print_class_table(results: Dict[str, Dict]) -> None:
+    for weights, res in results.items():
+        classes, overall = res["classes"], res["overall"]
+        print(f"\n📊 {_model_label(weights)} (P/R at conf {classes['conf']:.3f})")
+        print(f"  {'Class':12} {'Inst':>6} {'P':>6} {'R':>6} {'mAP50':>6} {'mAP50-95':>8}")
+        for c, name in res["names"].items():
+            print(f"  {name:12} {classes['instances'][c]:6d} {classes['precision'][c]:6.3f} "
+                  f"{classes['recall'][c]:6.3f} {classes['ap50'][c]:6.3f} {classes['ap'][c]:8.3f}")
+        print(f"  {'all':12} {int(classes['instances'].sum()):6d} {overall['precision']:6.3f} "
+              f"{overall['recall']:6.3f} {overall['map50']:6.3f} {overall['map']:8.3f}")
+
+
+#Function to print per-class changes of every model relative to a baseline model
+def print_model_diff(results: Dict[str, Dict], baseline: Optional[str] = None) -> None:
+    baseline = baseline or next(iter(results))
+    base = results[baseline]
+    for weights, res in results.items():
+        if weights == baseline:
+            continue
+        print(f"\n📈 {_model_label(weights)} vs {_model_label(baseline)}")
+        print(f"  {'Class':12} {'ΔP':>7} {'ΔR':>7} {'ΔmAP50':>7} {'ΔmAP50-95':>9}")
+        for c, name in res["names"].items():
+            d = {k: res["classes"][k][c] - base["classes"][k][c] for k in ("precision", "recall", "ap50", "ap")}
+            print(f"  {name:12} {d['precision']:+7.3f} {d['recall']:+7.3f} {d['ap50']:+7.3f} {d['ap']:+9.3f}")
+        d = {k: res["overall"][k] - base["overall"][k] for k in ("precision", "recall", "map50", "map")}
+        print(f"  {'all':12} {d['precision']:+7.3f} {d['recall']:+7.3f} {d['map50']:+7.3f} {d['map']:+9.3f}")
+
+
+#Function to write every model's per-class rows to classes.csv
+def save_eval(results: Dict[str, Dict], run_dir: Optional[str] = None) -> str:
+    run_dir = run_dir or os.path.join(EVAL_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, "classes.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=EVAL_COLUMNS)
+        writer.writeheader()
+        for weights, res in results.items():
+            classes = res["classes"]
+            for c, name in list(res["names"].items()) + [(None, "all")]:
+                if c is None:
+                    row = dict(res["overall"], instances=int(classes["instances"].sum()))
+                    row["map50_95"] = row.pop("map")
+                else:
+                    row = {"instances": int(classes["instances"][c]), "precision": classes["precision"][c],
+                           "recall": classes["recall"][c], "map50": classes["ap50"][c], "map50_95": classes["ap"][c]}
+                writer.writerow(dict(row, weights=weights, **{"class": name}))
+    return run_dir
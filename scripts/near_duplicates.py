@@ -0,0 +1,197 @@
+import os
+import cv2
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dataset_audit import AuditCache, collect_image_paths, split_of
+
+# 64-bit hashes are split into 4 x 16-bit chunks for multi-index hashing
+HASH_CHUNKS = 4
+CHUNK_BITS = 16
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+#Function to compute the 64-bit dHash and pHash of one image
+def image_hashes(path: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """
+    Returns (path, dhash, phash), with None hashes for unreadable files. JPEGs are decoded at
+    1/4 scale (done in the DCT domain, so much cheaper) since both hashes work on tiny thumbnails.
+    """
+    img = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if img is None:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None or img.size == 0:
+        return path, None, None
+
+    # dHash: sign of horizontal gradients on a 9x8 thumbnail
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    dhash = _bits_to_int((small[:, 1:] > small[:, :-1]).flatten())
+
+    # pHash: low-frequency 8x8 DCT block of a 32x32 thumbnail, thresholded at its median (DC excluded)
+    thumb = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(thumb)[:8, :8].flatten()
+    phash = _bits_to_int(low > np.median(low[1:]))
+    return path, dhash, phash
+
+
+#Function to hash every image under the given folders in parallel, reusing cached hashes
+def compute_hashes(
+    image_paths: Sequence[str],
+    workers: Optional[int] = None,
+    cache: Optional[AuditCache] = None,
+) -> Dict[str, Tuple[int, int]]:
+    cached, todo = cache.lookup_hashes(image_paths) if cache is not None else ({}, list(image_paths))
+
+    fresh = []
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        if workers == 1:
+            fresh = [image_hashes(p) for p in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                fresh = list(pool.map(image_hashes, todo, chunksize=64))
+        if cache is not None:
+            cache.store_hashes(fresh)
+
+    cached.update((p, (d, ph)) for p, d, ph in fresh if d is not None)
+    return cached
+
+
+def _popcount64(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).astype(np.int64)
+    return np.unpackbits(x.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+#Function to find all pairs within a Hamming distance using multi-index hashing (no O(N^2) scan)
+def find_near_pairs(hashes: np.ndarray, max_distance: int = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    hashes is a uint64 array. Two hashes within max_distance bits must agree to within
+    max_distance // 4 bits on at least one of their four 16-bit chunks (pigeonhole), so each
+    chunk is bucket-sorted once and probed with every flip pattern of that radius.
+    Returns (i, j, distance) arrays with i < j.
+    """
+    n = len(hashes)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    radius = max_distance // HASH_CHUNKS
+    probes = [0] + [sum(1 << b for b in bits)
+                    for r in range(1, radius + 1) for bits in combinations(range(CHUNK_BITS), r)]
+
+    candidates = []
+    for c in range(HASH_CHUNKS):
+        values = ((hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.int64)
+        order = np.argsort(values, kind="stable")
+        # starts[v]:starts[v + 1] is the run of chunk value v in order (a 65536-entry bucket table)
+        starts = np.zeros((1 << CHUNK_BITS) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(values, minlength=1 << CHUNK_BITS), out=starts[1:])
+        for probe in probes:
+            query = values ^ probe
+            lo = starts[query]
+            counts = starts[query + 1] - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            qi = np.repeat(np.arange(n), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            qj = order[np.repeat(lo, counts) + offsets]
+            # Verify each pass right away so only true matches are kept (and deduplicated)
+            keep = qi < qj
+            qi, qj = qi[keep], qj[keep]
+            keep = _popcount64(hashes[qi] ^ hashes[qj]) <= max_distance
+            candidates.append(qi[keep] * n + qj[keep])
+
+    keys = np.unique(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int64)
+    i, j = keys // n, keys % n
+    return i, j, _popcount64(hashes[i] ^ hashes[j])
+
+
+#Function to group matched pairs into clusters (union-find)
+def cluster_pairs(n: int, i: np.ndarray, j: np.ndarray) -> List[List[int]]:
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    groups = defaultdict(list)
+    for x in set(i.tolist()) | set(j.tolist()):
+        groups[find(x)].append(x)
+    return [sorted(g) for g in sorted(groups.values(), key=len, reverse=True)]
+
+
+#Function to find near-duplicate clusters within and across splits
+def find_near_duplicate_clusters(
+    dataset_dir: str,
+    max_distance: int = 10,
+    confirm_distance: int = 12,
+    workers: Optional[int] = None,
+    cache: Optional[AuditCache] = None,
+) -> List[Dict]:
+    """
+    Hashes every image under dataset_dir, searches pHash neighbours within max_distance,
+    confirms each pair with dHash within confirm_distance, and returns clusters as dicts
+    with the member paths, their splits and whether the cluster crosses splits.
+    """
+    paths = collect_image_paths(dataset_dir)
+    if cache is not None:
+        cache.prune("hashes", dataset_dir, paths)
+    hashes = compute_hashes(paths, workers=workers, cache=cache)
+    paths = [p for p in paths if p in hashes]
+
+    dhash = np.array([hashes[p][0] for p in paths], dtype=np.uint64)
+    phash = np.array([hashes[p][1] for p in paths], dtype=np.uint64)
+
+    i, j, _ = find_near_pairs(phash, max_distance)
+    confirmed = _popcount64(dhash[i] ^ dhash[j]) <= confirm_distance
+    i, j = i[confirmed], j[confirmed]
+
+    clusters = []
+    for members in cluster_pairs(len(paths), i, j):
+        member_paths = [paths[m] for m in members]
+        splits = sorted({split_of(p) for p in member_paths})
+        clusters.append({"paths": member_paths, "splits": splits, "cross_split": len(splits) > 1})
+    return clusters
+
+
+def print_near_duplicate_report(clusters: List[Dict], max_listed: int = 20) -> None:
+    if not clusters:
+        print("✅ No near-duplicate images found.")
+        return
+
+    cross = [c for c in clusters if c["cross_split"]]
+    within = [c for c in clusters if not c["cross_split"]]
+    print(f"⚠️ Found {len(clusters)} near-duplicate clusters "
+          f"({sum(len(c['paths']) for c in clusters)} images): {len(within)} within a split, {len(cross)} across splits")
+
+    # Leakage: evaluation images that have a near-duplicate in train
+    for split in ("valid", "test"):
+        leaked = sum(1 for c in cross if "train" in c["splits"] for p in c["paths"] if split_of(p) == split)
+        if leaked:
+            print(f"❌ {leaked} {split} images have a near-duplicate in train (train/{split} leakage)")
+
+    for title, group in (("Across splits", cross), ("Within a split", within)):
+        if not group:
+            continue
+        print(f"\n{title}:")
+        for k, cluster in enumerate(group[:max_listed], 1):
+            print(f"  Cluster {k} ({', '.join(cluster['splits'])}):")
+            for p in cluster["paths"]:
+                print(f"    - {p}")
+        if len(group) > max_listed:
+            print(f"  ... and {len(group) - max_listed} more")
@@ -0,0 +1,308 @@
+import json
+import os
+import shutil
+import cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from yolo_labels import load_label_files
+
+# --- Paths ---
+SHARDS_DIR = "../dataset/augmented/shards"
+EXPORT_DIR = "../dataset/augmented"
+
+MANIFEST_NAME = "manifest.json"
+JPEG_QUALITY = 90
+BORDER_COLOR = 114
+
+
+#Augmentation settings; the defaults mirror the fine-tuning hyperparameters in training-model.py
+@dataclass
+class AugmentConfig:
+    degrees: float = 10.0
+    translate: float = 0.2
+    scale: float = 0.3
+    shear: float = 5.0
+    perspective: float = 0.001
+    flipud: float = 0.1
+    fliplr: float = 0.5
+    hsv_h: float = 0.02
+    hsv_s: float = 0.7
+    hsv_v: float = 0.4
+    max_size: int = 640  # long side the source is shrunk to before augmenting
+    min_area_ratio: float = 0.1  # boxes that keep less of their area than this are dropped
+
+
+def _resize_long_side(img: np.ndarray, max_size: int) -> np.ndarray:
+    h, w = img.shape[:2]
+    if max(h, w) <= max_size:
+        return img
+    scale = max_size / max(h, w)
+    return cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+#Function to apply a random rotation/scale/shear/translation/perspective and move the boxes with it
+def random_perspective(img: np.ndarray, xyxy: np.ndarray, rng: np.random.Generator,
+                       cfg: AugmentConfig) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Same composition as Ultralytics (center, perspective, rotate+scale, shear, translate).
+    Each box's 4 corners are warped and re-enclosed; boxes that become tiny or lose most of
+    their area are dropped. Returns (image, boxes, indices of the kept input boxes).
+    """
+    h, w = img.shape[:2]
+    C = np.eye(3)
+    C[0, 2], C[1, 2] = -w / 2, -h / 2
+    P = np.eye(3)
+    P[2, 0], P[2, 1] = rng.uniform(-cfg.perspective, cfg.perspective, 2)
+    R = np.eye(3)
+    s = rng.uniform(1 - cfg.scale, 1 + cfg.scale)
+    R[:2] = cv2.getRotationMatrix2D((0, 0), rng.uniform(-cfg.degrees, cfg.degrees), s)
+    S = np.eye(3)
+    S[0, 1], S[1, 0] = np.tan(np.radians(rng.uniform(-cfg.shear, cfg.shear, 2)))
+    T = np.eye(3)
+    T[0, 2] = rng.uniform(0.5 - cfg.translate, 0.5 + cfg.translate) * w
+    T[1, 2] = rng.uniform(0.5 - cfg.translate, 0.5 + cfg.translate) * h
+    M = T @ S @ R @ P @ C
+
+    border = (BORDER_COLOR,) * 3
+    if cfg.perspective:
+        out = cv2.warpPerspective(img, M, (w, h), borderValue=border)
+    else:
+        out = cv2.warpAffine(img, M[:2], (w, h), borderValue=border)
+
+    if not len(xyxy):
+        return out, xyxy, np.zeros(0, dtype=np.int64)
+    corners = np.ones((len(xyxy) * 4, 3))
+    corners[:, :2] = xyxy[:, [0, 1, 2, 3, 0, 3, 2, 1]].reshape(-1, 2)  # x1y1, x2y2, x1y2, x2y1
+    corners = corners @ M.T
+    corners = (corners[:, :2] / corners[:, 2:3] if cfg.perspective else corners[:, :2]).reshape(len(xyxy), 8)
+    xs, ys = corners[:, 0::2], corners[:, 1::2]
+    new = np.column_stack([xs.min(1), ys.min(1), xs.max(1), ys.max(1)])
+    new[:, 0::2] = new[:, 0::2].clip(0, w)
+    new[:, 1::2] = new[:, 1::2].clip(0, h)
+
+    # Ultralytics box_candidates: big enough, kept enough of the (scaled) area, sane aspect ratio
+    w0, h0 = xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]
+    w1, h1 = new[:, 2] - new[:, 0], new[:, 3] - new[:, 1]
+    aspect = np.maximum(w1 / (h1 + 1e-16), h1 / (w1 + 1e-16))
+    keep = (w1 > 2) & (h1 > 2) & (w1 * h1 / (w0 * h0 * s * s + 1e-16) > cfg.min_area_ratio) & (aspect < 100)
+    return out, new[keep], np.flatnonzero(keep)
+
+
+#Function to jitter hue, saturation and value in place with lookup tables
+def augment_hsv(img: np.ndarray, rng: np.random.Generator, cfg: AugmentConfig) -> None:
+    gains = rng.uniform(-1, 1, 3) * [cfg.hsv_h, cfg.hsv_s, cfg.hsv_v] + 1
+    hue, sat, val = cv2.split(cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
+    x = np.arange(256, dtype=np.float64)
+    lut_hue = ((x * gains[0]) % 180).astype(np.uint8)
+    lut_sat = np.clip(x * gains[1], 0, 255).astype(np.uint8)
+    lut_val = np.clip(x * gains[2], 0, 255).astype(np.uint8)
+    hsv = cv2.merge((cv2.LUT(hue, lut_hue), cv2.LUT(sat, lut_sat), cv2.LUT(val, lut_val)))
+    cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=img)
+
+
+#Function to produce one augmented variant of an image and its YOLO boxes (class, cx, cy, w, h)
+def augment_one(img: np.ndarray, labels: np.ndarray, rng: np.random.Generator,
+                cfg: AugmentConfig) -> Tuple[np.ndarray, np.ndarray]:
+    h, w = img.shape[:2]
+    cls = labels[:, 0]
+    cx, cy, bw, bh = labels[:, 1] * w, labels[:, 2] * h, labels[:, 3] * w, labels[:, 4] * h
+    xyxy = np.column_stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2])
+
+    out, xyxy, kept = random_perspective(img, xyxy, rng, cfg)
+    augment_hsv(out, rng, cfg)
+    if rng.random() < cfg.fliplr:
+        out = out[:, ::-1]
+        xyxy[:, [0, 2]] = w - xyxy[:, [2, 0]]
+    if rng.random() < cfg.flipud:
+        out = out[::-1]
+        xyxy[:, [1, 3]] = h - xyxy[:, [3, 1]]
+
+    boxes = np.column_stack([
+        cls[kept],
+        (xyxy[:, 0] + xyxy[:, 2]) / 2 / w, (xyxy[:, 1] + xyxy[:, 3]) / 2 / h,
+        (xyxy[:, 2] - xyxy[:, 0]) / w, (xyxy[:, 3] - xyxy[:, 1]) / h,
+    ]).astype(np.float32)
+    return np.ascontiguousarray(out), boxes
+
+
+def shard_path(shards_dir: str, index: int) -> str:
+    return os.path.join(shards_dir, f"shard-{index:05d}.npz")
+
+
+#Worker: augment every source of one shard N times and write the shard (JPEG bytes + boxes)
+def write_shard(task: Tuple[int, List[Tuple[str, Optional[str]]], int, Dict, int, str]) -> Dict:
+    """
+    A shard holds `jpeg` (all encoded images back to back) with `offsets` into it, `boxes`
+    (class, cx, cy, w, h) with `box_offsets`, and the `sources` each record came from.
+    The RNG is seeded by (seed, shard index), so a shard is reproducible on its own.
+    """
+    index, items, variants, cfg_dict, seed, shards_dir = task
+    cfg = AugmentConfig(**cfg_dict)
+    rng = np.random.default_rng([seed, index])
+    encoded: List[bytes] = []
+    boxes: List[np.ndarray] = []
+    sources: List[str] = []
+    errors: List[str] = []
+    for image_path, label_path in items:
+        img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if img is None:
+            errors.append(f"{image_path}: unreadable image")
+            continue
+        img = _resize_long_side(img, cfg.max_size)
+        labels = load_label_files([label_path])[0][:, 1:] if label_path else np.zeros((0, 5))
+        for _ in range(variants):
+            out, out_boxes = augment_one(img, labels, rng, cfg)
+            ok, buf = cv2.imencode(".jpg", out, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if not ok:
+                errors.append(f"{image_path}: could not encode variant")
+                continue
+            encoded.append(buf.tobytes())
+            boxes.append(out_boxes)
+            sources.append(os.path.basename(image_path))
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    box_offsets = np.zeros(len(boxes) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in boxes], out=box_offsets[1:])
+    path = shard_path(shards_dir, index)
+    tmp = path + ".tmp.npz"
+    # JPEG bytes do not compress further, so the container itself is stored uncompressed
+    np.savez(tmp, jpeg=np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets=offsets,
+             boxes=np.concatenate(boxes) if boxes else np.zeros((0, 5), np.float32), box_offsets=box_offsets,
+             sources=np.array(sources))
+    os.replace(tmp, path)
+    return {"shard": path, "records": len(encoded), "errors": errors}
+
+
+def _label_for(image_path: str) -> Optional[str]:
+    image_dir, name = os.path.split(image_path)
+    label = os.path.join(os.path.dirname(image_dir), "labels", os.path.splitext(name)[0] + ".txt")
+    return label if os.path.exists(label) else None
+
+
+#Function to pre-generate augmented variants of many images on a process pool, into shards
+def build_shards(
+    image_paths: Sequence[str],
+    shards_dir: str = SHARDS_DIR,
+    variants: int = 4,
+    cfg: Optional[AugmentConfig] = None,
+    shard_size: int = 64,
+    workers: Optional[int] = None,
+    seed: int = 0,
+) -> Dict:
+    """
+    Splits image_paths into shards of shard_size sources (variants records each) and builds
+    them in parallel. Shards already on disk are kept when the manifest (sources, variants,
+    settings, seed) is unchanged, so an interrupted run resumes where it stopped; changed
+    settings rebuild everything. Returns a summary with record counts and errors.
+    """
+    cfg = cfg or AugmentConfig()
+    image_paths = sorted(image_paths)
+    manifest = {"variants": variants, "seed": seed, "shard_size": shard_size, "config": asdict(cfg),
+                "sources": [os.path.abspath(p) for p in image_paths]}
+    os.makedirs(shards_dir, exist_ok=True)
+    manifest_path = os.path.join(shards_dir, MANIFEST_NAME)
+    same = False
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            same = json.load(f) == manifest
+    if not same:
+        for name in os.listdir(shards_dir):
+            if name.startswith("shard-"):
+                os.remove(os.path.join(shards_dir, name))
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    chunks = [image_paths[i:i + shard_size] for i in range(0, len(image_paths), shard_size)]
+    tasks = [(i, [(p, _label_for(p)) for p in chunk], variants, asdict(cfg), seed, shards_dir)
+             for i, chunk in enumerate(chunks) if not os.path.exists(shard_path(shards_dir, i))]
+    summary = {"shards": len(chunks), "built": len(tasks), "records": 0, "errors": []}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for done, result in enumerate(pool.map(write_shard, tasks), 1):
+            summary["records"] += result["records"]
+            summary["errors"].extend(result["errors"])
+            print(f"  🧩 {done}/{len(tasks)} shards ({result['records']} records) -> {result['shard']}")
+    return summary
+
+
+#Read-only view of one shard: decode record i on demand
+class ShardReader:
+    def __init__(self, path: str):
+        self.path = path
+        with np.load(path) as data:
+            self.jpeg = data["jpeg"]
+            self.offsets = data["offsets"]
+            self.boxes = data["boxes"]
+            self.box_offsets = data["box_offsets"]
+            self.sources = data["sources"].tolist()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def encoded(self, i: int) -> np.ndarray:
+        return self.jpeg[self.offsets[i]:self.offsets[i + 1]]
+
+    def labels(self, i: int) -> np.ndarray:
+        return self.boxes[self.box_offsets[i]:self.box_offsets[i + 1]]
+
+    def record(self, i: int) -> Tuple[str, np.ndarray, np.ndarray]:
+        return self.sources[i], cv2.imdecode(self.encoded(i), cv2.IMREAD_COLOR), self.labels(i)
+
+
+def list_shards(shards_dir: str = SHARDS_DIR) -> List[str]:
+    return sorted(os.path.join(shards_dir, f) for f in os.listdir(shards_dir)
+                  if f.startswith("shard-") and f.endswith(".npz") and ".tmp" not in f)
+
+
+#Generator that streams (source, image, boxes) records back, decoding a window ahead on threads
+def iter_records(shards_dir: str = SHARDS_DIR, shuffle: bool = True, seed: int = 0,
+                 workers: int = 4, prefetch: int = 32) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    With shuffle=True the shard order and the record order inside each shard are shuffled
+    (one shard is held in memory at a time). Boxes are YOLO (class, cx, cy, w, h).
+    """
+    rng = np.random.default_rng(seed)
+    shards = list_shards(shards_dir)
+    if shuffle:
+        rng.shuffle(shards)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path in shards:
+            reader = ShardReader(path)
+            order = rng.permutation(len(reader)) if shuffle else np.arange(len(reader))
+            pending = deque()
+            for i in order.tolist():
+                pending.append(pool.submit(reader.record, i))
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+#Function to write the shards out as a YOLO images/labels folder that data.yaml can point at
+def export_yolo(shards_dir: str = SHARDS_DIR, out_dir: str = EXPORT_DIR) -> List[str]:
+    """
+    The stored JPEG bytes are written as is (no re-encode); files of a previous export are
+    replaced. Returns the exported image paths.
+    """
+    image_dir, label_dir = os.path.join(out_dir, "images"), os.path.join(out_dir, "labels")
+    for folder in (image_dir, label_dir):
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.makedirs(folder)
+    paths = []
+    for path in list_shards(shards_dir):
+        reader = ShardReader(path)
+        shard = os.path.splitext(os.path.basename(path))[0]
+        for i in range(len(reader)):
+            stem = f"{os.path.splitext(reader.sources[i])[0]}_{shard}_{i:04d}"
+            image_path = os.path.join(image_dir, stem + ".jpg")
+            with open(image_path, "wb") as f:
+                f.write(reader.encoded(i).tobytes())
+            with open(os.path.join(label_dir, stem + ".txt"), "w") as f:
+                f.writelines(f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n" for c, x, y, w, h in reader.labels(i).tolist())
+            paths.append(image_path)
+    return paths
@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from box_tracker import Detections
+
+Color = Tuple[int, int, int]
+
+
+#Renderer that draws all boxes of a class in one call and blits cached, pre-rendered label tags
+class OverlayRenderer:
+    """
+    Boxes are grouped by class and drawn with one cv2.polylines call per class. Each label
+    tag ("name: 0.87" on its class-colored background) is rendered once into a small sprite
+    that is cached (LRU, max_sprites) and copied into the frame with a slice assignment,
+    so cv2.getTextSize / putText only run for labels not seen before. With 6 classes and
+    2-decimal confidences there are at most ~600 distinct tags.
+    """
+
+    def __init__(
+        self,
+        names: Dict[int, str],
+        colors: Optional[Dict[str, Color]] = None,
+        default_color: Color = (255, 255, 255),
+        font_scale: float = 0.6,
+        font_thickness: int = 2,
+        box_thickness: int = 2,
+        text_color: Color = (0, 0, 0),
+        label_height: Optional[int] = None,
+        max_sprites: int = 1024,
+    ):
+        self.names = dict(names)
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self.font_scale = font_scale
+        self.font_thickness = font_thickness
+        self.box_thickness = box_thickness
+        self.text_color = text_color
+        self.label_height = label_height
+        self.max_sprites = max_sprites
+        self.sprites: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+        # Per-class color table, indexed by class id
+        colors = colors or {}
+        size = max(self.names, default=-1) + 1
+        self.colors = [colors.get(self.names.get(c, str(c)), default_color) for c in range(size)]
+        self.default_color = default_color
+
+    def color(self, cls: int) -> Color:
+        return self.colors[cls] if 0 <= cls < len(self.colors) else self.default_color
+
+    def label_sprite(self, cls: int, conf_pct: int) -> np.ndarray:
+        """The rendered tag for a class and confidence in percent (cached)."""
+        key = (cls, conf_pct)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
+
+        label = f"{self.names.get(cls, str(cls))}: {conf_pct / 100:.2f}"
+        (text_width, text_height), _ = cv2.getTextSize(label, self.font, self.font_scale, self.font_thickness)
+        height = self.label_height or text_height + 10
+        sprite = np.empty((height, text_width, 3), dtype=np.uint8)
+        sprite[:] = self.color(cls)
+        cv2.putText(sprite, label, (0, height - 5), self.font, self.font_scale, self.text_color,
+                    self.font_thickness)
+
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def _blit(self, frame: np.ndarray, sprite: np.ndarray, x: int, y: int) -> None:
+        # Copy sprite with its top-left corner at (x, y), clipped to the frame
+        h, w = sprite.shape[:2]
+        fh, fw = frame.shape[:2]
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, fw), min(y + h, fh)
+        if x0 < x1 and y0 < y1:
+            frame[y0:y1, x0:x1] = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    def draw(self, frame: np.ndarray, detections: Detections) -> np.ndarray:
+        """Draws every box and label tag onto frame in place and returns it."""
+        xyxy, confs, classes = detections
+        if not len(xyxy):
+            return frame
+        boxes = np.rint(xyxy).astype(np.int32)
+        classes = classes.astype(np.int64)
+
+        # Boxes: one polylines call per class. cv2.rectangle with thickness t covers t - 1 pixels
+        # on each side of the edge; concentric 1-pixel outlines cover the same band much faster
+        # than OpenCV's thick-line rasterizer.
+        rings = np.arange(-(self.box_thickness - 1), self.box_thickness)
+        grown = (boxes[None, :, :] + rings[:, None, None] * np.array([-1, -1, 1, 1], dtype=np.int32))
+        x1, y1, x2, y2 = grown.transpose(2, 0, 1)
+        quads = np.stack([np.stack([x1, y1], -1), np.stack([x2, y1], -1),
+                          np.stack([x2, y2], -1), np.stack([x1, y2], -1)], axis=-2)  # (rings, n, 4, 2)
+        for cls in np.unique(classes).tolist():
+            cv2.polylines(frame, list(quads[:, classes == cls].reshape(-1, 4, 2)), True, self.color(cls), 1)
+
+        # Labels: cached sprites placed above each box's top-left corner
+        conf_pct = np.rint(confs * 100).astype(np.int64).tolist()
+        for (bx, by), cls, pct in zip(boxes[:, :2].tolist(), classes.tolist(), conf_pct):
+            sprite = self.label_sprite(cls, pct)
+            self._blit(frame, sprite, bx, by - sprite.shape[0])
+        return frame
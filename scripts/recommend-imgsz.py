@@ -0,0 +1,47 @@
+import argparse
+import os
+
+import numpy as np
+
+from dataset_tiers import read_class_names
+from imgsz_recommender import (CANDIDATE_SIZES, MIN_OBJECT_PIXELS, letterboxed_sizes, print_size_table,
+                               recommend_imgsz, size_table, split_box_pixels)
+
+# --- Paths ---
+DATASET_DIR = "../dataset"
+DATA_YAML = "../dataset/data.yaml"
+SPLITS = ["train", "valid", "test"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend the smallest input size that keeps objects large enough, "
+                                                 "from label box sizes and image header sizes")
+    parser.add_argument("--splits", nargs="+", default=SPLITS, help="splits whose labels are pooled")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(CANDIDATE_SIZES), help="candidate imgsz values")
+    parser.add_argument("--min-pixels", type=float, default=MIN_OBJECT_PIXELS,
+                        help="smallest useful object size, sqrt of the box area in model-input pixels")
+    parser.add_argument("--share", type=float, default=0.95, help="share of each class's objects that must stay above it")
+    parser.add_argument("--classes", nargs="+", default=None,
+                        help="only the classes this deployment needs (names from data.yaml), e.g. --classes pen mouse")
+    args = parser.parse_args()
+
+    names = read_class_names(DATA_YAML)
+    unknown = [name for name in args.classes or [] if name not in names]
+    if unknown:
+        raise SystemExit(f"Unknown classes: {', '.join(unknown)} (data.yaml has {', '.join(names)})")
+
+    parts = [split_box_pixels(os.path.join(DATASET_DIR, split)) for split in args.splits]
+    cls = np.concatenate([p[0] for p in parts])
+    wh = np.concatenate([p[1] for p in parts])
+    image_wh = np.concatenate([p[2] for p in parts])
+    print(f"📦 {len(cls)} boxes from {', '.join(args.splits)}")
+
+    sizes = sorted(args.sizes)
+    table = size_table(cls, letterboxed_sizes(wh, image_wh, sizes), len(names), args.min_pixels)
+    classes = [names.index(name) for name in args.classes] if args.classes else None
+    recommendation = recommend_imgsz(table, sizes, args.share, classes)
+    print_size_table(table, names, sizes, args.min_pixels, recommendation)
+
+
+if __name__ == "__main__":
+    main()
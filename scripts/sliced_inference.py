@@ -0,0 +1,208 @@
+import os
+import numpy as np
+from typing import Dict, Iterator, Optional, Tuple
+
+from batch_inference import iter_batches, letterbox, unletterbox_boxes
+from box_tracker import Detections, result_to_detections
+from dataset_audit import collect_image_paths
+from stage_timer import StageTimer
+
+MERGE_METHODS = ("nms", "wbf")
+# Tiles whose subsampled pixels vary less than this (0-255 scale) are treated as empty
+MIN_TILE_STD = 4.0
+# Tile boxes this close to a tile side inside the image are cut-off parts of a larger or neighbouring object
+EDGE_MARGIN = 2
+
+
+def _axis_starts(length: int, tile: int, overlap: float) -> np.ndarray:
+    if length <= tile:
+        return np.zeros(1, dtype=np.int64)
+    stride = max(1, int(tile * (1 - overlap)))
+    count = int(np.ceil((length - tile) / stride)) + 1
+    # Spread evenly so the last tile ends on the image border; actual overlap is >= the requested one
+    return np.round(np.linspace(0, length - tile, count)).astype(np.int64)
+
+
+#Function to lay overlapping tile x tile windows over an image
+def tile_grid(height: int, width: int, tile: int = 640, overlap: float = 0.2) -> np.ndarray:
+    """Returns (k, 2) int64 (x0, y0) tile origins; images smaller than a tile get one tile at (0, 0)."""
+    xs = _axis_starts(width, tile, overlap)
+    ys = _axis_starts(height, tile, overlap)
+    gx, gy = np.meshgrid(xs, ys)
+    return np.stack([gx.ravel(), gy.ravel()], axis=1)
+
+
+#Function to cut all tiles of an image in one fancy-indexing copy
+def cut_tiles(img: np.ndarray, origins: np.ndarray, tile: int = 640, color: int = 114) -> np.ndarray:
+    """Returns (k, tile, tile, 3) uint8; images smaller than a tile are padded right/bottom with the letterbox gray."""
+    h, w = img.shape[:2]
+    if h < tile or w < tile:
+        padded = np.full((max(h, tile), max(w, tile), 3), color, dtype=np.uint8)
+        padded[:h, :w] = img
+        img = padded
+    windows = np.lib.stride_tricks.sliding_window_view(img, (tile, tile, 3))
+    return windows[origins[:, 1], origins[:, 0], 0]
+
+
+#Function to flag tiles with (almost) no texture, which cannot contain an object worth a model call
+def empty_tiles(tiles: np.ndarray, min_std: float = MIN_TILE_STD, step: int = 8) -> np.ndarray:
+    sample = tiles[:, ::step, ::step].astype(np.float32)
+    return sample.std(axis=(1, 2)).mean(axis=1) < min_std
+
+
+def _pairwise_overlap(xyxy: np.ndarray, metric: str) -> np.ndarray:
+    tl = np.maximum(xyxy[:, None, :2], xyxy[None, :, :2])
+    br = np.minimum(xyxy[:, None, 2:], xyxy[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area = (xyxy[:, 2:] - xyxy[:, :2]).clip(0).prod(axis=1)
+    if metric == "ios":
+        # Intersection over the smaller box: a box cut off at a tile edge still matches the full one
+        denom = np.minimum(area[:, None], area[None, :])
+    else:
+        denom = area[:, None] + area[None, :] - inter
+    return inter / np.maximum(denom, 1e-9)
+
+
+#Function to merge duplicate detections from overlapping tiles (class-aware greedy NMS, or weighted box fusion)
+def merge_detections(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, threshold: float = 0.5,
+                     method: str = "nms", metric: str = "ios") -> Detections:
+    """
+    All pairwise overlaps are computed in one (n, n) array; the greedy pass only ORs rows of it.
+    nms keeps the most confident box of each cluster, wbf replaces it with the confidence-weighted
+    mean of the cluster (keeping the highest confidence).
+    """
+    if method not in MERGE_METHODS:
+        raise ValueError(f"Unknown merge method '{method}' (choose from {', '.join(MERGE_METHODS)})")
+    if len(xyxy) < 2:
+        return xyxy, conf, cls
+    order = np.argsort(-conf, kind="stable")
+    xyxy, conf, cls = xyxy[order], conf[order], cls[order]
+    over = (_pairwise_overlap(xyxy, metric) >= threshold) & (cls[:, None] == cls[None, :])
+
+    suppressed = np.zeros(len(xyxy), dtype=bool)
+    keep = []
+    for i in range(len(xyxy)):
+        if not suppressed[i]:
+            keep.append(i)
+            suppressed |= over[i]
+    keep = np.asarray(keep)
+    if method == "nms":
+        return xyxy[keep], conf[keep], cls[keep]
+
+    # Each box belongs to the first (most confident) kept box that suppressed it
+    owner = np.argmax(over[keep], axis=0)
+    weights = np.zeros(len(keep), dtype=np.float64)
+    fused = np.zeros((len(keep), 4), dtype=np.float64)
+    np.add.at(weights, owner, conf)
+    np.add.at(fused, owner, xyxy * conf[:, None])
+    return (fused / weights[:, None]).astype(np.float32), conf[keep], cls[keep]
+
+
+def _to_tensor(inputs: np.ndarray):
+    import torch
+
+    # BGR uint8 NHWC -> RGB float NCHW in [0, 1]
+    return torch.from_numpy(np.ascontiguousarray(inputs[..., ::-1].transpose(0, 3, 1, 2))).float() / 255.0
+
+
+#Function to detect on one image tile by tile at the model's native size, plus one downscaled full view
+def sliced_predict(
+    model,
+    img: np.ndarray,
+    tile: int = 640,
+    overlap: float = 0.2,
+    conf: float = 0.25,
+    batch_size: int = 16,
+    device: str = "cpu",
+    full_image: bool = True,
+    merge: str = "nms",
+    merge_threshold: float = 0.5,
+    min_std: float = MIN_TILE_STD,
+    letterboxed: Optional[Tuple[np.ndarray, float, Tuple[int, int]]] = None,
+    timer: Optional[StageTimer] = None,
+) -> Detections:
+    """
+    Small objects keep their full resolution inside a tile; the letterboxed full view (full_image)
+    still catches objects larger than the tile overlap, so tile boxes cut by an inner tile side
+    are dropped. Textureless tiles are skipped before inference.
+    letterboxed is letterbox(img, tile) when the caller already has it. Returns xyxy (n, 4)
+    float32 in original pixels, conf (n,) and cls (n,) int64.
+    """
+    timer = timer or StageTimer()
+    h, w = img.shape[:2]
+    edges = np.array([0, 0, tile, tile], dtype=np.float32)
+    with timer.stage("tile"):
+        origins = tile_grid(h, w, tile, overlap)
+        # One tile covers the image: slicing adds nothing over the full view
+        tiles = cut_tiles(img, origins, tile) if len(origins) > 1 else np.empty((0, tile, tile, 3), np.uint8)
+        busy = ~empty_tiles(tiles, min_std) if len(tiles) else np.zeros(0, dtype=bool)
+        tiles, origins = tiles[busy], origins[busy]
+        offsets = np.zeros((len(tiles) + 1, 4), dtype=np.float32)
+        offsets[:len(tiles)] = np.tile(origins, 2)
+        if full_image or not len(tiles):
+            canvas, scale, pad = letterboxed or letterbox(img, tile)
+            tiles = np.concatenate([tiles, canvas[None]])
+
+    boxes, confs, classes = [], [], []
+    for start in range(0, len(tiles), batch_size):
+        chunk = tiles[start:start + batch_size]
+        with timer.stage("to tensor"):
+            tensor = _to_tensor(chunk)
+        with timer.stage("inference"):
+            results = model.predict(source=tensor, imgsz=tile, conf=conf, device=device, verbose=False)
+        if results:
+            timer.record_speed(results[0].speed, images=len(chunk))
+        for index, result in enumerate(results, start):
+            xyxy, p, c = result_to_detections(result)
+            if index < len(origins):
+                if full_image:
+                    # A box touching an inner tile side is cut off; the same object is whole in a
+                    # neighbouring tile (it overlaps) or, when larger than the overlap, in the full view
+                    inner = np.concatenate([offsets[index, :2] > 0, offsets[index, 2:] + tile < [w, h]])
+                    cut = ((np.abs(xyxy - edges) <= EDGE_MARGIN) & inner).any(axis=1)
+                    xyxy, p, c = xyxy[~cut], p[~cut], c[~cut]
+                xyxy = xyxy + offsets[index]
+            else:
+                xyxy = unletterbox_boxes(xyxy, scale, pad, img.shape)
+            boxes.append(xyxy)
+            confs.append(p)
+            classes.append(c)
+
+    with timer.stage("merge"):
+        xyxy = np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32)
+        np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+        p = np.concatenate(confs) if confs else np.zeros(0, dtype=np.float32)
+        c = np.concatenate(classes) if classes else np.zeros(0, dtype=np.int64)
+        return merge_detections(xyxy, p, c, merge_threshold, merge)
+
+
+#Generator with the same output as batch_inference.stream_predictions, detecting tile by tile
+def stream_sliced_predictions(
+    model,
+    source: str,
+    tile: int = 640,
+    overlap: float = 0.2,
+    conf: float = 0.25,
+    batch_size: int = 16,
+    device: str = "cpu",
+    workers: Optional[int] = None,
+    prefetch: int = 2,
+    merge: str = "nms",
+    timer: Optional[StageTimer] = None,
+) -> Iterator[Dict]:
+    """Images are decoded (and letterboxed for the full view) on a thread pool, prefetch images ahead of the model."""
+    timer = timer or StageTimer()
+    paths = collect_image_paths(source) if os.path.isdir(source) else [source]
+    for batch in iter_batches(paths, 1, tile, workers, prefetch, timer):
+        item = batch[0]
+        xyxy, p, c = sliced_predict(model, item["image"], tile, overlap, conf, batch_size, device, merge=merge,
+                                    letterboxed=(item["input"], item["scale"], item["pad"]), timer=timer)
+        yield {
+            "path": item["path"],
+            "image": item["image"],
+            "shape": item["image"].shape[:2],
+            "xyxy": xyxy,
+            "conf": p,
+            "cls": c,
+        }
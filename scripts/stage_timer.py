@@ -0,0 +1,141 @@
+import atexit
+import json
+import os
+import threading
+import time
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional
+
+# Ultralytics Results.speed keys (ms per image) and the stage names they are reported under
+ULTRALYTICS_SPEED_STAGES = {"preprocess": "preprocess", "inference": "forward", "postprocess": "nms"}
+
+
+#Fixed-size ring buffer of the most recent durations of one stage
+class RollingHistogram:
+    def __init__(self, window: int = 2048):
+        self.values = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.values[self.count % len(self.values)] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def recent(self) -> np.ndarray:
+        return self.values[:min(self.count, len(self.values))]
+
+
+class _Span:
+    # A plain class rather than @contextmanager: about half the cost per stage
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "StageTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start, self.start)
+        return False
+
+
+#Per-stage wall-clock timer: context-manager stages, rolling percentiles, optional Chrome trace
+class StageTimer:
+    """
+    `with timer.stage("forward"):` costs a few microseconds, so it can stay on in the live
+    loop. Percentiles cover the last `window` samples of each stage; totals and counts cover
+    the whole run. With trace=True the last max_events spans are kept for a Chrome trace
+    (chrome://tracing or Perfetto), one row per thread.
+    """
+
+    def __init__(self, window: int = 2048, trace: bool = False, max_events: int = 200_000):
+        self.window = window
+        self.stages: Dict[str, RollingHistogram] = {}
+        self.lock = threading.Lock()
+        self.trace = trace
+        self.events: deque = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+
+    def stage(self, name: str) -> "_Span":
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float, start: Optional[float] = None) -> None:
+        with self.lock:
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = RollingHistogram(self.window)
+            hist.add(seconds)
+            if self.trace and start is not None:
+                self.events.append((name, start, seconds, threading.get_ident()))
+
+    def record_speed(self, speed: Dict[str, float], images: int = 1) -> None:
+        """Adds the preprocess / forward / NMS split that Ultralytics reports in Results.speed (ms per image)."""
+        for key, name in ULTRALYTICS_SPEED_STAGES.items():
+            if speed.get(key) is not None:
+                self.record(name, speed[key] * images / 1000.0)
+
+    def summary(self) -> List[Dict]:
+        with self.lock:
+            items = list(self.stages.items())
+        elapsed = max(time.perf_counter() - self.origin, 1e-9)
+        rows = []
+        for name, hist in items:
+            ms = hist.recent() * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+            rows.append({
+                "stage": name,
+                "count": hist.count,
+                "mean_ms": hist.total * 1000 / max(hist.count, 1),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": hist.max * 1000,
+                "total_s": hist.total,
+                "share": hist.total / elapsed,
+            })
+        return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+    def print_summary(self, title: str = "Stage timing") -> None:
+        rows = self.summary()
+        if not rows:
+            return
+        print(f"\n⏱️ {title} (percentiles over the last {self.window} samples per stage)")
+        print(f"  {'Stage':18} {'count':>7} {'mean ms':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'total s':>8} {'share':>6}")
+        for r in rows:
+            print(f"  {r['stage'][:18]:18} {r['count']:7d} {r['mean_ms']:8.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+                  f"{r['p99_ms']:8.2f} {r['max_ms']:8.2f} {r['total_s']:8.2f} {r['share'] * 100:5.1f}%")
+        print("  (share = stage time / wall-clock time; nested or concurrent stages can add up to more than 100%)")
+
+    def save_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"stages": self.summary()}, f, indent=2)
+
+    def save_chrome_trace(self, path: str) -> None:
+        with self.lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [{"name": name, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": seconds * 1e6,
+                  "pid": pid, "tid": tid} for name, start, seconds, tid in events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    def report_on_exit(self, title: str = "Stage timing", trace_path: Optional[str] = None) -> None:
+        """Prints the breakdown when the process exits and writes the trace / JSON summary if a path is given."""
+        def report():
+            self.print_summary(title)
+            if trace_path:
+                self.save_chrome_trace(trace_path)
+                self.save_json(os.path.splitext(trace_path)[0] + "_summary.json")
+                print(f"  Trace saved to: {trace_path}")
+
+        if trace_path:
+            self.trace = True
+        atexit.register(report)
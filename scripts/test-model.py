@@ -1,55 +1,175 @@
 import os
-from ultralytics import YOLO
+import argparse
 import shutil
 import cv2
 import glob
 
+from batch_inference import PREDICTION_WRITERS, stream_predictions, stream_server_predictions
+from inference_client import InferenceClient
+from model_backends import BACKENDS, load_backend_model
+from overlay import OverlayRenderer
+from sliced_inference import MERGE_METHODS, stream_sliced_predictions
+from stage_timer import StageTimer
+
 # Define paths
 MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp502/weights/best.pt"
 SOURCE_PATH = "../dataset/test/images"
 SAVE_DIR = "runs/predict/AI-In-Robotics-CPU-Test"  # fixed output folder
+IMGSZ = 320  # smaller = faster
+TILE_SIZE = 640  # sliced mode: tiles at the model's training size, so small objects keep their pixels
+CONF = 0.25  # confidence threshold
+
+# Per-stage timing, printed when the script exits
+timer = StageTimer()
+
+
+#Streaming mode: batched inference with prefetching, results written to disk as they arrive
+def run_streaming(model, args, client=None):
+    out_path = os.path.join(SAVE_DIR, f"predictions.{args.format}")
+    image_dir = os.path.join(SAVE_DIR, "images")
+    if args.save_images:
+        os.makedirs(image_dir, exist_ok=True)
+
+    preview = args.preview
+    if preview:
+        print("\n🖼 Press any key to move to the next image. Press 'Esc' to stop previewing.")
+
+    if client is not None:
+        names = client.names
+        predictions = stream_server_predictions(client, SOURCE_PATH, concurrency=args.batch_size)
+    elif args.mode == "sliced":
+        names = model.names
+        predictions = stream_sliced_predictions(model, SOURCE_PATH, tile=args.tile, overlap=args.overlap, conf=CONF,
+                                                batch_size=args.batch_size, device="cpu", workers=args.workers,
+                                                prefetch=args.prefetch, merge=args.merge, timer=timer)
+    else:
+        names = model.names
+        predictions = stream_predictions(model, SOURCE_PATH, batch_size=args.batch_size, imgsz=IMGSZ, conf=CONF,
+                                         device="cpu", workers=args.workers, prefetch=args.prefetch, timer=timer)
+
+    renderer = OverlayRenderer(names, default_color=(0, 255, 0), font_scale=0.5, font_thickness=1)
+
+    with PREDICTION_WRITERS[args.format](out_path, names) as writer:
+        for pred in predictions:
+            with timer.stage("write"):
+                writer.write(pred)
+            if args.save_images or preview:
+                with timer.stage("draw"):
+                    img = pred["image"] if pred["image"] is not None else cv2.imread(pred["path"])
+                    renderer.draw(img, (pred["xyxy"], pred["conf"], pred["cls"]))
+                if args.save_images:
+                    with timer.stage("save image"):
+                        cv2.imwrite(os.path.join(image_dir, os.path.basename(pred["path"])), img)
+                if preview:
+                    cv2.imshow("Prediction", img)
+                    if cv2.waitKey(0) == 27:  # ESC key
+                        preview = False
+                        cv2.destroyAllWindows()
+            if writer.images % 200 == 0:
+                print(f"  {writer.images} images, {writer.boxes} boxes")
+
+    if args.preview:
+        cv2.destroyAllWindows()
+
+    # Print summary
+    print("\n✅ Inference complete!")
+    print(f"Detected {writer.boxes} object(s) in {writer.images} image(s)")
+    print(f"Predictions saved to: {out_path}")
+    print(f"Model used: {client.url if client is not None else MODEL_PATH}")
+
+
+#Original mode: one predict() call over the whole folder, then preview the saved images
+def run_predict_all(model):
+    # Run inference
+    with timer.stage("predict all"):
+        results = model.predict(
+            source=SOURCE_PATH,   # directory or single image
+            imgsz=IMGSZ,
+            conf=CONF,
+            save=True,            # save annotated images
+            save_dir=SAVE_DIR,    # fixed output folder
+            device="cpu"          # CPU mode
+        )
+    for result in results:
+        timer.record_speed(result.speed)
+
+    # Print summary
+    print("\n✅ Inference complete!")
+    print(f"Detected {len(results)} image(s)")
+    print(f"Results saved to: {SAVE_DIR}")
+    print(f"Model used: {MODEL_PATH}")
+
+    # Preview all predicted images one by one
+    predicted_images = sorted(glob.glob(os.path.join(SAVE_DIR, "*.jpg")))
+
+    if predicted_images:
+        print("\n🖼 Press any key to move to the next image. Press 'Esc' to exit early.")
+        for img_path in predicted_images:
+            img = cv2.imread(img_path)
+            cv2.imshow("Prediction", img)
+            key = cv2.waitKey(0)
+            if key == 27:  # ESC key
+                break
+        cv2.destroyAllWindows()
+    else:
+        print("No predicted images found to preview.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the trained model on the test images")
+    parser.add_argument("--mode", choices=["stream", "sliced", "predict"], default="stream",
+                        help="stream: batched inference written to disk as it runs; sliced: like stream, but "
+                             "large images are detected in overlapping tiles; predict: original single call")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None, help="decode / letterbox threads")
+    parser.add_argument("--prefetch", type=int, default=2, help="batches decoded ahead of the model")
+    parser.add_argument("--format", choices=sorted(PREDICTION_WRITERS), default="jsonl",
+                        help="stream mode output: one JSON line per image, or float32 rows in a .npy file")
+    parser.add_argument("--save-images", action="store_true", help="stream mode: also save annotated images")
+    parser.add_argument("--preview", action="store_true", help="stream mode: show each image as it is predicted")
+    parser.add_argument("--tile", type=int, default=TILE_SIZE, help="sliced mode: tile size (the model input size)")
+    parser.add_argument("--overlap", type=float, default=0.2, help="sliced mode: minimum overlap between tiles")
+    parser.add_argument("--merge", choices=MERGE_METHODS, default="nms",
+                        help="sliced mode: how duplicates across tiles are merged")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch",
+                        help="runtime for the local model; exports are built on first use (see export-model.py)")
+    parser.add_argument("--server", default=None, metavar="URL",
+                        help="stream mode: send images to a running inference_server.py instead of loading the model")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="also write a Chrome trace (chrome://tracing, Perfetto) of every stage to PATH")
+    args = parser.parse_args()
+
+    timer.report_on_exit("Test inference stage timing", args.trace)
+
+    # Clear old results and create folder
+    if os.path.exists(SAVE_DIR):
+        shutil.rmtree(SAVE_DIR)
+    os.makedirs(SAVE_DIR, exist_ok=True)
+
+    # Ensure paths exist
+    if not os.path.exists(SOURCE_PATH):
+        raise FileNotFoundError(f"Source path not found: {SOURCE_PATH}")
+
+    if args.mode == "sliced" and args.server:
+        print("ℹ️ Sliced mode runs the model locally; ignoring --server")
+        args.server = None
+
+    if args.mode == "stream" and args.server:
+        # Thin client: the server already holds the warm model
+        run_streaming(None, args, InferenceClient(args.server, imgsz=IMGSZ, conf=CONF))
+    else:
+        if not os.path.exists(MODEL_PATH):
+            raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
+
+        # Load trained YOLO model in the chosen runtime
+        with timer.stage("load model"):
+            model = load_backend_model(MODEL_PATH, args.backend, args.tile if args.mode == "sliced" else IMGSZ)
 
-# Clear old results and create folder
-if os.path.exists(SAVE_DIR):
-    shutil.rmtree(SAVE_DIR)
-os.makedirs(SAVE_DIR, exist_ok=True)
-
-# Ensure paths exist
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
-if not os.path.exists(SOURCE_PATH):
-    raise FileNotFoundError(f"Source path not found: {SOURCE_PATH}")
-
-# Load trained YOLO model
-model = YOLO(MODEL_PATH)
-
-# Run inference
-results = model.predict(
-    source=SOURCE_PATH,   # directory or single image
-    imgsz=320,            # smaller = faster
-    conf=0.25,            # confidence threshold
-    save=True,            # save annotated images
-    save_dir=SAVE_DIR,    # fixed output folder
-    device="cpu"          # CPU mode
-)
-
-# Print summary
-print("\n✅ Inference complete!")
-print(f"Detected {len(results)} image(s)")
-print(f"Results saved to: {SAVE_DIR}")
-print(f"Model used: {MODEL_PATH}")
-
-# Preview all predicted images one by one
-predicted_images = sorted(glob.glob(os.path.join(SAVE_DIR, "*.jpg")))
-
-if predicted_images:
-    print("\n🖼 Press any key to move to the next image. Press 'Esc' to exit early.")
-    for img_path in predicted_images:
-        img = cv2.imread(img_path)
-        cv2.imshow("Prediction", img)
-        key = cv2.waitKey(0)
-        if key == 27:  # ESC key
-            break
-    cv2.destroyAllWindows()
-else:
-    print("No predicted images found to preview.")
+        if args.mode in ("stream", "sliced"):
+            if args.backend != "pytorch" and args.batch_size != 1:
+                # Exports have a static batch of 1; decoding is still prefetched
+                print(f"ℹ️ {args.backend} export runs one image per call; using --batch-size 1")
+                args.batch_size = 1
+            run_streaming(model, args)
+        else:
+            run_predict_all(model)
@@ -0,0 +1,65 @@
+import argparse
+import json
+
+from experiment_registry import ExperimentRegistry
+from training_orchestrator import load_queue, run_queue
+
+
+def parse_filters(pairs):
+    # key=value pairs; values are parsed as JSON when possible (imgsz=512 -> 512, optimizer=AdamW -> "AdamW")
+    filters = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        try:
+            filters[key] = json.loads(value)
+        except json.JSONDecodeError:
+            filters[key] = value
+    return filters
+
+
+def _fmt(value, spec, width):
+    return format(value, spec) if value is not None else "-".rjust(width)
+
+
+def print_experiments(rows):
+    print(f"\n{'Experiment':40} {'status':12} {'epochs':>6} {'best':>5} {'mAP50':>6} {'mAP50-95':>8}")
+    print("-" * 82)
+    for row in rows:
+        print(f"{row['name'][:40]:40} {row['status']:12} {_fmt(row['epochs_done'], '6d', 6)} "
+              f"{_fmt(row['best_epoch'], '5d', 5)} {_fmt(row['best_map50'], '6.3f', 6)} "
+              f"{_fmt(row['best_map50_95'], '8.3f', 8)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue, run and resume training experiments; search past runs")
+    parser.add_argument("--queue", help="YAML list of configs: model (start weights) plus model.train() arguments, "
+                                        "optional name and keep_top_k")
+    parser.add_argument("--run", action="store_true", help="run every unfinished experiment (resumes interrupted ones)")
+    parser.add_argument("--parallel", type=int, default=1, help="experiments trained at the same time")
+    parser.add_argument("--keep-top-k", type=int, default=3,
+                        help="save_period checkpoints kept per run (a config's keep_top_k overrides it)")
+    parser.add_argument("--max-restarts", type=int, default=2, help="automatic resumes after a crash")
+    parser.add_argument("--search", nargs="*", metavar="KEY=VALUE",
+                        help="list indexed runs matching args.yaml values, e.g. --search imgsz=512")
+    parser.add_argument("--status", choices=("queued", "running", "finished", "failed", "interrupted"))
+    args = parser.parse_args()
+
+    with ExperimentRegistry() as registry:
+        registry.index_all()
+        if args.queue:
+            for config in load_queue(args.queue):
+                name = registry.register(config)
+                print(f"📝 Queued {name}")
+
+    if args.queue or args.run:
+        statuses = run_queue(parallel=args.parallel, keep_top_k=args.keep_top_k, max_restarts=args.max_restarts)
+        for name, status in statuses.items():
+            print(f"{'✅' if status == 'finished' else '❌'} {name}: {status}")
+
+    if args.search is not None or args.status or not (args.queue or args.run):
+        with ExperimentRegistry() as registry:
+            print_experiments(registry.search(status=args.status, **parse_filters(args.search or [])))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,64 @@
 # scripts/training-model.py
 import os
-import pickle
-from ultralytics import YOLO
+import time
+
+from class_sampling import build_balanced_data, image_class_index, print_balance_report
+from detection_metrics import weak_classes
+from metrics_store import MetricsStore
+from model_eval import evaluate_models, print_model_diff
+from offline_augment import build_shards, export_yolo
+from stage_timer import StageTimer
+from training_orchestrator import train_or_resume
+
+# --- Paths ---
+DATASET_DIR = "../dataset"
+DATA_YAML = "../dataset/data.yaml"
+# 512px tier written by build-dataset-tiers.py; used when present so training decodes smaller images
+TIER_DATA_YAML = "../dataset/tiers/512/data.yaml"
+# Starting point when the experiment registry has no run with weights on disk
+DEFAULT_MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp502/weights/best.pt"
+FINETUNE_SUFFIX = "Finetune"
+
+# Online augmentation when offline shards (offline_augment.py) are in the train list: the shard variants
+# already carry rotation, shear, perspective, flips and HSV jitter at full strength, so stacking the same
+# transforms online would double them (looser boxes, off-distribution colours). The strongest geometric
+# ones are turned off; the rest are halved so the original images still get some variation.
+SHARD_ONLINE_AUGMENTATION = dict(
+    degrees=0.0,
+    shear=0.0,
+    perspective=0.0,
+    flipud=0.0,
+    translate=0.1,
+    scale=0.15,
+    fliplr=0.25,
+    hsv_h=0.01,
+    hsv_s=0.35,
+    hsv_v=0.2,
+)
+
+# Per-step timing of the fine-tuning run, printed when the script exits
+timer = StageTimer()
 
 
 def analyze_weak_classes(model_path):
     """Analyze which classes are underperforming"""
-    model = YOLO(model_path)
-
-    # Get validation results
-    metrics = model.val()
+    # Per-class metrics from the checkpoint's cached predictions (inference only runs the first time)
+    with timer.stage("validate (weak classes)"):
+        result = evaluate_models([model_path], imgsz=512)[model_path]
+    classes, names = result["classes"], result["names"]
 
     # Print class-wise metrics
     print("\n=== CLASS PERFORMANCE ANALYSIS ===")
-    for i, class_name in enumerate(metrics.names):
-        precision = metrics.box.mp[i] if hasattr(metrics.box, 'mp') else 0
-        recall = metrics.box.mr[i] if hasattr(metrics.box, 'mr') else 0
-        print(f"{class_name}: Precision={precision:.3f}, Recall={recall:.3f}")
+    for i, class_name in names.items():
+        print(f"{class_name}: Precision={classes['precision'][i]:.3f}, Recall={classes['recall'][i]:.3f}, "
+              f"mAP50={classes['ap50'][i]:.3f}")
 
     # Identify weak classes (thresholds can be adjusted)
-    weak_classes = []
-    for i, class_name in enumerate(metrics.names):
-        precision = metrics.box.mp[i] if hasattr(metrics.box, 'mp') else 0
-        recall = metrics.box.mr[i] if hasattr(metrics.box, 'mr') else 0
-
-        if precision < 0.7 or recall < 0.6:  # Adjust thresholds as needed
-            weak_classes.append(i)
-            print(f"🚨 WEAK CLASS DETECTED: {class_name}")
+    weak = weak_classes(classes, min_precision=0.7, min_recall=0.6)
+    for i in weak:
+        print(f"🚨 WEAK CLASS DETECTED: {names[i]}")
 
-    return weak_classes, metrics.names
+    return weak, names
 
 
 def main():
@@ -40,22 +70,48 @@ def main():
     os.environ["MKL_NUM_THREADS"] = "4"
     os.environ["ULTRALYTICS_CACHE"] = "ram"
 
-    # Step 1: Analyze current model to identify weak classes
-    model_path = "runs/detect/AI-In-Robotics-CPU-Exp502/weights/best.pt"
+    timer.report_on_exit("Fine-tuning step timing")
+
+    # Experiment registry plus per-epoch / per-class metrics of every run (runs/experiments.sqlite)
+    store = MetricsStore()
+    store.ingest_all()
+    registry = store.registry
+
+    # An interrupted fine-tune is resumed from its last checkpoint instead of starting over
+    pending = [row for row in registry.unfinished() if row["name"].endswith(f"-{FINETUNE_SUFFIX}")]
+    if pending:
+        name = pending[-1]["name"]
+        print(f"🔁 Found unfinished fine-tune {name} ({pending[-1]['status']})")
+        finish_finetune(name, registry.config(name), store)
+        return
+
+    # Step 1: Analyze the best model so far to identify weak classes
+    model_path = registry.best_weights() or DEFAULT_MODEL_PATH
     weak_classes, class_names = analyze_weak_classes(model_path)
 
     print(f"\n🎯 Target weak classes: {[class_names[i] for i in weak_classes]}")
 
-    # Load model for fine-tuning
-    model = YOLO(model_path)
+    data = TIER_DATA_YAML if os.path.exists(TIER_DATA_YAML) else DATA_YAML
+
+    # Oversample images containing the weak classes (repeat-factor sampling through a train list)
+    augmented = []
+    if weak_classes:
+        split_root = os.path.dirname(TIER_DATA_YAML) if data == TIER_DATA_YAML else DATASET_DIR
+        names = [class_names[i] for i in sorted(class_names)]
+        augmented = create_focused_augmentation_pipeline(weak_classes, names, os.path.join(split_root, "train"))
+        balance = build_balanced_data(names, weak_classes, train_dir=os.path.join(split_root, "train"),
+                                      val_dir=os.path.join(split_root, "valid"), extra_images=augmented)
+        print_balance_report(balance, names, weak_classes)
+        data = balance["data"]
+    print(f"📁 Training data: {data}")
 
     # Enhanced training configuration for weak class improvement
-    results = model.train(
-        data="../dataset/data.yaml",
+    config = dict(
+        model=model_path,
+        data=data,
         epochs=30,  # Shorter for fine-tuning
         imgsz=512,
         batch=8,
-        name="AI-In-Robotics-CPU-Exp503-Finetune",  # New experiment name
         verbose=True,
 
         # Optimizer & Learning Rate
@@ -64,6 +120,7 @@ def main():
         lrf=0.01,  # Final learning rate
 
         # Data Augmentation - Enhanced for weak classes
+        # (scaled down by SHARD_ONLINE_AUGMENTATION below when offline-augmented shard images are used)
         degrees=10.0,  # Increased rotation
         translate=0.2,  # Increased translation
         scale=0.3,  # Increased scaling
@@ -89,8 +146,7 @@ def main():
         warmup_momentum=0.8,
         warmup_bias_lr=0.1,
 
-        # Class balancing (if supported)
-        # class_weights=[1.0, 1.0, 1.0, 2.0, 2.0, 1.0]  # Adjust based on weak_classes
+        # Class balancing: done by the oversampled train list built above (class_sampling.py)
 
         # Overlap and NMS settings
         overlap_mask=True,
@@ -98,49 +154,60 @@ def main():
 
         # Validation
         val=True,
-        save_period=5,  # Save checkpoint every 5 epochs
+        save_period=5,  # Save checkpoint every 5 epochs (pruned to the best 3 afterwards)
     )
+    if augmented:
+        config.update(SHARD_ONLINE_AUGMENTATION)
+        print(f"🧩 {len(augmented)} offline-augmented images in the train list: online augmentation reduced")
+    # New experiment name (AI-In-Robotics-CPU-Exp<next>-Finetune)
+    name = registry.register(config, suffix=FINETUNE_SUFFIX)
+    finish_finetune(name, config, store)
 
-    # Save results
-    results_dir = "runs/detect/AI-In-Robotics-CPU-Exp503-Finetune"
-    os.makedirs(results_dir, exist_ok=True)
-    results_path = os.path.join(results_dir, "results.pkl")
-    with open(results_path, "wb") as f:
-        pickle.dump(results, f)
 
-    # Generate performance comparison
-    generate_performance_comparison(model_path, results_dir, class_names)
+def finish_finetune(name, config, store):
+    """Train (or resume) the fine-tune, store its metrics and compare it with its starting model"""
+    train_start = time.perf_counter()
+    train_or_resume(name, config, store.registry, keep_top_k=3)
+    timer.record("train", time.perf_counter() - train_start, train_start)
 
-    print(f"\n✅ Fine-tuning complete! Results saved to: {results_path}")
-    print(f"📂 Plots, labels, and checkpoints are in '{results_dir}'")
+    # Store per-epoch results and args (queryable with metrics-store.py instead of a pickled results object)
+    results_dir = os.path.join(store.registry.project_dir, name)
+    store.ingest_run(results_dir)
 
+    # Generate performance comparison
+    generate_performance_comparison(config["model"], results_dir, store)
 
-def generate_performance_comparison(original_model_path, new_results_dir, class_names):
-    """Compare performance before and after fine-tuning"""
-    original_model = YOLO(original_model_path)
-    new_model = YOLO(os.path.join(new_results_dir, "weights", "best.pt"))
+    print(f"\n✅ Fine-tuning complete! Metrics stored in: {store.registry.path}")
+    print(f"📂 Plots, labels, and checkpoints are in '{results_dir}'")
 
-    print("\n📊 PERFORMANCE COMPARISON")
-    print("Class\t\tOriginal mAP50\tNew mAP50\tImprovement")
-    print("-" * 60)
 
-    # This is a simplified comparison - you might need to run proper validation
-    orig_metrics = original_model.val()
-    new_metrics = new_model.val()
+def generate_performance_comparison(original_model_path, new_results_dir, store=None):
+    """Compare per-class performance before and after fine-tuning"""
+    new_model_path = os.path.join(new_results_dir, "weights", "best.pt")
 
-    for i, class_name in enumerate(class_names):
-        orig_map = getattr(orig_metrics.box, 'map50', 0) if hasattr(orig_metrics.box, 'map50') else 0
-        new_map = getattr(new_metrics.box, 'map50', 0) if hasattr(new_metrics.box, 'map50') else 0
-        improvement = new_map - orig_map
+    # Both checkpoints are scored in parallel on a single decode of the validation split
+    with timer.stage("validate (comparison)"):
+        results = evaluate_models([original_model_path, new_model_path], imgsz=512)
+    if store is not None:
+        for path, result in results.items():
+            store.add_class_metrics(path, result, imgsz=512)
 
-        print(f"{class_name:12}\t{orig_map:.3f}\t\t{new_map:.3f}\t\t{improvement:+.3f}")
+    print("\n📊 PERFORMANCE COMPARISON")
+    print_model_diff(results, baseline=original_model_path)
 
 
-def create_focused_augmentation_pipeline():
+def create_focused_augmentation_pipeline(weak_classes, class_names, train_dir, variants=4):
     """Create augmentation pipeline specifically for weak classes"""
-    # This would be used if you're doing custom data augmentation
-    # outside of YOLO's built-in augmentations
-    pass
+    # Pre-generates augmented variants of every training image that contains a weak class, on all
+    # cores, and exports them as extra training images. Resumes if interrupted; reused while unchanged.
+    images, presence = image_class_index(train_dir, len(class_names))
+    selected = [path for path, row in zip(images, presence[:, weak_classes].any(1)) if row]
+    print(f"\n🧩 Offline augmentation: {len(selected)} images with weak classes x {variants} variants")
+    with timer.stage("offline augmentation"):
+        summary = build_shards(selected, variants=variants)
+        if summary["errors"]:
+            print(f"⚠️ {len(summary['errors'])} images could not be augmented")
+        return export_yolo()
 
 
 if __name__ == "__main__":
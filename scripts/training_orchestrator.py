@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence
+
+from experiment_registry import PROJECT_DIR, REGISTRY_PATH, ExperimentRegistry, prune_checkpoints, training_finished
+from inference_benchmark import set_worker_threads
+
+# Keys of a queued config that are not model.train() arguments
+_CONFIG_ONLY = ("model", "name", "keep_top_k")
+
+
+#Function to train an experiment, or resume it from weights/last.pt if an earlier attempt stopped
+def train_or_resume(name: str, config: Dict, registry: ExperimentRegistry, keep_top_k: int = 3):
+    """
+    config holds "model" (weights to start from) plus model.train() arguments. Status and the
+    args/results index are kept up to date in the registry; afterwards the save_period
+    checkpoints are pruned to the top keep_top_k epochs. Returns model.train()'s result
+    (None when the run had already finished).
+    """
+    from ultralytics import YOLO
+
+    run_dir = os.path.join(registry.project_dir, name)
+    last = os.path.join(run_dir, "weights", "last.pt")
+    # Resuming a completed (or early-stopped) run is rejected by Ultralytics: there is nothing left to train
+    if os.path.exists(last) and training_finished(run_dir):
+        print(f"✅ {name} already finished training")
+        registry.index_run(run_dir)
+        registry.set_status(name, "finished")
+        return None
+
+    registry.set_status(name, "running")
+    try:
+        if os.path.exists(last):
+            print(f"🔁 Resuming {name} from {last}")
+            results = YOLO(last).train(resume=True)
+        else:
+            print(f"🚀 Starting {name}")
+            args = {k: v for k, v in config.items() if k not in _CONFIG_ONLY}
+            results = YOLO(config["model"]).train(project=registry.project_dir, name=name, exist_ok=True, **args)
+        registry.set_status(name, "finished")
+        return results
+    except KeyboardInterrupt:
+        registry.set_status(name, "interrupted", "KeyboardInterrupt")
+        raise
+    except Exception as e:
+        registry.set_status(name, "failed", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        if os.path.isdir(run_dir):
+            registry.index_run(run_dir)
+            prune_checkpoints(run_dir, keep_top_k)
+
+
+#Worker: one attempt at one experiment, in a fresh process with its own registry connection
+def _train_worker(name: str, registry_path: str, project_dir: str, keep_top_k: int) -> str:
+    with ExperimentRegistry(registry_path, project_dir) as registry:
+        config = registry.config(name)
+        try:
+            # A queued config may keep more (or fewer) checkpoints than the queue-wide default
+            train_or_resume(name, config, registry, int(config.get("keep_top_k", keep_top_k)))
+        except Exception:
+            pass  # recorded in the registry as failed
+        return registry.get(name)["status"]
+
+
+def _run_with_restarts(name: str, registry_path: str, project_dir: str, threads: int, keep_top_k: int,
+                       max_restarts: int) -> str:
+    status = "failed"
+    for attempt in range(max_restarts + 1):
+        # A fresh spawned process per attempt: a crashed worker (e.g. out of memory) cannot take the queue down
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"),
+                                 initializer=set_worker_threads, initargs=(threads,)) as pool:
+            try:
+                status = pool.submit(_train_worker, name, registry_path, project_dir, keep_top_k).result()
+            except BrokenProcessPool:
+                status = "failed"
+                with ExperimentRegistry(registry_path, project_dir) as registry:
+                    registry.set_status(name, "failed", "worker process crashed", restart=attempt < max_restarts)
+        if status == "finished":
+            break
+        if attempt < max_restarts:
+            print(f"⚠️ {name} {status}; restarting from its last checkpoint ({attempt + 1}/{max_restarts})")
+    return status
+
+
+#Function to run queued experiments one after another or several at a time, resuming unfinished ones
+def run_queue(
+    names: Optional[Sequence[str]] = None,
+    parallel: int = 1,
+    keep_top_k: int = 3,
+    max_restarts: int = 2,
+    registry_path: str = REGISTRY_PATH,
+    project_dir: str = PROJECT_DIR,
+) -> Dict[str, str]:
+    """
+    names defaults to every experiment in the registry that is not finished (queued, running
+    when a previous session died, failed or interrupted). CPU threads are split between the
+    parallel runs. Returns the final status per experiment.
+    """
+    with ExperimentRegistry(registry_path, project_dir) as registry:
+        names = list(names) if names is not None else [row["name"] for row in registry.unfinished()]
+    if not names:
+        return {}
+    parallel = max(1, min(parallel, len(names)))
+    threads = max(1, (os.cpu_count() or 1) // parallel)
+    print(f"📋 {len(names)} experiments, {parallel} at a time x {threads} threads")
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        statuses = pool.map(lambda n: _run_with_restarts(n, registry_path, project_dir, threads, keep_top_k,
+                                                         max_restarts), names)
+        return dict(zip(names, statuses))
+
+
+def load_queue(path: str) -> List[Dict]:
+    """A YAML (or JSON) list of configs, or a mapping with an "experiments" list."""
+    import yaml
+
+    with open(path) as f:
+        data = yaml.safe_load(f)
+    return data["experiments"] if isinstance(data, dict) else list(data)
@@ -1,76 +1,130 @@
 import os
+import argparse
 import shutil
 import cv2
-from ultralytics import YOLO
 import tkinter as tk
 from tkinter import filedialog
 
+from box_tracker import result_to_detections
+from inference_client import DEFAULT_SERVER_URL, InferenceClient, server_available
+from model_backends import BACKENDS, load_backend_model
+from overlay import OverlayRenderer
+from sliced_inference import sliced_predict
+from stage_timer import StageTimer
+
 # --- Paths ---
 MODEL_PATH = "runs/detect/AI-In-Robotics-CPU-Exp81/weights/best.pt"
 SAVE_DIR = "runs/predict/AI-In-Robotics-CPU-Upload"
+IMGSZ = 300
+TILE_SIZE = 640  # --sliced: tiles at the model's training size
+CONF = 0.25
 
-# --- Prepare save folder ---
-if os.path.exists(SAVE_DIR):
-    shutil.rmtree(SAVE_DIR)
-os.makedirs(SAVE_DIR, exist_ok=True)
+# Per-stage timing, printed when the script exits
+timer = StageTimer()
 
-# --- Check model exists ---
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
 
-# --- Load YOLO model ---
-model = YOLO(MODEL_PATH)
+#Function to run one image through a freshly loaded local model (the original, slow path)
+def predict_locally(image_path, backend="pytorch"):
+    # --- Prepare save folder ---
+    if os.path.exists(SAVE_DIR):
+        shutil.rmtree(SAVE_DIR)
+    os.makedirs(SAVE_DIR, exist_ok=True)
 
-# --- File upload dialog ---
-root = tk.Tk()
-root.withdraw()
-image_path = filedialog.askopenfilename(
-    title="Select an image",
-    filetypes=[("Image files", "*.jpg *.jpeg *.png")]
-)
+    # --- Check model exists ---
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
 
-if image_path and os.path.exists(image_path):
-    print(f"✅ Selected image: {image_path}")
+    # --- Load YOLO model in the chosen runtime ---
+    with timer.stage("load model"):
+        model = load_backend_model(MODEL_PATH, backend, IMGSZ)
 
     # --- Run inference ---
-    results = model.predict(
-        source=image_path,
-        imgsz=300,
-        conf=0.25,
-        save=True,
-        save_dir=SAVE_DIR,
-        device="cpu"
+    with timer.stage("inference"):
+        results = model.predict(
+            source=image_path,
+            imgsz=IMGSZ,
+            conf=CONF,
+            save=True,
+            save_dir=SAVE_DIR,
+            device="cpu"
+        )
+    timer.record_speed(results[0].speed)
+    print(f"Results saved to: {results[0].path}")
+    return result_to_detections(results[0]), results[0].names
+
+
+#Function to run one large image tile by tile at native resolution, so small objects are not shrunk away
+def predict_sliced(image_path, backend="pytorch", tile=TILE_SIZE, overlap=0.2):
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Model not found at: {MODEL_PATH}")
+    with timer.stage("load model"):
+        model = load_backend_model(MODEL_PATH, backend, tile)
+    with timer.stage("decode"):
+        img = cv2.imread(image_path)
+    detections = sliced_predict(model, img, tile=tile, overlap=overlap, conf=CONF,
+                                batch_size=1 if backend != "pytorch" else 16, timer=timer)
+    return detections, model.names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the model on one image picked in a file dialog")
+    parser.add_argument("--server", default=DEFAULT_SERVER_URL,
+                        help="inference server to use when it is running (see inference_server.py)")
+    parser.add_argument("--local", action="store_true", help="always load the model in this process")
+    parser.add_argument("--sliced", action="store_true",
+                        help="detect in overlapping native-size tiles (small objects in large images); runs locally")
+    parser.add_argument("--tile", type=int, default=TILE_SIZE, help="--sliced tile size")
+    parser.add_argument("--overlap", type=float, default=0.2, help="--sliced minimum overlap between tiles")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch",
+                        help="runtime when the model is loaded locally (see export-model.py)")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="also write a Chrome trace (chrome://tracing, Perfetto) of every stage to PATH")
+    args = parser.parse_args()
+
+    timer.report_on_exit("Upload test stage timing", args.trace)
+
+    # --- File upload dialog ---
+    root = tk.Tk()
+    root.withdraw()
+    image_path = filedialog.askopenfilename(
+        title="Select an image",
+        filetypes=[("Image files", "*.jpg *.jpeg *.png")]
     )
 
-    # --- Load original image ---
-    img = cv2.imread(image_path)
-
-    # --- Draw bounding boxes and confidence on the image ---
-    for box in results[0].boxes:  # iterate over detections
-        x1, y1, x2, y2 = map(int, box.xyxy[0])  # bounding box coordinates
-        conf = float(box.conf[0])  # confidence
-        cls = int(box.cls[0])      # class index
-        label = f"{results[0].names[cls]}: {conf:.2f}"
-        print("The image you have inserted contains a " + label)
-
-        # Draw rectangle
-        cv2.rectangle(img, (x1, y1), (x2, y2), color=(0, 255, 0), thickness=2)
-        # Draw label background
-        (text_width, text_height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-        cv2.rectangle(img, (x1, y1 - 20), (x1 + text_width, y1), (0, 255, 0), -1)
-        # Draw text
-        cv2.putText(img, label, (x1, y1 - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-
-    # --- Display image with bounding boxes ---
-    cv2.imshow("Prediction", img)
+    if image_path and os.path.exists(image_path):
+        print(f"✅ Selected image: {image_path}")
 
-    print(f"Results saved to: {results[0].path}")
-    print("Press any key to close the image window...")
+        # --- Run inference (on the warm server when one is up) ---
+        if args.sliced:
+            (xyxy, confs, classes), names = predict_sliced(image_path, args.backend, args.tile, args.overlap)
+        elif not args.local and server_available(args.server):
+            client = InferenceClient(args.server, imgsz=IMGSZ, conf=CONF)
+            with timer.stage("inference (server)"):
+                (xyxy, confs, classes), names = client.predict(image_path), client.names
+            print(f"Served by: {args.server}")
+        else:
+            (xyxy, confs, classes), names = predict_locally(image_path, args.backend)
+
+        # --- Load original image ---
+        with timer.stage("decode"):
+            img = cv2.imread(image_path)
+
+        # --- Draw bounding boxes and confidence on the image ---
+        for conf, cls in zip(confs.tolist(), classes.tolist()):
+            print(f"The image you have inserted contains a {names[cls]}: {conf:.2f}")
+        with timer.stage("draw"):
+            renderer = OverlayRenderer(names, default_color=(0, 255, 0), font_scale=0.5, font_thickness=1,
+                                       label_height=20)
+            renderer.draw(img, (xyxy, confs, classes))
+
+        # --- Display image with bounding boxes ---
+        cv2.imshow("Prediction", img)
+
+        print("Press any key to close the image window...")
 
 
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
 
-else:
-    print("No image selected or file does not exist.")
+    else:
+        print("No image selected or file does not exist.")
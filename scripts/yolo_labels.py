@@ -0,0 +1,178 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Column layout of the bulk label array
+LABEL_COLUMNS = ("image", "class", "cx", "cy", "w", "h")
+
+
+#Function to list the label files of a split in a stable order
+def list_label_files(label_dir: str) -> List[str]:
+    return [os.path.join(label_dir, f) for f in os.listdir(label_dir) if f.lower().endswith('.txt')]
+
+
+#Function to parse many YOLO label files into one (N, 6) array
+def load_label_files(label_paths: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, int, str]]]:
+    """
+    Returns (boxes, line_numbers, errors):
+      boxes        - float64 array of shape (N, 6): image index, class, cx, cy, w, h
+      line_numbers - int array of shape (N,) with the 1-based source line of each box
+      errors       - (image index, line number, message) for lines that could not be parsed
+    The image index is the position of the file in label_paths.
+    """
+    tokens: List[List[str]] = []
+    owners: List[int] = []
+    line_numbers: List[int] = []
+    errors: List[Tuple[int, int, str]] = []
+
+    for idx, label_path in enumerate(label_paths):
+        try:
+            with open(label_path, 'r') as f:
+                text = f.read()
+        except Exception as e:
+            errors.append((idx, 0, f"{label_path}: Error reading file - {e}"))
+            continue
+
+        for line_num, line in enumerate(text.splitlines(), 1):
+            parts = line.split()
+            if not parts:
+                continue
+            # Check format (should have 5 values)
+            if len(parts) != 5:
+                errors.append((idx, line_num, f"{label_path} Line {line_num}: Expected 5 values, got {len(parts)}"))
+                continue
+            tokens.append(parts)
+            owners.append(idx)
+            line_numbers.append(line_num)
+
+    if not tokens:
+        return np.zeros((0, 6)), np.zeros(0, dtype=np.int64), errors
+
+    raw = np.array(tokens)
+    ok = np.ones(len(raw), dtype=bool)
+    values = np.zeros((len(raw), 5))
+    try:
+        # Class ids must be plain integers, like int() in the old per-line parser
+        values[:, 0] = raw[:, 0].astype(np.int64)
+        values[:, 1:] = raw[:, 1:].astype(np.float64)
+    except ValueError:
+        # Rare path: find the offending rows one by one
+        for i, parts in enumerate(tokens):
+            try:
+                values[i] = [int(parts[0])] + [float(p) for p in parts[1:]]
+            except ValueError:
+                ok[i] = False
+                label_path = label_paths[owners[i]]
+                errors.append((owners[i], line_numbers[i], f"{label_path} Line {line_numbers[i]}: Cannot parse values"))
+
+    boxes = np.column_stack([np.asarray(owners, dtype=np.float64), values])[ok]
+    return boxes, np.asarray(line_numbers, dtype=np.int64)[ok], errors
+
+
+#Function to run every YOLO annotation check as a vectorized mask over the whole array
+def find_box_errors(
+    boxes: np.ndarray,
+    line_numbers: np.ndarray,
+    label_paths: Sequence[str],
+    num_classes: int = 6,
+    tol: float = 0.0,
+) -> List[Tuple[int, int, str]]:
+    """
+    Returns (image index, line number, message) for every failed check, same messages as before.
+    tol widens the [0, 1] range checks to absorb rounding when boxes come from float32 storage.
+    """
+    cls, cx, cy, w, h = (boxes[:, i] for i in range(1, 6))
+    lo, hi = -tol, 1 + tol
+
+    checks = [
+        # Check class ID
+        (
+            (cls < 0) | (cls >= num_classes),
+            lambda i: f"Invalid class_id={int(cls[i])} (valid: 0-{num_classes - 1})",
+        ),
+        # Check normalization (0-1 range, inclusive)
+        ((cx < lo) | (cx > hi), lambda i: f"center_x={cx[i]!s} out of range [0,1]"),
+        ((cy < lo) | (cy > hi), lambda i: f"center_y={cy[i]!s} out of range [0,1]"),
+        ((w < lo) | (w > hi), lambda i: f"width={w[i]!s} out of range [0,1]"),
+        ((h < lo) | (h > hi), lambda i: f"height={h[i]!s} out of range [0,1]"),
+        # Check dimensions are positive
+        ((w <= 0) | (h <= 0), lambda i: "width and height must be > 0"),
+        # Check if the bounding box is within image boundaries
+        (
+            (cx - w / 2 < lo) | (cx + w / 2 > hi) | (cy - h / 2 < lo) | (cy + h / 2 > hi),
+            lambda i: "Bounding box extends beyond image boundaries",
+        ),
+    ]
+
+    flagged = []
+    for order, (mask, _) in enumerate(checks):
+        for i in np.flatnonzero(mask):
+            flagged.append((int(i), order))
+    flagged.sort()
+
+    errors = []
+    for i, order in flagged:
+        idx, line_num = int(boxes[i, 0]), int(line_numbers[i])
+        errors.append((idx, line_num, f"{label_paths[idx]} Line {line_num}: {checks[order][1](i)}"))
+    return errors
+
+
+#Function to load and validate label files in bulk, returning the boxes and per-file error messages
+def validate_label_files(
+    label_paths: Sequence[str],
+    num_classes: int = 6,
+) -> Tuple[np.ndarray, List[List[str]]]:
+    boxes, line_numbers, errors = load_label_files(label_paths)
+    errors.extend(find_box_errors(boxes, line_numbers, label_paths, num_classes))
+    # Keep the file / line order of the old per-line validator (sort is stable within a line)
+    errors.sort(key=lambda e: (e[0], e[1]))
+
+    per_file: List[List[str]] = [[] for _ in label_paths]
+    for idx, _, message in errors:
+        per_file[idx].append(message)
+    return boxes, per_file
+
+
+#Function to summarize a label array: class histogram and box-size statistics
+def label_statistics(boxes: np.ndarray, num_classes: int = 6) -> Dict:
+    cls = boxes[:, 1].astype(np.int64)
+    valid = (cls >= 0) & (cls < num_classes)
+    w, h = boxes[:, 4], boxes[:, 5]
+    area = w * h
+
+    stats = {
+        "boxes": len(boxes),
+        "images_with_boxes": len(np.unique(boxes[:, 0])),
+        "class_counts": np.bincount(cls[valid], minlength=num_classes),
+        "size_percentiles": {},
+        "per_class_median_area": np.full(num_classes, np.nan),
+    }
+    if len(boxes):
+        for name, col in (("width", w), ("height", h), ("area", area)):
+            stats["size_percentiles"][name] = np.percentile(col, [5, 25, 50, 75, 95])
+        order = np.argsort(cls[valid], kind="stable")
+        sorted_cls, sorted_area = cls[valid][order], area[valid][order]
+        starts = np.searchsorted(sorted_cls, np.arange(num_classes))
+        ends = np.searchsorted(sorted_cls, np.arange(num_classes), side="right")
+        for c in range(num_classes):
+            if ends[c] > starts[c]:
+                stats["per_class_median_area"][c] = np.median(sorted_area[starts[c]:ends[c]])
+    return stats
+
+
+def print_label_statistics(stats: Dict, names: Optional[Sequence[str]] = None) -> None:
+    counts = stats["class_counts"]
+    names = names or [str(i) for i in range(len(counts))]
+    total = max(int(counts.sum()), 1)
+
+    print(f"\n📊 Label statistics: {stats['boxes']} boxes in {stats['images_with_boxes']} images")
+    print("  Class        Boxes   Share   Median area")
+    for c, count in enumerate(counts):
+        median_area = stats["per_class_median_area"][c]
+        area_text = "-" if np.isnan(median_area) else f"{median_area:.4f}"
+        print(f"  {names[c]:12} {count:6d}  {count / total * 100:5.1f}%   {area_text}")
+
+    if stats["size_percentiles"]:
+        print("  Box size percentiles (normalized)   p5     p25    p50    p75    p95")
+        for name, values in stats["size_percentiles"].items():
+            print(f"  {name:35}" + " ".join(f"{v:6.3f}" for v in values))
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from dataset_audit import AuditCache, run_audit, run_label_audit  # noqa: E402
+
+
+def _rows(cache, table):
+    return sorted(os.path.basename(r[0]) for r in cache.conn.execute(f"SELECT path FROM {table}"))
+
+
+def test_deleted_labels_are_pruned(tmp_path):
+    label_dir, other_dir = tmp_path / "labels", tmp_path / "labels2"
+    for folder in (label_dir, other_dir):
+        folder.mkdir()
+        for name in ("a.txt", "b.txt"):
+            (folder / name).write_text("0 0.5 0.5 0.2 0.2\n")
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+    run_label_audit(str(label_dir), cache=cache)
+    run_label_audit(str(other_dir), cache=cache)
+
+    os.remove(label_dir / "b.txt")
+    run_label_audit(str(label_dir), cache=cache)
+
+    # Only the scanned folder is pruned, not a sibling sharing its name as a prefix
+    assert _rows(cache, "labels") == ["a.txt", "a.txt", "b.txt"]
+    cache.close()
+
+
+def test_renamed_images_are_pruned(tmp_path):
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    img = np.full((40, 60, 3), 128, dtype=np.uint8)
+    for name in ("a.jpg", "b.jpg"):
+        cv2.imwrite(str(image_dir / name), img)
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+    run_audit(str(image_dir), workers=1, cache=cache, pixels=False)
+
+    os.rename(image_dir / "b.jpg", image_dir / "c.jpg")
+    run_audit(str(image_dir), workers=1, cache=cache, pixels=False)
+
+    assert _rows(cache, "images") == ["a.jpg", "c.jpg"]
+    cache.close()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from experiment_registry import ExperimentRegistry, training_finished  # noqa: E402
+
+
+def _write_run(run_dir, epochs, done, best, patience):
+    os.makedirs(run_dir)
+    with open(os.path.join(run_dir, "args.yaml"), "w") as f:
+        f.write(f"epochs: {epochs}\npatience: {patience}\n")
+    with open(os.path.join(run_dir, "results.csv"), "w") as f:
+        f.write("epoch,time,metrics/mAP50(B),metrics/mAP50-95(B)\n")
+        for epoch in range(1, done + 1):
+            score = 0.5 if epoch == best else 0.1
+            f.write(f"{epoch},{epoch * 10.0},{score},{score}\n")
+
+
+def test_early_stopped_run_is_finished(tmp_path):
+    run_dir = str(tmp_path / "detect" / "AI-In-Robotics-CPU-Exp503-Finetune")
+    _write_run(run_dir, epochs=30, done=20, best=5, patience=15)
+
+    assert training_finished(run_dir)
+    with ExperimentRegistry(str(tmp_path / "experiments.sqlite"), str(tmp_path / "detect")) as registry:
+        registry.index_run(run_dir)
+        assert registry.get("AI-In-Robotics-CPU-Exp503-Finetune")["status"] == "finished"
+
+
+def test_stopped_midway_is_not_finished(tmp_path):
+    run_dir = str(tmp_path / "detect" / "AI-In-Robotics-CPU-Exp504")
+    _write_run(run_dir, epochs=30, done=12, best=10, patience=15)
+
+    assert not training_finished(run_dir)
+
+
+def test_indexed_runs_are_never_queued(tmp_path):
+    project = str(tmp_path / "detect")
+    _write_run(os.path.join(project, "AI-In-Robotics-CPU-Exp80"), epochs=30, done=12, best=10, patience=15)
+    with ExperimentRegistry(str(tmp_path / "experiments.sqlite"), project) as registry:
+        registry.index_all()
+        assert registry.get("AI-In-Robotics-CPU-Exp80")["status"] == "interrupted"
+        assert registry.unfinished() == []
+
+        name = registry.register({"epochs": 5})
+        assert [row["name"] for row in registry.unfinished()] == [name]
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from image_header import probe_image_header  # noqa: E402
+
+
+def _write_jpeg(path, trailer=b""):
+    img = np.random.default_rng(0).integers(0, 255, (600, 500, 3), dtype=np.uint8)
+    with open(path, "wb") as f:
+        f.write(cv2.imencode(".jpg", img)[1].tobytes() + trailer)
+
+
+def test_jpeg_with_data_after_eoi_is_readable(tmp_path):
+    path = str(tmp_path / "trailer.jpg")
+    _write_jpeg(path, trailer=b"\x00" * 200)
+
+    assert cv2.imread(path) is not None
+    assert probe_image_header(path) == (500, 600)
+
+
+def test_truncated_jpeg_is_rejected(tmp_path):
+    path = str(tmp_path / "cut.jpg")
+    _write_jpeg(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    assert probe_image_header(path) is None
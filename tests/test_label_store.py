@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from label_store import LabelStore, build_label_store, export_yolo_labels  # noqa: E402
+
+
+def _write_labels(label_dir):
+    os.makedirs(label_dir)
+    with open(os.path.join(label_dir, "good.txt"), "w") as f:
+        f.write("0 0.5 0.5 0.2 0.2\n")
+    with open(os.path.join(label_dir, "bad.txt"), "w") as f:
+        f.write("1 0.5 0.5 0.2 0.2\n2 0.5 0.5\n3 x 0.5 0.2 0.2\n")
+
+
+def test_parse_errors_survive_incremental_rebuild(tmp_path):
+    label_dir = str(tmp_path / "split" / "labels")
+    _write_labels(label_dir)
+
+    first = build_label_store(label_dir)
+    second = build_label_store(label_dir)
+
+    assert first["parsed"] == 2 and len(first["errors"]) == 2
+    assert second["parsed"] == 0 and second["unchanged"] == 2
+    assert second["errors"] == first["errors"]
+    store = LabelStore(second["store"])
+    assert store.file_errors(store.names.index("good.txt")) == []
+    assert len(store.file_errors(store.names.index("bad.txt"))) == 2
+
+
+def test_fixed_file_clears_its_errors(tmp_path):
+    label_dir = str(tmp_path / "split" / "labels")
+    _write_labels(label_dir)
+    build_label_store(label_dir)
+
+    with open(os.path.join(label_dir, "bad.txt"), "w") as f:
+        f.write("1 0.5 0.5 0.2 0.2\n")
+    assert build_label_store(label_dir)["errors"] == []
+
+
+def test_export_reports_unpacked_lines(tmp_path, capsys):
+    label_dir = str(tmp_path / "split" / "labels")
+    _write_labels(label_dir)
+    summary = build_label_store(label_dir)
+    build_label_store(label_dir)
+
+    assert export_yolo_labels(summary["store"], str(tmp_path / "out")) == 2
+    assert "2 label lines could not be packed" in capsys.readouterr().out